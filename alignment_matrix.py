@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+
+GAP_CHARS = b"-.?"
+DEFAULT_CACHE_DIR = Path(tempfile.gettempdir()) / "phylo_gui_alignment_cache"
+# Cached matrices are as large as the alignment itself, so only the most recent few are kept.
+CACHE_KEEP = 4
+# Pairwise identity is quadratic in the number of sequences; summaries use an evenly spaced sample.
+IDENTITY_SAMPLE = 200
+# Columns per bincount pass when counting residues; small blocks keep the histogram in cache.
+_COUNT_BLOCK_COLUMNS = 32
+_GAP_CODES = np.frombuffer(GAP_CHARS, dtype=np.uint8)
+
+
+def _parse_aligned_fasta(data: bytes) -> tuple[list[str], list[bytes]]:
+    data = data.strip()
+    if not data:
+        raise ValueError("FASTA input is empty.")
+    if not data.startswith(b">"):
+        raise ValueError("FASTA text must start with a header line beginning with '>'.")
+    ids = []
+    sequences = []
+    # Splitting on record boundaries keeps the per-line work inside bytes methods.
+    for block in data[1:].split(b"\n>"):
+        header, _, body = block.partition(b"\n")
+        header = header.strip()
+        if not header:
+            raise ValueError("Encountered an empty FASTA header.")
+        ids.append(header.split(maxsplit=1)[0].decode("utf-8", errors="replace"))
+        sequences.append(b"".join(body.split()))
+    return ids, sequences
+
+
+class AlignmentMatrix:
+    """
+    Aligned sequences as an (n_sequences, n_columns) uint8 matrix of upper-case ASCII codes.
+    Column statistics are vectorized over the whole matrix; residue counts are computed once and shared.
+    """
+
+    def __init__(self, ids: list[str], matrix: np.ndarray):
+        if matrix.ndim != 2 or matrix.shape[0] != len(ids):
+            raise ValueError("Alignment matrix shape does not match the number of sequence ids.")
+        self.ids = list(ids)
+        self.matrix = matrix
+        self._gaps = None
+        self._counts = None
+
+    @classmethod
+    def from_fasta_bytes(cls, data: bytes) -> "AlignmentMatrix":
+        """Parse aligned FASTA bytes, such as a tool's captured stdout, without decoding them to text."""
+        ids, sequences = _parse_aligned_fasta(data)
+        width = len(sequences[0])
+        for seq_id, sequence in zip(ids, sequences):
+            if len(sequence) != width:
+                raise ValueError(
+                    f"Sequences are not aligned: {seq_id} has {len(sequence)} columns, expected {width}."
+                )
+        matrix = np.frombuffer(b"".join(sequences).upper(), dtype=np.uint8).reshape(len(ids), width)
+        return cls(ids, matrix)
+
+    @classmethod
+    def from_fasta_text(cls, fasta_text: str) -> "AlignmentMatrix":
+        return cls.from_fasta_bytes(fasta_text.encode("utf-8"))
+
+    @classmethod
+    def load(cls, fasta_text: str, cache_dir: str | os.PathLike | None = None) -> "AlignmentMatrix":
+        """
+        Build the matrix for ``fasta_text``, reusing a memory-mapped ``.npy`` copy in
+        ``cache_dir`` when the same alignment was loaded before.
+        """
+        if cache_dir is None:
+            return cls.from_fasta_text(fasta_text)
+        cache_dir = Path(cache_dir)
+        key = hashlib.sha256(fasta_text.encode("utf-8")).hexdigest()
+        matrix_path = cache_dir / f"{key}.npy"
+        ids_path = cache_dir / f"{key}.ids.json"
+        if matrix_path.exists() and ids_path.exists():
+            try:
+                ids = json.loads(ids_path.read_text(encoding="utf-8"))
+                matrix = np.load(matrix_path, mmap_mode="r")
+                os.utime(matrix_path)
+                return cls(ids, matrix)
+            except (OSError, ValueError):
+                pass
+        alignment = cls.from_fasta_text(fasta_text)
+        # Both files are written under temporary names so a concurrent reader never sees
+        # a partial one; the IDs go last, so a matrix is only used once it is complete.
+        partial_matrix = cache_dir / f"{key}.{os.getpid()}.partial.npy"
+        partial_ids = cache_dir / f"{key}.{os.getpid()}.partial.ids.json"
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            np.save(partial_matrix, alignment.matrix)
+            os.replace(partial_matrix, matrix_path)
+            partial_ids.write_text(json.dumps(alignment.ids), encoding="utf-8")
+            os.replace(partial_ids, ids_path)
+            _prune_cache(cache_dir)
+        except OSError:
+            # _prune_cache never removes partial files, so a failed write cleans up after itself.
+            for partial in (partial_matrix, partial_ids):
+                try:
+                    partial.unlink()
+                except OSError:
+                    pass
+        return alignment
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.matrix.shape
+
+    @property
+    def gaps(self) -> np.ndarray:
+        if self._gaps is None:
+            self._gaps = _gap_mask(self.matrix)
+        return self._gaps
+
+    def column_counts(self) -> np.ndarray:
+        """(n_columns, 256) count of each byte value per column."""
+        if self._counts is None:
+            columns = self.matrix.shape[1]
+            offsets = np.arange(_COUNT_BLOCK_COLUMNS, dtype=np.intp) * 256
+            counts = np.empty((columns, 256), dtype=np.int64)
+            for start in range(0, columns, _COUNT_BLOCK_COLUMNS):
+                block = self.matrix[:, start:start + _COUNT_BLOCK_COLUMNS]
+                width = block.shape[1]
+                histogram = np.bincount((block + offsets[:width]).ravel(), minlength=width * 256)
+                counts[start:start + width] = histogram.reshape(width, 256)
+            self._counts = counts
+        return self._counts
+
+    def column_gap_counts(self) -> np.ndarray:
+        """Number of sequences with a gap in each column."""
+        return self.column_counts()[:, _GAP_CODES].sum(axis=1)
+
+    def gap_fraction(self) -> np.ndarray:
+        """Fraction of sequences with a gap in each column."""
+        return self.column_gap_counts() / max(self.matrix.shape[0], 1)
+
+    def column_entropy(self) -> np.ndarray:
+        """Shannon entropy in bits of the non-gap residues in each column; 0 for all-gap columns."""
+        counts = self.column_counts().astype(np.float64)
+        counts[:, _GAP_CODES] = 0
+        totals = counts.sum(axis=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            freqs = np.where(totals > 0, counts / totals, 0.0)
+            terms = np.where(freqs > 0, freqs * np.log2(freqs), 0.0)
+        return -terms.sum(axis=1)
+
+    def sequence_coverage(self) -> np.ndarray:
+        """Fraction of columns that are not gaps, per sequence."""
+        columns = max(self.matrix.shape[1], 1)
+        return (columns - np.count_nonzero(self.gaps, axis=1)) / columns
+
+    def pairwise_identity(self, rows=None) -> np.ndarray:
+        """
+        Identity between every pair of the given sequences (all by default), over the
+        columns where neither has a gap. NaN where two sequences share no such column.
+        """
+        indices = np.arange(self.matrix.shape[0]) if rows is None else np.asarray(rows)
+        matrix = np.asarray(self.matrix[indices])
+        present = ~(self.gaps[indices] if self._gaps is not None else _gap_mask(matrix))
+        count = len(indices)
+        identity = np.full((count, count), np.nan, dtype=np.float32)
+        for row in range(count):
+            shared = present[row:] & present[row]
+            same = np.count_nonzero((matrix[row:] == matrix[row]) & shared, axis=1)
+            compared = np.count_nonzero(shared, axis=1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                values = np.where(compared > 0, same / compared, np.nan)
+            identity[row, row:] = values
+            identity[row:, row] = values
+        return identity
+
+    def project(self, rows) -> "AlignmentMatrix":
+        """Sub-alignment of ``rows`` without the columns that are gaps in every one of them."""
+        rows = np.asarray(rows, dtype=np.intp)
+        matrix = np.asarray(self.matrix[rows])
+        keep = ~_gap_mask(matrix).all(axis=0)
+        return AlignmentMatrix([self.ids[row] for row in rows], np.ascontiguousarray(matrix[:, keep]))
+
+    def sequence(self, row: int) -> str:
+        return self.matrix[row].tobytes().decode("ascii", errors="replace")
+
+    def sum_of_pairs(self) -> tuple[int, int]:
+        """
+        (identical residue pairs, aligned residue pairs) summed over all columns.
+        Gaps never count; computed from the per-column counts, so no pair loop is needed.
+        """
+        counts = self.column_counts().copy()
+        counts[:, _GAP_CODES] = 0
+        identical = int((counts * (counts - 1) // 2).sum())
+        residues = counts.sum(axis=1)
+        aligned = int((residues * (residues - 1) // 2).sum())
+        return identical, aligned
+
+    def sum_of_pairs_score(self) -> float:
+        """Fraction of aligned residue pairs that are identical; 0 when nothing is aligned."""
+        identical, aligned = self.sum_of_pairs()
+        return identical / aligned if aligned else 0.0
+
+    def column_score(self) -> float:
+        """Fraction of columns in which every sequence has the same residue."""
+        columns = self.matrix.shape[1]
+        if not columns:
+            return 0.0
+        counts = self.column_counts().copy()
+        counts[:, _GAP_CODES] = 0
+        return float((counts.max(axis=1) == self.matrix.shape[0]).mean())
+
+    def summary(self, identity_sample: int = IDENTITY_SAMPLE) -> dict:
+        rows, columns = self.matrix.shape
+        gap_fraction = self.gap_fraction()
+        coverage = self.sequence_coverage()
+        sample = np.unique(np.linspace(0, rows - 1, num=min(rows, identity_sample)).astype(int)) if rows else []
+        identity = self.pairwise_identity(sample) if len(sample) > 1 else np.empty((0, 0))
+        off_diagonal = identity[~np.eye(len(identity), dtype=bool)]
+        off_diagonal = off_diagonal[~np.isnan(off_diagonal)]
+        return {
+            "sequences": rows,
+            "columns": columns,
+            "gap_fraction": float(gap_fraction.mean()) if columns else 0.0,
+            "gap_free_columns": int((gap_fraction == 0).sum()),
+            "mean_entropy": float(self.column_entropy().mean()) if columns else 0.0,
+            "min_coverage": float(coverage.min()) if rows else 0.0,
+            "median_coverage": float(np.median(coverage)) if rows else 0.0,
+            "mean_identity": float(off_diagonal.mean()) if off_diagonal.size else None,
+            "identity_sample": len(sample),
+        }
+
+
+def _gap_mask(matrix: np.ndarray) -> np.ndarray:
+    gaps = matrix == _GAP_CODES[0]
+    for code in _GAP_CODES[1:]:
+        gaps |= matrix == code
+    return gaps
+
+
+def format_alignment_summary(summary: dict) -> str:
+    text = (
+        f"{summary['sequences']} sequences x {summary['columns']} columns; "
+        f"gaps {summary['gap_fraction']:.1%}, gap-free columns {summary['gap_free_columns']}; "
+        f"mean entropy {summary['mean_entropy']:.2f} bits; "
+        f"coverage min {summary['min_coverage']:.0%} / median {summary['median_coverage']:.0%}"
+    )
+    if summary["mean_identity"] is not None:
+        text += f"; mean identity {summary['mean_identity']:.1%}"
+        if summary["identity_sample"] < summary["sequences"]:
+            text += f" ({summary['identity_sample']} sampled)"
+    return text
+
+
+def load_alignment_with_summary(fasta_text: str, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Returns (alignment, one-line summary) for the stage windows. For text that is
+    not an alignment, alignment is None and the summary describes the problem.
+    """
+    try:
+        alignment = AlignmentMatrix.load(fasta_text, cache_dir)
+    except ValueError as exc:
+        return None, "Alignment stats unavailable: " + str(exc)
+    return alignment, format_alignment_summary(alignment.summary())
+
+
+def alignment_summary_text(fasta_text: str, cache_dir=DEFAULT_CACHE_DIR) -> str:
+    return load_alignment_with_summary(fasta_text, cache_dir)[1]
+
+
+def _cache_mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return 0.0
+
+
+def _prune_cache(cache_dir: Path):
+    # Only final "<key>.npy" files; another process's "<key>.<pid>.partial.npy" is still being written.
+    matrices = [path for path in cache_dir.glob("*.npy") if not path.stem.endswith(".partial")]
+    matrices.sort(key=_cache_mtime, reverse=True)
+    for path in matrices[CACHE_KEEP:]:
+        for stale in (path, path.with_name(path.stem + ".ids.json")):
+            try:
+                stale.unlink()
+            except OSError:
+                pass
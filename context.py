@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import hashlib
 from dataclasses import dataclass, field
 from pathlib import Path
 
 
+def _text_digest(text: str) -> str:
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+
+
 @dataclass
 class SequenceRecord:
     seq_id: str
@@ -25,6 +30,9 @@ class AnalysisContext:
     last_open_dir: Path | None = None
 
     alignment_output_text: str | None = None
+    identical_groups: dict[str, list[str]] = field(default_factory=dict)
+    # Digests of the texts that still hold only the representatives of identical_groups.
+    identical_groups_sources: set[str] = field(default_factory=set)
     trim_output_text: str | None = None
 
     iqtree_output_dir: Path | None = None
@@ -51,6 +59,8 @@ class AnalysisContext:
 
     def clear_alignment_outputs(self):
         self.alignment_output_text = None
+        self.identical_groups = {}
+        self.identical_groups_sources = set()
         self.clear_trim_outputs()
 
     def set_original_input(self, fasta_text: str, records: list[SequenceRecord]):
@@ -58,12 +68,17 @@ class AnalysisContext:
         self.original_records = list(records)
         self.clear_alignment_outputs()
 
-    def set_alignment_output(self, fasta_text: str):
+    def set_alignment_output(self, fasta_text: str, identical_groups: dict[str, list[str]] | None = None):
         self.alignment_output_text = fasta_text
+        self.identical_groups = dict(identical_groups or {})
+        self.identical_groups_sources = {_text_digest(fasta_text)} if self.identical_groups else set()
         self.clear_trim_outputs()
 
-    def set_trim_output(self, fasta_text: str):
+    def set_trim_output(self, fasta_text: str, source_text: str | None = None):
+        """source_text is the trim input; identical_groups carry over when it was their source."""
         self.trim_output_text = fasta_text
+        if source_text is not None and self.identical_groups_for(source_text):
+            self.identical_groups_sources.add(_text_digest(fasta_text))
         self.clear_iqtree_outputs()
 
     def set_iqtree_output(
@@ -83,6 +98,12 @@ class AnalysisContext:
         self.leaf_label_map.clear()
         self.current_selection = TreeSelection()
 
+    def identical_groups_for(self, fasta_text: str) -> dict[str, list[str]]:
+        """identical_groups if fasta_text is the text they were computed for, otherwise empty."""
+        if self.identical_groups and _text_digest(fasta_text) in self.identical_groups_sources:
+            return self.identical_groups
+        return {}
+
     def get_alignment_input_text(self) -> str:
         return self.original_fasta_text
 
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import numpy as np
+
+from alignment_matrix import DEFAULT_CACHE_DIR, GAP_CHARS, AlignmentMatrix
+from newick_tree import quote_newick_name
+
+
+DISTANCE_MODELS = ("jc", "p")
+# Rows of the distance matrix filled per matrix product; the product temporaries
+# are DISTANCE_BLOCK_ROWS x n_sequences.
+DISTANCE_BLOCK_ROWS = 512
+# Alignment columns converted to one-hot float32 at a time; each one-hot tile is
+# n_sequences x DISTANCE_BLOCK_COLUMNS.
+DISTANCE_BLOCK_COLUMNS = 1024
+# Rows of the Q-matrix scanned at a time when picking the next pair to join.
+NJ_BLOCK_ROWS = 128
+# Jukes-Cantor distances saturate as p approaches b; they are capped here instead.
+MAX_DISTANCE = 10.0
+_NUCLEOTIDES = np.frombuffer(b"ACGTUN", dtype=np.uint8)
+
+
+def is_nucleotide_alignment(alignment: AlignmentMatrix) -> bool:
+    """True when at least 90% of the non-gap characters are A/C/G/T/U/N."""
+    counts = alignment.column_counts().sum(axis=0)
+    counts[np.frombuffer(GAP_CHARS, dtype=np.uint8)] = 0
+    total = counts.sum()
+    return bool(total) and counts[_NUCLEOTIDES].sum() >= 0.9 * total
+
+
+def distance_matrix(
+    alignment: AlignmentMatrix,
+    model: str = "jc",
+    block_rows: int = DISTANCE_BLOCK_ROWS,
+    block_columns: int = DISTANCE_BLOCK_COLUMNS,
+) -> np.ndarray:
+    """
+    Pairwise p-distances (``model="p"``) or Jukes-Cantor distances (``model="jc"``)
+    over the columns where both sequences have a residue. Shared residues and compared
+    sites are counted as products of one-hot tiles, one character, column tile and row
+    block at a time. Besides the n x n float64 result, memory holds an n x n float32
+    count of compared sites, one n x block_columns one-hot tile and one
+    block_rows x n product.
+    """
+    if model not in DISTANCE_MODELS:
+        raise ValueError(f"Unknown distance model {model!r}; use one of {', '.join(DISTANCE_MODELS)}.")
+    rows, columns = alignment.shape
+    gap_codes = np.frombuffer(GAP_CHARS, dtype=np.uint8)
+    counts = alignment.column_counts().sum(axis=0)
+    counts[gap_codes] = 0
+    codes = np.flatnonzero(counts)
+    # Identical residues are accumulated in the result matrix itself, which is then
+    # turned into distances one row block at a time. float32 counts stay exact below 2**24 columns.
+    distances = np.zeros((rows, rows), dtype=np.float64)
+    compared = np.zeros((rows, rows), dtype=np.float32)
+    for column_start in range(0, columns, block_columns):
+        tile = np.asarray(alignment.matrix[:, column_start:column_start + block_columns])
+        _add_block_products(compared, ~np.isin(tile, gap_codes), block_rows)
+        for code in codes:
+            _add_block_products(distances, tile == code, block_rows)
+    for start in range(0, rows, block_rows):
+        stop = min(start + block_rows, rows)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            distances[start:stop] = np.where(
+                compared[start:stop] > 0, 1.0 - distances[start:stop] / compared[start:stop], 1.0
+            )
+    del compared
+    if model == "jc":
+        b = 0.75 if is_nucleotide_alignment(alignment) else 0.95
+        with np.errstate(divide="ignore", invalid="ignore"):
+            distances = -b * np.log(1.0 - distances / b)
+        distances = np.where(np.isfinite(distances), np.minimum(distances, MAX_DISTANCE), MAX_DISTANCE)
+    distances = np.clip(distances, 0.0, None)
+    np.fill_diagonal(distances, 0.0)
+    return distances
+
+
+def _add_block_products(target: np.ndarray, mask: np.ndarray, block_rows: int):
+    """Adds mask @ mask.T to ``target`` one row block at a time."""
+    one_hot = mask.astype(np.float32)
+    for start in range(0, len(one_hot), block_rows):
+        stop = min(start + block_rows, len(one_hot))
+        target[start:stop] += one_hot[start:stop] @ one_hot.T
+
+
+def neighbor_joining(distances: np.ndarray, names: list[str]) -> str:
+    """
+    Unrooted neighbor-joining tree as Newick text. Joined clusters reuse the row of
+    one partner and the last active row fills the other, so the working matrix only
+    ever shrinks in place and memory stays O(n^2).
+    """
+    count = len(names)
+    if count < 3:
+        raise ValueError("A neighbor-joining tree needs at least three sequences.")
+    if distances.shape != (count, count):
+        raise ValueError("Distance matrix shape does not match the number of names.")
+    working = np.array(distances, dtype=np.float64)
+    subtrees = [quote_newick_name(name) for name in names]
+    totals = working.sum(axis=1)
+    active = count
+    while active > 3:
+        i, j = _closest_pair(working, totals, active)
+        d_ij = working[i, j]
+        length_i = 0.5 * d_ij + (totals[i] - totals[j]) / (2 * (active - 2))
+        length_j = d_ij - length_i
+        joined = 0.5 * (working[i, :active] + working[j, :active] - d_ij)
+        subtrees[i] = f"({subtrees[i]}:{_format_length(length_i)},{subtrees[j]}:{_format_length(length_j)})"
+        # Row sums are updated rather than recomputed: each row loses its distances
+        # to i and j and gains its distance to the joined node.
+        totals[:active] += joined - working[:active, i] - working[:active, j]
+        working[i, :active] = joined
+        working[:active, i] = joined
+        working[i, i] = 0.0
+        totals[i] = joined.sum() - joined[j]
+        last = active - 1
+        if j != last:
+            working[j, :active] = working[last, :active]
+            working[:active, j] = working[:active, last]
+            working[j, j] = 0.0
+            totals[j] = totals[last]
+            subtrees[j] = subtrees[last]
+        subtrees.pop()
+        active -= 1
+    d_ab, d_ac, d_bc = working[0, 1], working[0, 2], working[1, 2]
+    lengths = (0.5 * (d_ab + d_ac - d_bc), 0.5 * (d_ab + d_bc - d_ac), 0.5 * (d_ac + d_bc - d_ab))
+    return "(" + ",".join(f"{subtree}:{_format_length(length)}" for subtree, length in zip(subtrees, lengths)) + ");"
+
+
+def _closest_pair(working: np.ndarray, totals: np.ndarray, active: int) -> tuple[int, int]:
+    """
+    Minimum of the NJ Q-matrix, (n - 2) d(i, j) - r(i) - r(j), scanned in row blocks
+    over the upper triangle instead of building the full Q-matrix each step.
+    """
+    best = np.inf
+    pair = (0, 1)
+    for start in range(0, active - 1, NJ_BLOCK_ROWS):
+        stop = min(start + NJ_BLOCK_ROWS, active)
+        block = working[start:stop, start:active] * (active - 2)
+        block -= totals[start:stop, None]
+        block -= totals[start:active]
+        rows = np.arange(stop - start)
+        block[rows, rows] = np.inf
+        index = int(np.argmin(block))
+        width = active - start
+        if block.flat[index] < best:
+            best = block.flat[index]
+            pair = (start + index // width, start + index % width)
+    i, j = pair
+    return (i, j) if i < j else (j, i)
+
+
+def _format_length(length: float) -> str:
+    return f"{max(float(length), 0.0):.6g}"
+
+
+def build_quick_tree(fasta_text: str, model: str = "jc", cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Neighbor-joining tree from an alignment's p- or JC distances.
+    Returns (success, message, newick_text).
+    """
+    try:
+        alignment = AlignmentMatrix.load(fasta_text, cache_dir)
+        newick_text = neighbor_joining(distance_matrix(alignment, model), alignment.ids)
+    except (ValueError, MemoryError) as e:
+        return False, str(e), None
+    label = "JC" if model == "jc" else "p-distance"
+    return True, f"Neighbor-joining tree on {label} distances ({alignment.shape[0]} sequences)", newick_text
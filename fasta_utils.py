@@ -86,22 +86,73 @@ def extract_leaf_labels_from_newick(newick_text: str):
     return labels
 
 
+def resolve_leaf_seq_id(label: str, seq_ids) -> str | None:
+    """Sequence id for a tree label that is either the id itself or ``id<annotation>``."""
+    if label in seq_ids:
+        return label
+    if not label.endswith(">"):
+        return None
+    # Try the longest candidate id first, as annotations may themselves contain "<".
+    cut = label.find("<")
+    candidates = []
+    while cut > 0:
+        candidates.append(label[:cut])
+        cut = label.find("<", cut + 1)
+    for seq_id in reversed(candidates):
+        if seq_id in seq_ids:
+            return seq_id
+    return None
+
+
 def build_leaf_label_map(records, tree_text: str):
-    seq_ids = [record.seq_id for record in records]
-    seq_id_set = set(seq_ids)
-    sorted_seq_ids = sorted(seq_ids, key=len, reverse=True)
+    seq_id_set = {record.seq_id for record in records}
     label_map = {}
 
     for label in extract_leaf_labels_from_newick(tree_text):
-        if label in seq_id_set:
-            label_map[label] = label
-            continue
-        for seq_id in sorted_seq_ids:
-            if not label.startswith(seq_id):
-                continue
-            suffix = label[len(seq_id):]
-            if suffix.startswith("<") and suffix.endswith(">"):
-                label_map[label] = seq_id
-                break
+        seq_id = resolve_leaf_seq_id(label, seq_id_set)
+        if seq_id is not None:
+            label_map[label] = seq_id
 
     return label_map
+
+
+def index_fasta_file(path) -> dict[str, tuple[int, int]]:
+    """
+    Map each sequence id in a FASTA file to the byte range of its record.
+    Only offsets are kept, so the index stays small for very large files.
+    """
+    index = {}
+    seq_id = None
+    start = 0
+    offset = 0
+    with open(path, "rb") as handle:
+        for line in handle:
+            if line.startswith(b">"):
+                if seq_id is not None:
+                    index.setdefault(seq_id, (start, offset))
+                header = line[1:].decode("utf-8").strip()
+                seq_id, _ = _split_header(header)
+                start = offset
+            offset += len(line)
+    if seq_id is not None:
+        index.setdefault(seq_id, (start, offset))
+    return index
+
+
+def iter_indexed_fasta(path, index: dict[str, tuple[int, int]], seq_ids, chunk_size: int = 1 << 16):
+    """Yield the raw bytes of the indexed records for ``seq_ids``, in order, without parsing them."""
+    with open(path, "rb") as handle:
+        for seq_id in seq_ids:
+            start, end = index[seq_id]
+            handle.seek(start)
+            remaining = end - start
+            last = b""
+            while remaining > 0:
+                chunk = handle.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                last = chunk
+                yield chunk
+            if last and not last.endswith(b"\n"):
+                yield b"\n"
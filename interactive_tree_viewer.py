@@ -1,12 +1,21 @@
 import argparse
 import json
 import mimetypes
+import queue
+import re
 import tempfile
+import threading
+import time
 import webbrowser
 from functools import partial
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from urllib.parse import urlparse
+from urllib.parse import parse_qs, urlparse
+
+from fasta_utils import index_fasta_file, iter_indexed_fasta, resolve_leaf_seq_id
+from leaf_search import LeafSearchIndex
+from newick_tree import build_view, parse_newick
+from selection_channel import SelectionSender, decode_leaf_selection
 
 
 ROOT = Path(__file__).resolve().parent
@@ -18,16 +27,32 @@ VIEWER_JS_MODULES = [
     "state",
     "dev-tools",
     "node-utils",
+    "tree-index",
+    "spatial-index",
     "panels",
     "selection",
     "rect-select",
     "display",
     "tree-render",
+    "progressive",
+    "canvas-render",
+    "level-of-detail",
+    "live-updates",
+    "search",
     "zoom",
     "node-actions",
     "app",
 ]
 
+# Trees with more leaves than this are served as a depth-limited view whose
+# collapsed clades are fetched from /api/subtree on demand.
+DEFAULT_PROGRESSIVE_THRESHOLD = 5000
+PROGRESSIVE_VIEW_DEPTH = 8
+PROGRESSIVE_VIEW_MAX_TIPS = 2000
+# Above this many rendered tips the browser draws on a single canvas instead of
+# one SVG element per node, label and branch.
+DEFAULT_CANVAS_THRESHOLD = 10000
+
 
 def _required_assets():
     assets = {
@@ -61,6 +86,8 @@ def _viewer_script_tags(asset_urls):
 
 def _build_html(payload, asset_urls):
     data_json = json.dumps(payload, ensure_ascii=False)
+    fasta_hidden = "" if payload.get("fastaApiUrl") else " hidden"
+    search_hidden = "" if payload.get("searchApiUrl") else " hidden"
     return f"""<!DOCTYPE html>
 <html lang="en">
   <head>
@@ -97,6 +124,15 @@ def _build_html(payload, asset_urls):
             </label>
             <span id="node-size-indicator" class="toolbar-indicator">Node 3px</span>
             <button id="rectangle-select-toggle" type="button">Rectangle Select: Off</button>
+            <button id="level-of-detail-toggle" type="button">Detail: Auto</button>
+            <form id="leaf-search-form" class="toolbar-search"{search_hidden}>
+              <input id="leaf-search-input" type="search" placeholder="Search leaves" autocomplete="off">
+              <label class="toolbar-control" for="leaf-search-regex">
+                <input id="leaf-search-regex" type="checkbox">
+                <span>Regex</span>
+              </label>
+              <span id="leaf-search-status" class="toolbar-indicator"></span>
+            </form>
           </div>
           <p id="selection-mode-note" class="selection-mode-note">Browse mode: click nodes to inspect them.</p>
           <div id="tree-container" class="tree-container">
@@ -132,12 +168,14 @@ def _build_html(payload, asset_urls):
             <button id="select-descendants-button" type="button" disabled>Select Descendant Leaves</button>
             <button id="select-opposite-side-button" type="button" disabled>Select Opposite-Side Leaves</button>
             <button id="clear-active-node-button" type="button" disabled>Clear Active Node</button>
+            <button id="export-clade-fasta-button" type="button" disabled{fasta_hidden}>Export Clade FASTA</button>
           </div>
           <h2>Selected Leaves</h2>
           <div id="selected-leaves-card" class="selected-leaves-card is-empty">
             <p id="selected-leaves-summary">No leaves selected.</p>
             <div class="selected-leaf-actions">
               <button id="save-selection-json-button" type="button" disabled>{payload.get("selectionActionLabel", "Save Selection JSON")}</button>
+              <button id="export-selection-fasta-button" type="button" disabled{fasta_hidden}>Export FASTA</button>
               <button id="copy-selected-leaves-button" type="button" disabled>Copy Leaf Names</button>
               <button id="clear-selected-leaves-button" type="button" disabled>Clear Selected Leaves</button>
             </div>
@@ -233,7 +271,7 @@ def _write_json_atomic(path: Path, payload: dict):
             delete=False,
         ) as handle:
             temp_path = Path(handle.name)
-            json.dump(payload, handle, ensure_ascii=False, indent=2)
+            json.dump(payload, handle, ensure_ascii=False, separators=(",", ":"))
         temp_path.replace(path)
     finally:
         if temp_path is not None and temp_path.exists():
@@ -262,11 +300,135 @@ def _asset_routes():
     return routes
 
 
+class _ViewerSession:
+    """Tree state and live-update subscribers shared by all request handler threads of one server."""
+
+    def __init__(
+        self,
+        payload: dict,
+        asset_urls: dict,
+        progressive_threshold: int,
+        selection_sender=None,
+        sequences_fasta: Path | None = None,
+    ):
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._asset_urls = asset_urls
+        self._progressive_threshold = progressive_threshold
+        self._selection_sender = selection_sender
+        self._fasta_lock = threading.Lock()
+        self._fasta_index = None
+        self._search_lock = threading.Lock()
+        self._search_index = None
+        self.sequences_fasta = sequences_fasta
+        self.payload = payload
+        self.tree_index = None
+        self.html_text = ""
+        self._load_tree(payload["newick"])
+
+    def _load_tree(self, newick_text: str):
+        payload = dict(self.payload, newick=newick_text, labelOverrides={})
+        payload.pop("progressive", None)
+        tree_index = _apply_progressive_view(payload, self._progressive_threshold)
+        with self._lock:
+            self.payload = payload
+            self.tree_index = tree_index
+            self.html_text = _build_html(payload, self._asset_urls)
+        # Build the search index ahead of the first query.
+        threading.Thread(target=self.search_index, daemon=True).start()
+
+    def search_index(self):
+        """Return (tree_index, leaf labels, LeafSearchIndex) for the current tree and label overrides."""
+        with self._search_lock:
+            tree_index = self.tree_index
+            overrides = self.payload.get("labelOverrides") or {}
+            cached = self._search_index
+            if cached is None or cached[0] is not tree_index or cached[1] is not overrides:
+                names = [tree_index.names[leaf] for leaf in tree_index.leaf_nodes] if tree_index is not None else []
+                labels = [overrides.get(name, name) for name in names]
+                # Renamed leaves stay findable by their original name too.
+                texts = [name if label == name else f"{name} {label}" for name, label in zip(names, labels)]
+                cached = (tree_index, overrides, labels, LeafSearchIndex(texts))
+                self._search_index = cached
+            return cached[0], cached[2], cached[3]
+
+    def subscribe(self) -> queue.Queue:
+        events = queue.Queue()
+        with self._lock:
+            self._subscribers.append(events)
+            pages = len(self._subscribers)
+        self._report_pages(pages)
+        return events
+
+    def unsubscribe(self, events: queue.Queue):
+        with self._lock:
+            if events in self._subscribers:
+                self._subscribers.remove(events)
+            pages = len(self._subscribers)
+        self._report_pages(pages)
+
+    def _report_pages(self, pages: int):
+        if self._selection_sender is not None:
+            self._selection_sender.report_open_pages(pages)
+
+    def _publish(self, event: dict):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for events in subscribers:
+            events.put(event)
+
+    def fasta_index(self) -> dict[str, tuple[int, int]]:
+        """Byte offsets of every record in the sequences FASTA, built on first use."""
+        with self._fasta_lock:
+            if self._fasta_index is None:
+                self._fasta_index = index_fasta_file(self.sequences_fasta)
+            return self._fasta_index
+
+    def selected_leaf_names(self, payload: dict) -> list[str] | None:
+        """Names of the leaves in a compact selection payload, in preorder."""
+        tree_index = self.tree_index
+        if tree_index is None:
+            return None
+        indices = decode_leaf_selection(payload, tree_index.leaf_count())
+        if indices is None:
+            return None
+        return [tree_index.names[tree_index.leaf_nodes[leaf]] for leaf in indices]
+
+    def handle_gui_message(self, message):
+        """Apply a tree update pushed by the GUI and forward it to every open page."""
+        if not isinstance(message, dict):
+            return
+        if message.get("type") == "labels":
+            labels = dict(message.get("labels") or {})
+            with self._lock:
+                self.payload["labelOverrides"] = labels
+                self.html_text = _build_html(self.payload, self._asset_urls)
+            self._publish({"type": "labels", "labels": labels})
+        elif message.get("type") == "tree" and message.get("newick"):
+            self._load_tree(message["newick"])
+            self._publish(
+                {
+                    "type": "tree",
+                    "newick": self.payload["newick"],
+                    "progressive": self.payload.get("progressive"),
+                }
+            )
+
+
 class _ViewerRequestHandler(BaseHTTPRequestHandler):
-    def __init__(self, *args, html_text: str, asset_routes: dict[str, Path], selection_output: Path | None, **kwargs):
-        self._html_text = html_text
+    def __init__(
+        self,
+        *args,
+        session: _ViewerSession,
+        asset_routes: dict[str, Path],
+        selection_output: Path | None,
+        selection_sender: SelectionSender | None = None,
+        **kwargs,
+    ):
+        self._session = session
         self._asset_routes = asset_routes
         self._selection_output = selection_output
+        self._selection_sender = selection_sender
         super().__init__(*args, **kwargs)
 
     def log_message(self, format, *args):
@@ -289,25 +451,177 @@ class _ViewerRequestHandler(BaseHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(body)
 
+    def _send_json(self, payload, status: int = 200):
+        self._send_text(json.dumps(payload, ensure_ascii=False), "application/json; charset=utf-8", status)
+
+    def _handle_events(self):
+        """Server-sent events stream of tree updates pushed from the GUI."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        events = self._session.subscribe()
+        try:
+            while True:
+                try:
+                    event = events.get(timeout=15)
+                except queue.Empty:
+                    # Comment lines keep idle connections open and reveal closed tabs.
+                    self.wfile.write(b": keepalive\n\n")
+                else:
+                    data = json.dumps(event, ensure_ascii=False)
+                    self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self._session.unsubscribe(events)
+
+    def _fasta_leaf_indices(self, tree_index, query: dict[str, list[str]]) -> list[int]:
+        if tree_index is None:
+            raise ValueError("The tree could not be indexed")
+        if "selection" in query:
+            indices = decode_leaf_selection(json.loads(query["selection"][0]), tree_index.leaf_count())
+            if indices is None:
+                raise ValueError("selection must carry leaf ranges or a leaf bitmap")
+            return indices
+        if "node" in query:
+            node = int(query["node"][0])
+            if not 0 <= node < len(tree_index):
+                raise ValueError(f"Unknown node id: {node}")
+            return list(range(tree_index.leaf_start[node], tree_index.leaf_end[node]))
+        raise ValueError("node or selection is required")
+
+    def _handle_fasta(self, query: dict[str, list[str]]):
+        """Stream the FASTA records of a clade or leaf selection straight from the sequences file."""
+        tree_index = self._session.tree_index
+        try:
+            indices = self._fasta_leaf_indices(tree_index, query)
+            fasta_index = self._session.fasta_index()
+        except (ValueError, OSError) as exc:
+            self._send_json({"ok": False, "error": str(exc)}, 400)
+            return
+        seq_ids = []
+        for leaf in indices:
+            seq_id = resolve_leaf_seq_id(tree_index.names[tree_index.leaf_nodes[leaf]], fasta_index)
+            if seq_id is not None:
+                seq_ids.append(seq_id)
+        filename = "".join(ch for ch in query.get("filename", ["selection"])[0] if ch.isalnum() or ch in "-_.") or "selection"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/x-fasta; charset=utf-8")
+        self.send_header("Content-Disposition", f'attachment; filename="{filename}.fa"')
+        self.send_header("X-Matched-Records", str(len(seq_ids)))
+        self.end_headers()
+        try:
+            for chunk in iter_indexed_fasta(self._session.sequences_fasta, fasta_index, seq_ids):
+                self.wfile.write(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _handle_search(self, query: dict[str, list[str]]):
+        text = query.get("q", [""])[0]
+        regex = query.get("mode", ["substring"])[0] == "regex"
+        try:
+            limit = max(1, min(int(query.get("limit", ["500"])[0]), 5000))
+        except ValueError:
+            self._send_json({"ok": False, "error": "limit must be an integer"}, 400)
+            return
+        started = time.perf_counter()
+        tree_index, labels, search_index = self._session.search_index()
+        if tree_index is None:
+            self._send_json({"ok": False, "error": "The tree could not be indexed"}, 400)
+            return
+        try:
+            leaves, total = search_index.search(text, regex=regex, limit=limit)
+        except re.error as exc:
+            self._send_json({"ok": False, "error": f"Invalid regular expression: {exc}"}, 400)
+            return
+        self._send_json(
+            {
+                "ok": True,
+                "leafCount": tree_index.leaf_count(),
+                "leaves": leaves,
+                "names": [labels[leaf] for leaf in leaves],
+                "total": total,
+                "elapsedMs": round((time.perf_counter() - started) * 1000, 2),
+            }
+        )
+
+    def _handle_subtree(self, query: dict[str, list[str]]):
+        tree_index = self._session.tree_index
+        if tree_index is None:
+            self._send_text("Not found", "text/plain; charset=utf-8", 404)
+            return
+        try:
+            node = int(query.get("node", ["0"])[0])
+            depth = int(query.get("depth", [str(PROGRESSIVE_VIEW_DEPTH)])[0])
+        except ValueError:
+            self._send_json({"ok": False, "error": "node and depth must be integers"}, 400)
+            return
+        if not 0 <= node < len(tree_index):
+            self._send_json({"ok": False, "error": f"Unknown node id: {node}"}, 404)
+            return
+        newick_text, placeholders = build_view(
+            tree_index,
+            node,
+            max_depth=max(1, depth),
+            max_tips=PROGRESSIVE_VIEW_MAX_TIPS,
+        )
+        self._send_json({"ok": True, "node": node, "newick": newick_text, "placeholders": placeholders})
+
     def do_GET(self):
-        route = urlparse(self.path).path
+        parsed = urlparse(self.path)
+        route = parsed.path
         if route in ("/", "/index.html"):
-            self._send_text(self._html_text)
+            self._send_text(self._session.html_text)
             return
         if route in self._asset_routes:
             self._send_file(self._asset_routes[route])
             return
+        if route == "/api/subtree":
+            self._handle_subtree(parse_qs(parsed.query))
+            return
+        if route == "/api/search":
+            self._handle_search(parse_qs(parsed.query))
+            return
+        if route == "/api/events" and self._selection_sender is not None:
+            self._handle_events()
+            return
+        if route == "/api/fasta" and self._session.sequences_fasta is not None:
+            self._handle_fasta(parse_qs(parsed.query))
+            return
         self._send_text("Not found", "text/plain; charset=utf-8", 404)
 
     def do_POST(self):
         route = urlparse(self.path).path
-        if route != "/api/selection" or self._selection_output is None:
+        if route == "/api/fasta" and self._session.sequences_fasta is not None:
+            # Large selections arrive as a form post so the browser saves the stream directly.
+            content_length = int(self.headers.get("Content-Length", "0"))
+            self._handle_fasta(parse_qs(self.rfile.read(content_length).decode("utf-8")))
+            return
+        if route != "/api/selection" or (self._selection_output is None and self._selection_sender is None):
             self._send_text("Not found", "text/plain; charset=utf-8", 404)
             return
 
         content_length = int(self.headers.get("Content-Length", "0"))
         raw_body = self.rfile.read(content_length)
         payload = json.loads(raw_body.decode("utf-8"))
+        if self._selection_sender is not None:
+            try:
+                self._selection_sender.send(payload)
+            except (OSError, EOFError) as exc:
+                self._send_json({"ok": False, "error": f"GUI is no longer listening: {exc}"}, 503)
+                return
+            self._send_json({"ok": True, "channel": True})
+            return
+        # Selection files stay readable without the tree, so they carry names.
+        try:
+            selected_leaf_names = self._session.selected_leaf_names(payload)
+        except ValueError as exc:
+            self._send_json({"ok": False, "error": str(exc)}, 400)
+            return
+        if selected_leaf_names is not None:
+            payload["selected_leaf_names"] = selected_leaf_names
         _write_json_atomic(self._selection_output, payload)
         self._send_text(
             json.dumps({"ok": True, "path": str(self._selection_output)}, ensure_ascii=False),
@@ -316,7 +630,39 @@ class _ViewerRequestHandler(BaseHTTPRequestHandler):
         )
 
 
-def _serve_viewer(payload: dict, selection_output: Path, open_browser: bool):
+def _apply_progressive_view(payload: dict, threshold: int):
+    """Swap the payload Newick for a depth-limited view when the tree is large enough."""
+    try:
+        tree_index = parse_newick(payload["newick"])
+    except ValueError:
+        # Let phylotree.js report malformed input in the browser as before.
+        return None
+    leaf_count = tree_index.leaf_count()
+    if threshold <= 0 or leaf_count <= threshold:
+        return tree_index
+    newick_text, placeholders = build_view(
+        tree_index,
+        max_depth=PROGRESSIVE_VIEW_DEPTH,
+        max_tips=PROGRESSIVE_VIEW_MAX_TIPS,
+    )
+    payload["newick"] = newick_text
+    payload["progressive"] = {
+        "subtreeApiUrl": "/api/subtree",
+        "depth": PROGRESSIVE_VIEW_DEPTH,
+        "totalLeaves": leaf_count,
+        "placeholders": placeholders,
+    }
+    return tree_index
+
+
+def _serve_viewer(
+    payload: dict,
+    selection_output: Path | None,
+    open_browser: bool,
+    progressive_threshold: int = DEFAULT_PROGRESSIVE_THRESHOLD,
+    selection_sender: SelectionSender | None = None,
+    sequences_fasta: Path | None = None,
+):
     asset_routes = _asset_routes()
     asset_urls = {
         "phylotree_js": "/assets/phylotree.js",
@@ -328,12 +674,15 @@ def _serve_viewer(payload: dict, selection_output: Path, open_browser: bool):
     for name in VIEWER_JS_MODULES:
         key = name.replace("-", "_") + "_js"
         asset_urls[key] = f"/assets/viewer/{name}.js"
-    html_text = _build_html(payload, asset_urls)
+    session = _ViewerSession(payload, asset_urls, progressive_threshold, selection_sender, sequences_fasta)
+    if selection_sender is not None:
+        selection_sender.start_receiving(session.handle_gui_message)
     handler = partial(
         _ViewerRequestHandler,
-        html_text=html_text,
+        session=session,
         asset_routes=asset_routes,
         selection_output=selection_output,
+        selection_sender=selection_sender,
     )
     server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
     url = f"http://127.0.0.1:{server.server_port}/"
@@ -346,6 +695,8 @@ def _serve_viewer(payload: dict, selection_output: Path, open_browser: bool):
         pass
     finally:
         server.server_close()
+        if selection_sender is not None:
+            selection_sender.close()
 
 
 def main():
@@ -356,6 +707,26 @@ def main():
     parser.add_argument("--title", default="Phylo GUI Tree Viewer", help="Page title for the viewer.")
     parser.add_argument("--output-dir", help="Directory to write the generated HTML viewer into.")
     parser.add_argument("--selection-output", help="Write selected leaf names as JSON to this path via a localhost callback.")
+    parser.add_argument(
+        "--selection-channel",
+        help="Send selections to a GUI listening on HOST:PORT (auth key in the PHYLO_SELECTION_CHANNEL_KEY environment variable).",
+    )
+    parser.add_argument(
+        "--sequences-fasta",
+        help="Serve FASTA for selected clades straight from this file (implies a localhost server).",
+    )
+    parser.add_argument(
+        "--progressive-threshold",
+        type=int,
+        default=DEFAULT_PROGRESSIVE_THRESHOLD,
+        help="Serve a depth-limited view with on-demand clade loading above this leaf count (0 disables).",
+    )
+    parser.add_argument(
+        "--canvas-threshold",
+        type=int,
+        default=DEFAULT_CANVAS_THRESHOLD,
+        help="Draw the tree on a canvas instead of SVG above this leaf count (0 disables).",
+    )
     parser.add_argument("--no-open-browser", action="store_true", help="Generate the viewer without opening a browser.")
     args = parser.parse_args()
 
@@ -365,15 +736,28 @@ def main():
         raise ValueError("Newick input is empty.")
 
     output_dir = Path(args.output_dir) if args.output_dir else _default_output_dir()
+    serve_selection = bool(args.selection_output or args.selection_channel)
     payload = {
         "title": args.title,
         "newick": newick_text,
         "devMode": False,
-        "selectionApiUrl": "/api/selection" if args.selection_output else None,
-        "selectionActionLabel": "Send to GUI" if args.selection_output else "Save Selection JSON",
+        "selectionApiUrl": "/api/selection" if serve_selection else None,
+        "selectionActionLabel": "Send to GUI" if serve_selection else "Save Selection JSON",
+        "canvasThreshold": max(0, args.canvas_threshold),
+        "eventsApiUrl": "/api/events" if args.selection_channel else None,
+        "fastaApiUrl": "/api/fasta" if args.sequences_fasta else None,
+        "searchApiUrl": "/api/search" if serve_selection or args.sequences_fasta else None,
     }
-    if args.selection_output:
-        _serve_viewer(payload, Path(args.selection_output), not args.no_open_browser)
+    if serve_selection or args.sequences_fasta:
+        selection_sender = SelectionSender.from_environment(args.selection_channel) if args.selection_channel else None
+        _serve_viewer(
+            payload,
+            Path(args.selection_output) if args.selection_output else None,
+            not args.no_open_browser,
+            args.progressive_threshold,
+            selection_sender,
+            Path(args.sequences_fasta) if args.sequences_fasta else None,
+        )
         return
 
     html_path = _write_viewer_html(payload, output_dir)
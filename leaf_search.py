@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import re
+from array import array
+from collections import defaultdict
+
+
+class LeafSearchIndex:
+    """
+    Case-insensitive search over leaf labels, built once per tree.
+    Substring queries of three or more characters only look at the leaves that
+    share the query's rarest trigram; regular expressions are compiled once and
+    matched against each label on its own.
+    """
+
+    def __init__(self, labels: list[str]):
+        self.labels = labels
+        self._folded = [label.casefold() for label in labels]
+        postings = defaultdict(list)
+        for leaf, text in enumerate(self._folded):
+            for gram in {text[start:start + 3] for start in range(len(text) - 2)}:
+                postings[gram].append(leaf)
+        self._postings = {gram: array("I", leaves) for gram, leaves in postings.items()}
+
+    def __len__(self):
+        return len(self.labels)
+
+    def _substring_matches(self, query: str):
+        folded = query.casefold()
+        if len(folded) < 3:
+            return (leaf for leaf, text in enumerate(self._folded) if folded in text)
+        grams = {folded[start:start + 3] for start in range(len(folded) - 2)}
+        candidates = min((self._postings.get(gram, ()) for gram in grams), key=len)
+        return (leaf for leaf in candidates if folded in self._folded[leaf])
+
+    def _regex_matches(self, pattern: str):
+        search = re.compile(pattern, re.IGNORECASE).search
+        return (leaf for leaf, label in enumerate(self.labels) if search(label))
+
+    def search(self, query: str, *, regex: bool = False, limit: int = 500) -> tuple[list[int], int]:
+        """
+        Return (leaf indices, total match count) for ``query``; at most ``limit`` indices, in leaf order.
+        Raises re.error for an invalid regular expression.
+        """
+        if not query:
+            return [], 0
+        matches = self._regex_matches(query) if regex else self._substring_matches(query)
+        leaves = []
+        total = 0
+        for leaf in matches:
+            total += 1
+            if len(leaves) < limit:
+                leaves.append(leaf)
+        return leaves, total
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+
+
+PLACEHOLDER_PREFIX = "__clade_"
+
+_QUOTE_REQUIRED = set("()[]':;, \t\r\n")
+
+
+@dataclass
+class FlatTree:
+    """Array-backed Newick tree. Node ids are preorder positions; node 0 is the root."""
+
+    names: list[str] = field(default_factory=list)
+    lengths: list[str | None] = field(default_factory=list)
+    parents: list[int] = field(default_factory=list)
+    children: list[list[int]] = field(default_factory=list)
+    depths: list[int] = field(default_factory=list)
+    subtree_end: list[int] = field(default_factory=list)
+    leaf_start: list[int] = field(default_factory=list)
+    leaf_end: list[int] = field(default_factory=list)
+    leaf_nodes: list[int] = field(default_factory=list)
+
+    def __len__(self):
+        return len(self.names)
+
+    def is_leaf(self, node: int) -> bool:
+        return not self.children[node]
+
+    def leaf_count(self, node: int = 0) -> int:
+        return self.leaf_end[node] - self.leaf_start[node]
+
+    def leaf_names(self, node: int = 0) -> list[str]:
+        return [self.names[leaf] for leaf in self.leaf_nodes[self.leaf_start[node]:self.leaf_end[node]]]
+
+
+def _add_node(tree: FlatTree, parent: int) -> int:
+    node = len(tree.names)
+    tree.names.append("")
+    tree.lengths.append(None)
+    tree.parents.append(parent)
+    tree.children.append([])
+    tree.depths.append(0 if parent < 0 else tree.depths[parent] + 1)
+    if parent >= 0:
+        tree.children[parent].append(node)
+    return node
+
+
+def _read_label(text: str, index: int) -> tuple[str, int]:
+    if index < len(text) and text[index] == "'":
+        chunks = []
+        index += 1
+        while index < len(text):
+            char = text[index]
+            if char == "'":
+                if index + 1 < len(text) and text[index + 1] == "'":
+                    chunks.append("'")
+                    index += 2
+                    continue
+                return "".join(chunks), index + 1
+            chunks.append(char)
+            index += 1
+        raise ValueError("Unterminated quoted label in Newick text.")
+    start = index
+    while index < len(text) and text[index] not in "(),:;[":
+        index += 1
+    return text[start:index].strip(), index
+
+
+def _skip_comment(text: str, index: int) -> int:
+    end = text.find("]", index)
+    if end < 0:
+        raise ValueError("Unterminated comment in Newick text.")
+    return end + 1
+
+
+def _finalize(tree: FlatTree):
+    count = len(tree.names)
+    tree.subtree_end = [0] * count
+    tree.leaf_start = [0] * count
+    tree.leaf_end = [0] * count
+    tree.leaf_nodes = [node for node in range(count) if not tree.children[node]]
+    leaf_cursor = 0
+    for node in range(count):
+        tree.leaf_start[node] = leaf_cursor
+        if not tree.children[node]:
+            leaf_cursor += 1
+    # Preorder ids make every subtree a contiguous id range, so the ends can be
+    # filled in one reverse pass.
+    for node in range(count - 1, -1, -1):
+        if tree.children[node]:
+            last_child = tree.children[node][-1]
+            tree.subtree_end[node] = tree.subtree_end[last_child]
+            tree.leaf_end[node] = tree.leaf_end[last_child]
+        else:
+            tree.subtree_end[node] = node + 1
+            tree.leaf_end[node] = tree.leaf_start[node] + 1
+
+
+def parse_newick(newick_text: str) -> FlatTree:
+    """Parse Newick text into a FlatTree without building per-node objects."""
+    text = (newick_text or "").strip()
+    if not text:
+        raise ValueError("Newick input is empty.")
+
+    tree = FlatTree()
+    current = _add_node(tree, -1)
+    index = 0
+    length = len(text)
+    while index < length:
+        char = text[index]
+        if char == "(":
+            current = _add_node(tree, current)
+            index += 1
+        elif char == ",":
+            parent = tree.parents[current]
+            if parent < 0:
+                raise ValueError("Unexpected ',' at the top level of the Newick text.")
+            current = _add_node(tree, parent)
+            index += 1
+        elif char == ")":
+            parent = tree.parents[current]
+            if parent < 0:
+                raise ValueError("Unbalanced ')' in Newick text.")
+            current = parent
+            index += 1
+        elif char == ":":
+            start = index + 1
+            index = start
+            while index < length and text[index] not in "(),;[":
+                index += 1
+            tree.lengths[current] = text[start:index].strip() or None
+        elif char == "[":
+            index = _skip_comment(text, index)
+        elif char == ";":
+            break
+        elif char.isspace():
+            index += 1
+        else:
+            label, index = _read_label(text, index)
+            tree.names[current] = label
+    if current != 0:
+        raise ValueError("Unbalanced '(' in Newick text.")
+
+    _finalize(tree)
+    return tree
+
+
+def quote_newick_name(name: str) -> str:
+    if not name or not any(char in _QUOTE_REQUIRED for char in name):
+        return name
+    return "'" + name.replace("'", "''") + "'"
+
+
+def write_newick(
+    tree: FlatTree,
+    node: int = 0,
+    *,
+    names: list[str] | None = None,
+    placeholders: set[int] | None = None,
+    include_root_length: bool = False,
+    grafts: dict[int, str] | None = None,
+) -> str:
+    """
+    Serialize the subtree at ``node``; nodes in ``placeholders`` are written as stub leaves.
+    Leaves in ``grafts`` are written as the given Newick subtree text, keeping their branch length.
+    """
+    node_names = names if names is not None else tree.names
+    stubs = placeholders or set()
+    grafted = grafts or {}
+    parts = []
+    # Iterative traversal so very deep (caterpillar) trees do not hit the recursion limit.
+    stack = [("open", node)]
+    while stack:
+        action, current = stack.pop()
+        if action == "text":
+            parts.append(current)
+            continue
+        if action == "open" and current not in stubs and tree.children[current]:
+            parts.append("(")
+            stack.append(("close", current))
+            child_ids = tree.children[current]
+            for position in range(len(child_ids) - 1, -1, -1):
+                stack.append(("open", child_ids[position]))
+                if position:
+                    stack.append(("text", ","))
+            continue
+        if action == "close":
+            parts.append(")")
+        if current in stubs:
+            parts.append(PLACEHOLDER_PREFIX + str(current))
+        elif current in grafted:
+            parts.append(grafted[current])
+        else:
+            parts.append(quote_newick_name(node_names[current]))
+        if tree.lengths[current] is not None and (current != node or include_root_length):
+            parts.append(":" + tree.lengths[current])
+    text = "".join(parts)
+    return text + ";" if node == 0 else text
+
+
+def build_view(tree: FlatTree, node: int = 0, *, max_depth: int = 8, max_tips: int = 2000, inline_leaves: int = 8):
+    """
+    Build a depth-limited Newick view of the subtree at ``node``.
+    Clades are expanded breadth-first until ``max_depth`` or ``max_tips`` is reached;
+    the remaining clades with more than ``inline_leaves`` leaves become placeholders.
+    Returns (newick_text, placeholders) where placeholders maps stub names to clade info.
+    """
+    base_depth = tree.depths[node]
+    placeholders = set()
+    tips = 1
+    queue = deque([node])
+    while queue:
+        current = queue.popleft()
+        if not tree.children[current]:
+            continue
+        within_budget = tips + len(tree.children[current]) - 1 <= max_tips
+        if current != node and tree.leaf_count(current) > inline_leaves and (
+            tree.depths[current] - base_depth >= max_depth or not within_budget
+        ):
+            placeholders.add(current)
+            continue
+        tips += len(tree.children[current]) - 1
+        queue.extend(tree.children[current])
+
+    newick_text = write_newick(tree, node, placeholders=placeholders)
+    placeholder_info = {
+        PLACEHOLDER_PREFIX + str(stub): {
+            "node": stub,
+            "leafCount": tree.leaf_count(stub),
+            "leafStart": tree.leaf_start[stub],
+        }
+        for stub in sorted(placeholders)
+    }
+    return newick_text, placeholder_info
+
+
+def leaf_label_changes(old: FlatTree, new: FlatTree) -> dict[str, str] | None:
+    """
+    Map old leaf names to new ones when two trees differ only in leaf labels.
+    Returns None when the topology, branch lengths or internal labels differ.
+    """
+    if old.parents != new.parents or old.lengths != new.lengths:
+        return None
+    changes = {}
+    for node in range(len(old)):
+        if old.names[node] == new.names[node]:
+            continue
+        if old.children[node]:
+            return None
+        changes[old.names[node]] = new.names[node]
+    return changes
@@ -24,23 +24,48 @@ def _load_tree(tree_text: str):
     return Tree(tree_text, format=1)
 
 
-def _canonical_split(descendant_leaves, all_leaves):
-    descendant_side = frozenset(descendant_leaves)
-    other_side = frozenset(all_leaves - descendant_side)
-    if not descendant_side or not other_side:
+def _leaf_order(tree) -> dict[str, int]:
+    """Bit position of every leaf name, in sorted name order."""
+    return {name: position for position, name in enumerate(sorted(set(tree.get_leaf_names())))}
+
+
+def _split_bits(tree, leaf_order):
+    """Leaf set of every node as an integer bitmask, filled in one postorder pass."""
+    bits = {}
+    for node in tree.traverse("postorder"):
+        if node.is_leaf():
+            bits[node] = 1 << leaf_order[node.name]
+        else:
+            mask = 0
+            for child in node.children:
+                mask |= bits[child]
+            bits[node] = mask
+    return bits
+
+
+def _canonical_split(mask, leaf_count):
+    """
+    The smaller side of a bipartition; on a tie, the side holding the first leaf name.
+    Matches comparing the two sides as sorted name tuples, without building them.
+    """
+    other = ((1 << leaf_count) - 1) ^ mask
+    if not mask or not other:
         return None
+    size = mask.bit_count()
+    if size * 2 < leaf_count:
+        return mask
+    if size * 2 > leaf_count:
+        return other
+    return mask if mask & 1 else other
+
 
-    left = tuple(sorted(descendant_side))
-    right = tuple(sorted(other_side))
-    if len(left) < len(right):
-        return left
-    if len(right) < len(left):
-        return right
-    return left if left <= right else right
+def _split_names(mask, leaf_order):
+    return tuple(name for name, position in leaf_order.items() if mask >> position & 1)
 
 
-def _build_split_to_label_map(tree):
-    all_leaves = frozenset(tree.get_leaf_names())
+def _build_split_to_label_map(tree, leaf_order):
+    leaf_count = len(leaf_order)
+    bits = _split_bits(tree, leaf_order)
     split_map = {}
     collisions = []
 
@@ -50,28 +75,27 @@ def _build_split_to_label_map(tree):
         label = (node.name or "").strip()
         if not label:
             continue
-        split_key = _canonical_split(node.get_leaf_names(), all_leaves)
+        split_key = _canonical_split(bits[node], leaf_count)
         if split_key is None:
             continue
         existing = split_map.get(split_key)
         if existing is not None and existing != label:
-            collisions.append((split_key, existing, label))
+            collisions.append((_split_names(split_key, leaf_order), existing, label))
             continue
         split_map[split_key] = label
 
     return split_map, collisions
 
 
-def _resolve_root_child_duplicates(tree, split_map, *, suppress_duplicates: bool):
+def _resolve_root_child_duplicates(tree, split_map, bits, leaf_count, *, suppress_duplicates: bool):
     if not suppress_duplicates:
         return
     if len(tree.children) != 2:
         return
 
     children_by_split = {}
-    all_leaves = frozenset(tree.get_leaf_names())
     for child in tree.children:
-        split_key = _canonical_split(child.get_leaf_names(), all_leaves)
+        split_key = _canonical_split(bits[child], leaf_count)
         if split_key is None:
             continue
         children_by_split.setdefault(split_key, []).append(child)
@@ -79,28 +103,14 @@ def _resolve_root_child_duplicates(tree, split_map, *, suppress_duplicates: bool
     for split_key, children in children_by_split.items():
         if len(children) < 2:
             continue
-        keep_child = min(children, key=lambda node: (len(node.get_leaf_names()), tuple(sorted(node.get_leaf_names()))))
+        keep_child = min(children, key=lambda node: (bits[node].bit_count(), tuple(sorted(node.get_leaf_names()))))
         for child in children:
             child.name = split_map.get(split_key, "") if child is keep_child else ""
 
 
-def remap_support_labels(original_tree_text: str, display_tree_text: str, *, suppress_root_duplicate_labels: bool = True):
-    original_tree = _load_tree(original_tree_text)
-    display_tree = _load_tree(display_tree_text)
-
-    original_leaves = frozenset(original_tree.get_leaf_names())
-    display_leaves = frozenset(display_tree.get_leaf_names())
-    if original_leaves != display_leaves:
-        missing_in_display = sorted(original_leaves - display_leaves)
-        missing_in_original = sorted(display_leaves - original_leaves)
-        raise ValueError(
-            "Leaf sets do not match between original and display trees.\n"
-            f"Missing in display: {missing_in_display}\n"
-            f"Missing in original: {missing_in_original}"
-        )
-
-    split_map, collisions = _build_split_to_label_map(original_tree)
-    all_leaves = frozenset(display_tree.get_leaf_names())
+def _apply_split_labels(display_tree, split_map, leaf_order, *, suppress_root_duplicate_labels: bool):
+    leaf_count = len(leaf_order)
+    bits = _split_bits(display_tree, leaf_order)
     mapped_count = 0
     unmatched_count = 0
 
@@ -110,7 +120,7 @@ def remap_support_labels(original_tree_text: str, display_tree_text: str, *, sup
             continue
         if node.is_leaf():
             continue
-        split_key = _canonical_split(node.get_leaf_names(), all_leaves)
+        split_key = _canonical_split(bits[node], leaf_count)
         if split_key is None:
             node.name = ""
             continue
@@ -124,8 +134,36 @@ def remap_support_labels(original_tree_text: str, display_tree_text: str, *, sup
     _resolve_root_child_duplicates(
         display_tree,
         split_map,
+        bits,
+        leaf_count,
         suppress_duplicates=suppress_root_duplicate_labels,
     )
+    return mapped_count, unmatched_count
+
+
+def remap_support_labels(original_tree_text: str, display_tree_text: str, *, suppress_root_duplicate_labels: bool = True):
+    original_tree = _load_tree(original_tree_text)
+    display_tree = _load_tree(display_tree_text)
+
+    original_leaves = frozenset(original_tree.get_leaf_names())
+    display_leaves = frozenset(display_tree.get_leaf_names())
+    if original_leaves != display_leaves:
+        missing_in_display = sorted(original_leaves - display_leaves)
+        missing_in_original = sorted(display_leaves - original_leaves)
+        raise ValueError(
+            "Leaf sets do not match between original and display trees.\n"
+            f"Missing in display: {missing_in_display}\n"
+            f"Missing in original: {missing_in_original}"
+        )
+
+    leaf_order = _leaf_order(original_tree)
+    split_map, collisions = _build_split_to_label_map(original_tree, leaf_order)
+    mapped_count, unmatched_count = _apply_split_labels(
+        display_tree,
+        split_map,
+        leaf_order,
+        suppress_root_duplicate_labels=suppress_root_duplicate_labels,
+    )
 
     return display_tree.write(format=1), {
         "split_count": len(split_map),
@@ -135,6 +173,33 @@ def remap_support_labels(original_tree_text: str, display_tree_text: str, *, sup
     }
 
 
+def midpoint_root_with_support_labels(tree_text: str, *, suppress_root_duplicate_labels: bool = True):
+    """
+    Midpoint-root a tree and carry its support labels over to the rooted branches.
+    Parses the Newick once; splits are read before rerooting and written back after.
+    Returns (rooted_text, stats) where stats["rooted"] is False when no midpoint outgroup exists.
+    """
+    tree = _load_tree(tree_text)
+    leaf_order = _leaf_order(tree)
+    split_map, collisions = _build_split_to_label_map(tree, leaf_order)
+    outgroup = tree.get_midpoint_outgroup()
+    if outgroup is not None:
+        tree.set_outgroup(outgroup)
+    mapped_count, unmatched_count = _apply_split_labels(
+        tree,
+        split_map,
+        leaf_order,
+        suppress_root_duplicate_labels=suppress_root_duplicate_labels,
+    )
+    return tree.write(format=1), {
+        "rooted": outgroup is not None,
+        "split_count": len(split_map),
+        "mapped_nodes": mapped_count,
+        "unmatched_nodes": unmatched_count,
+        "collisions": collisions,
+    }
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Remap support labels from an original IQ-TREE treefile onto a display tree using leaf bipartitions."
@@ -0,0 +1,213 @@
+import base64
+import os
+import secrets
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+
+# The auth key travels through the environment so it never shows up in the
+# viewer's command line.
+CHANNEL_KEY_ENV = "PHYLO_SELECTION_CHANNEL_KEY"
+SELECTION_EVENT = "-tree-selection-"
+# Sent by a viewer server whenever the number of open pages changes; consumed
+# by the channel itself rather than forwarded to the GUI.
+VIEWER_STATUS_TYPE = "viewer_status"
+
+
+def encode_leaf_ranges(leaf_indices) -> list[int]:
+    """Run-length encode leaf indices as a flat list of half-open [start, end) pairs."""
+    ranges = []
+    for leaf in sorted(set(leaf_indices)):
+        if ranges and ranges[-1] == leaf:
+            ranges[-1] = leaf + 1
+        else:
+            ranges.extend((leaf, leaf + 1))
+    return ranges
+
+
+def decode_leaf_selection(payload: dict, leaf_count: int) -> list[int] | None:
+    """
+    Decode the compact selection a viewer sends into sorted preorder leaf indices.
+    Returns None for payloads that only carry ``selected_leaf_names``.
+    """
+    ranges = payload.get("selected_leaf_ranges")
+    bitmap = payload.get("selected_leaf_bitmap")
+    if ranges is None and bitmap is None:
+        return None
+    if payload.get("leaf_count") != leaf_count:
+        raise ValueError(
+            f"Selection was made on a tree with {payload.get('leaf_count')} leaves, "
+            f"but the current tree has {leaf_count}."
+        )
+    if ranges is not None:
+        if len(ranges) % 2:
+            raise ValueError("Selection ranges must come in start/end pairs.")
+        indices = []
+        for start, end in zip(ranges[::2], ranges[1::2]):
+            if not 0 <= start <= end <= leaf_count:
+                raise ValueError(f"Selection range [{start}, {end}) is outside the tree.")
+            indices.extend(range(start, end))
+        return indices
+    data = base64.b64decode(bitmap)
+    if len(data) * 8 < leaf_count:
+        raise ValueError("Selection bitmap is shorter than the tree.")
+    indices = []
+    for offset, byte in enumerate(data[: (leaf_count + 7) // 8]):
+        if byte:
+            indices.extend(offset * 8 + bit for bit in range(8) if byte >> bit & 1)
+    return [leaf for leaf in indices if leaf < leaf_count]
+
+
+def format_channel_address(address) -> str:
+    host, port = address
+    return f"{host}:{port}"
+
+
+def parse_channel_address(text: str):
+    host, separator, port = (text or "").rpartition(":")
+    if not separator or not host:
+        raise ValueError(f"Selection channel address must be HOST:PORT, got {text!r}.")
+    try:
+        return host, int(port)
+    except ValueError as exc:
+        raise ValueError(f"Selection channel port is not a number: {port!r}.") from exc
+
+
+class SelectionChannel:
+    """
+    GUI-side end of the viewer selection channel.
+    Listens on a localhost socket; every payload a viewer sends is handed to
+    ``on_message`` from a background thread. Tree updates travel the other way
+    through ``broadcast``.
+    """
+
+    def __init__(self, on_message):
+        self.authkey = secrets.token_bytes(32)
+        self._listener = Listener(("127.0.0.1", 0), authkey=self.authkey)
+        self._on_message = on_message
+        self._closed = threading.Event()
+        self._connections = []
+        self._open_pages = {}
+        self._lock = threading.Lock()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    @property
+    def address(self) -> str:
+        return format_channel_address(self._listener.address)
+
+    def client_environment(self) -> dict:
+        """Environment for a viewer process that should connect to this channel."""
+        env = dict(os.environ)
+        env[CHANNEL_KEY_ENV] = self.authkey.hex()
+        return env
+
+    def _accept_loop(self):
+        while not self._closed.is_set():
+            try:
+                connection = self._listener.accept()
+            except AuthenticationError:
+                continue
+            except OSError:
+                break
+            with self._lock:
+                self._connections.append(connection)
+            threading.Thread(target=self._read_loop, args=(connection,), daemon=True).start()
+
+    def _read_loop(self, connection):
+        try:
+            while not self._closed.is_set():
+                try:
+                    message = connection.recv()
+                except (EOFError, OSError):
+                    break
+                if isinstance(message, dict) and message.get("type") == VIEWER_STATUS_TYPE:
+                    with self._lock:
+                        self._open_pages[id(connection)] = int(message.get("pages", 0))
+                    continue
+                self._on_message(message)
+        finally:
+            with self._lock:
+                if connection in self._connections:
+                    self._connections.remove(connection)
+                self._open_pages.pop(id(connection), None)
+            connection.close()
+
+    def live_viewer_count(self) -> int:
+        """Number of connected viewers that currently have a page open."""
+        with self._lock:
+            return sum(1 for pages in self._open_pages.values() if pages > 0)
+
+    def broadcast(self, message: dict) -> int:
+        """Send ``message`` to every connected viewer with an open page; returns how many received it."""
+        with self._lock:
+            targets = [
+                connection for connection in self._connections if self._open_pages.get(id(connection), 0) > 0
+            ]
+        delivered = 0
+        for connection in targets:
+            try:
+                connection.send(message)
+            except OSError:
+                continue
+            delivered += 1
+        return delivered
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        try:
+            self._listener.close()
+        except OSError:
+            pass
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for connection in connections:
+            try:
+                connection.close()
+            except OSError:
+                pass
+
+
+class SelectionSender:
+    """Viewer-side end of the channel; safe to share across request handler threads."""
+
+    def __init__(self, address: str, authkey: bytes):
+        self._connection = Client(parse_channel_address(address), authkey=authkey)
+        self._lock = threading.Lock()
+
+    def start_receiving(self, on_message):
+        """Hand every message the GUI sends to ``on_message`` from a background thread."""
+
+        def read_loop():
+            while True:
+                try:
+                    message = self._connection.recv()
+                except (EOFError, OSError):
+                    break
+                on_message(message)
+
+        threading.Thread(target=read_loop, daemon=True).start()
+
+    @classmethod
+    def from_environment(cls, address: str):
+        key = os.environ.get(CHANNEL_KEY_ENV)
+        if not key:
+            raise ValueError(f"{CHANNEL_KEY_ENV} is not set; cannot authenticate to the selection channel.")
+        return cls(address, bytes.fromhex(key))
+
+    def send(self, payload: dict):
+        with self._lock:
+            self._connection.send(payload)
+
+    def report_open_pages(self, pages: int):
+        try:
+            self.send({"type": VIEWER_STATUS_TYPE, "pages": pages})
+        except OSError:
+            pass
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import hashlib
+
+from context import SequenceRecord
+from fasta_utils import resolve_leaf_seq_id
+from newick_tree import parse_newick, quote_newick_name, write_newick
+
+
+# Alignments with fewer sequences than this are left alone: IQ-TREE needs at least
+# three taxa, and collapsing would gain nothing on such small inputs anyway.
+MIN_REPRESENTATIVES = 3
+
+
+def sequence_digest(sequence: str, ignore_gaps: bool = True) -> str:
+    """sha256 of an upper-cased sequence; with ``ignore_gaps`` alignment gaps are dropped first."""
+    if ignore_gaps:
+        sequence = sequence.replace("-", "").replace(".", "")
+    return hashlib.sha256(sequence.upper().encode("utf-8")).hexdigest()
+
+
+def collapse_identical_records(
+    records: list[SequenceRecord], ignore_gaps: bool = True
+) -> tuple[list[SequenceRecord], dict[str, list[str]]]:
+    """
+    Keeps the first record of every group of identical sequences.
+    Returns (representatives, groups); groups maps a representative's ID to the IDs
+    of the records it stands for, and only lists representatives that have duplicates.
+    """
+    representatives = []
+    groups: dict[str, list[str]] = {}
+    first_by_digest: dict[str, str] = {}
+    for record in records:
+        digest = sequence_digest(record.sequence, ignore_gaps)
+        representative = first_by_digest.get(digest)
+        if representative is None:
+            first_by_digest[digest] = record.seq_id
+            representatives.append(record)
+        else:
+            groups.setdefault(representative, []).append(record.seq_id)
+    return representatives, groups
+
+
+def merge_identical_groups(earlier: dict[str, list[str]], later: dict[str, list[str]]) -> dict[str, list[str]]:
+    """
+    Chains two collapsing passes: ``later`` was computed on the representatives of
+    ``earlier``, so its members bring their own duplicates along.
+    """
+    merged = {representative: list(members) for representative, members in earlier.items()}
+    for representative, members in later.items():
+        combined = merged.setdefault(representative, [])
+        for member in members:
+            combined.append(member)
+            combined.extend(merged.pop(member, []))
+    return merged
+
+
+def member_aliases(groups: dict[str, list[str]]) -> dict[str, str]:
+    """Maps every collapsed ID to the representative that stands for it."""
+    return {member: representative for representative, members in groups.items() for member in members}
+
+
+def expand_identical_leaves(newick_text: str, groups: dict[str, list[str]]) -> str:
+    """
+    Puts collapsed sequences back into a tree inferred from representatives. Each
+    representative leaf becomes a polytomy of itself and its duplicates on zero-length
+    branches, hanging from the representative's original branch.
+    """
+    if not groups:
+        return newick_text
+    tree = parse_newick(newick_text)
+    grafts = {}
+    for leaf in tree.leaf_nodes:
+        representative = resolve_leaf_seq_id(tree.names[leaf], groups)
+        if representative is None:
+            continue
+        labels = [tree.names[leaf], *groups[representative]]
+        grafts[leaf] = "(" + ",".join(quote_newick_name(label) + ":0" for label in labels) + ")"
+    return write_newick(tree, grafts=grafts)
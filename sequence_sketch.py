@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import math
+from collections import Counter
+from itertools import chain
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from context import SequenceRecord
+
+
+# One-permutation MinHash: every k-mer is hashed once and the hash space is split
+# into SKETCH_BINS bins; a sequence's sketch holds the smallest hash in each bin.
+SKETCH_BINS = 128
+NUCLEOTIDE_KMER = 11
+PROTEIN_KMER = 4
+DEFAULT_IDENTITY = 0.9
+# Roughly this many residues are hashed per NumPy batch, which bounds the peak memory.
+SKETCH_BATCH_RESIDUES = 1 << 21
+
+_EMPTY = np.iinfo(np.uint64).max
+_BIN_SHIFT = np.uint64(64 - int(math.log2(SKETCH_BINS)))
+_NUCLEOTIDES = frozenset(b"ACGTUN")
+_GAP_BYTES = b"-.?*"
+
+
+def _residues(sequence: str) -> bytes:
+    return sequence.upper().encode("ascii", errors="replace").translate(None, _GAP_BYTES)
+
+
+def guess_kmer_size(records: list[SequenceRecord]) -> int:
+    """NUCLEOTIDE_KMER when at least 90% of the residues are A/C/G/T/U/N, PROTEIN_KMER otherwise."""
+    sample = b"".join(_residues(record.sequence) for record in records[:200])
+    if not sample:
+        return NUCLEOTIDE_KMER
+    nucleotides = sum(sample.count(bytes([code])) for code in _NUCLEOTIDES)
+    return NUCLEOTIDE_KMER if nucleotides >= 0.9 * len(sample) else PROTEIN_KMER
+
+
+def jaccard_for_identity(identity: float, kmer_size: int) -> float:
+    """
+    The k-mer Jaccard index expected at a given sequence identity, inverting the
+    Mash distance D = -ln(2J / (1 + J)) / k with D taken as 1 - identity.
+    """
+    if not 0 < identity <= 1:
+        raise ValueError(f"Similarity threshold must be above 0 and at most 1, got {identity}.")
+    shared = math.exp(-kmer_size * (1 - identity))
+    return shared / (2 - shared)
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer; uint64 arithmetic wraps, which is what the hash relies on."""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def sketch_records(records: list[SequenceRecord], kmer_size: int, progress=None) -> np.ndarray:
+    """
+    MinHash sketches, one row of SKETCH_BINS uint64 values per record. Bins without
+    any k-mer hold the maximum uint64 value. ``progress`` is called with the share done.
+    """
+    sketches = np.full((len(records), SKETCH_BINS), _EMPTY, dtype=np.uint64)
+    flat_sketches = sketches.reshape(-1)
+    powers = _mix(np.arange(1, kmer_size + 1, dtype=np.uint64))
+    start = 0
+    while start < len(records):
+        # A batch of sequences is concatenated and hashed in one pass; windows that
+        # run across the end of a sequence are dropped afterwards.
+        batch = []
+        residues_total = 0
+        stop = start
+        while stop < len(records) and (residues_total < SKETCH_BATCH_RESIDUES or stop == start):
+            batch.append(_residues(records[stop].sequence))
+            residues_total += len(batch[-1])
+            stop += 1
+        lengths = np.array([len(residues) for residues in batch], dtype=np.int64)
+        if residues_total >= kmer_size:
+            codes = np.frombuffer(b"".join(batch), dtype=np.uint8).astype(np.uint64)
+            windows = sliding_window_view(codes, kmer_size)
+            hashes = _mix((windows * powers).sum(axis=1, dtype=np.uint64))
+            ends = np.cumsum(lengths)
+            rows = np.repeat(np.arange(start, stop, dtype=np.int64), lengths)[: len(hashes)]
+            positions = np.arange(len(hashes), dtype=np.int64)
+            valid = positions + kmer_size <= ends[rows - start]
+            hashes = hashes[valid]
+            cells = rows[valid] * SKETCH_BINS + (hashes >> _BIN_SHIFT).astype(np.int64)
+            np.minimum.at(flat_sketches, cells, hashes)
+        start = stop
+        if progress is not None:
+            progress(start / len(records))
+    return sketches
+
+
+def cluster_records(
+    records: list[SequenceRecord],
+    identity: float = DEFAULT_IDENTITY,
+    kmer_size: int | None = None,
+    progress=None,
+) -> tuple[list[SequenceRecord], dict[str, list[str]]]:
+    """
+    Greedy clustering on MinHash sketches: sequences are visited longest first and join
+    the representative they share most sketch values with if the estimated identity
+    reaches ``identity``; otherwise they start a new cluster. Returns (representatives,
+    clusters) with representatives in input order; clusters maps a representative's ID
+    to the IDs of its other members.
+    """
+    kmer_size = kmer_size or guess_kmer_size(records)
+    if kmer_size < 1:
+        raise ValueError(f"k-mer size must be at least 1, got {kmer_size}.")
+    min_jaccard = jaccard_for_identity(identity, kmer_size)
+
+    def report(share):
+        if progress is not None:
+            progress(share)
+
+    sketches = sketch_records(records, kmer_size, progress=lambda share: report(share / 2))
+    filled = sketches != _EMPTY
+    filled_counts = filled.sum(axis=1)
+    lengths = [len(_residues(record.sequence)) for record in records]
+    order = sorted(range(len(records)), key=lambda row: -lengths[row])
+
+    # Inverted index from sketch value to the representatives holding it, so each
+    # sequence is only compared with representatives it shares a k-mer hash with.
+    postings: dict[int, list[int]] = {}
+    cluster_of = np.empty(len(records), dtype=np.int64)
+    step = max(1, len(order) // 100)
+    for visited, row in enumerate(order, 1):
+        values = sketches[row][filled[row]].tolist()
+        shared = Counter(chain.from_iterable(postings.get(value, ()) for value in values))
+        best = row
+        if shared:
+            rep, matches = shared.most_common(1)[0]
+            # The union of filled bins is at least this row's own, so most pairs are
+            # rejected before the exact union is counted.
+            if matches >= min_jaccard * filled_counts[row]:
+                union = np.count_nonzero(filled[rep] | filled[row])
+                if matches >= min_jaccard * union:
+                    best = rep
+        if best == row:
+            for value in values:
+                postings.setdefault(value, []).append(row)
+        cluster_of[row] = best
+        if visited % step == 0:
+            report(0.5 + visited / len(order) / 2)
+    report(1.0)
+
+    clusters: dict[str, list[str]] = {}
+    representatives = []
+    for row, record in enumerate(records):
+        rep = int(cluster_of[row])
+        if rep == row:
+            representatives.append(record)
+        else:
+            clusters.setdefault(records[rep].seq_id, []).append(record.seq_id)
+    return representatives, clusters
+
+
+def format_reduction_report(total: int, representatives: list[SequenceRecord], identity: float, kmer_size: int) -> str:
+    kept = len(representatives)
+    removed = total - kept
+    return (
+        f"Kept {kept} of {total} sequences ({removed} removed, {removed / total if total else 0:.1%} smaller) "
+        f"at {identity:.0%} estimated identity, k = {kmer_size}."
+    )
+
+
+def reduce_records(records, identity=DEFAULT_IDENTITY, kmer_size=None, progress=None):
+    """
+    Clusters ``records`` and returns (success, message, representatives, clusters);
+    message reports how much the dataset shrank.
+    """
+    if not records:
+        return False, "No sequences to cluster.", [], {}
+    kmer_size = kmer_size or guess_kmer_size(records)
+    try:
+        representatives, clusters = cluster_records(records, identity, kmer_size, progress=progress)
+    except ValueError as e:
+        return False, str(e), [], {}
+    return True, format_reduction_report(len(records), representatives, identity, kmer_size), representatives, clusters
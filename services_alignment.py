@@ -1,24 +1,168 @@
+import os
 import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+from alignment_matrix import DEFAULT_CACHE_DIR, AlignmentMatrix
+from context import SequenceRecord
+from fasta_utils import format_fasta_records, parse_fasta_records
+from sequence_dedup import sequence_digest
 
-def run_mafft(fasta_text, threads=4, mode="auto"):
-    """Executes MAFFT with the given parameters and returns (success, output)."""
-    try:
-        cmd = ["mafft", "--thread", str(threads)]
 
-        if mode == "auto":
-            cmd.append("--auto")
-        elif mode == "linsi":
-            cmd.extend(["--localpair", "--maxiterate", "1000"])
-        elif mode == "ginsi":
-            cmd.extend(["--globalpair", "--maxiterate", "1000"])
-        elif mode == "einsi":
-            cmd.extend(["--genafpair", "--maxiterate", "1000", "--ep", "0"])
+TOURNAMENT_MODES = ("auto", "linsi", "ginsi")
+
+
+def _mafft_mode_args(mode):
+    if mode == "auto":
+        return ["--auto"]
+    if mode == "linsi":
+        return ["--localpair", "--maxiterate", "1000"]
+    if mode == "ginsi":
+        return ["--globalpair", "--maxiterate", "1000"]
+    if mode == "einsi":
+        return ["--genafpair", "--maxiterate", "1000", "--ep", "0"]
+    return []
+
 
-        cmd.append("-")
+def _mafft_command(threads, mode):
+    return ["mafft", "--thread", str(threads), *_mafft_mode_args(mode), "-"]
 
-        result = subprocess.run(cmd, input=fasta_text, text=True, capture_output=True, check=True)
+
+def run_mafft(fasta_text, threads=4, mode="auto"):
+    """Executes MAFFT with the given parameters and returns (success, output)."""
+    try:
+        result = subprocess.run(_mafft_command(threads, mode), input=fasta_text, text=True, capture_output=True, check=True)
         return True, result.stdout
     except (subprocess.CalledProcessError, OSError) as e:
         err = e.stderr if isinstance(e, subprocess.CalledProcessError) and e.stderr else str(e)
         return False, err
+
+
+def split_thread_budget(threads, count):
+    """Shares ``threads`` between ``count`` concurrent runs; every run gets at least one."""
+    base, extra = divmod(max(threads, count), count)
+    return [base + (1 if index < extra else 0) for index in range(count)]
+
+
+def _run_scored_mafft(fasta_text, threads, mode):
+    started = time.perf_counter()
+    result = {"mode": mode, "threads": threads, "ok": False, "error": None, "output": None}
+    success, output = run_mafft(fasta_text, threads, mode)
+    if success:
+        try:
+            alignment = AlignmentMatrix.from_fasta_text(output)
+        except ValueError as e:
+            result["error"] = "MAFFT returned no usable alignment: " + str(e)
+        else:
+            result.update(
+                ok=True,
+                output=output,
+                length=alignment.shape[1],
+                identical_pairs=alignment.sum_of_pairs()[0],
+                sp_score=alignment.sum_of_pairs_score(),
+                column_score=alignment.column_score(),
+            )
+    else:
+        result["error"] = output
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def run_mafft_tournament(fasta_text, threads=4, modes=TOURNAMENT_MODES):
+    """
+    Runs MAFFT in every mode at once, sharing ``threads`` between them, and scores each
+    alignment by its identical residue pairs and fully conserved columns.
+    Returns (success, message, results, best_mode); results follow ``modes``.
+    """
+    budgets = split_thread_budget(threads, len(modes))
+    with ThreadPoolExecutor(max_workers=len(modes)) as pool:
+        results = list(pool.map(lambda args: _run_scored_mafft(fasta_text, *args), zip(budgets, modes)))
+    scored = [result for result in results if result["ok"]]
+    if not scored:
+        return False, "\n".join(f"{result['mode']}: {result['error']}" for result in results), results, None
+    # The count of identical residue pairs decides and the column score breaks ties. The
+    # identity ratio is not used for ranking: gapping residues apart shrinks its
+    # denominator, so an over-gapped alignment could score higher.
+    best = max(scored, key=lambda result: (result["identical_pairs"], result["column_score"]))
+    return True, "MAFFT mode comparison complete", results, best["mode"]
+
+
+def find_appended_records(previous_records, previous_alignment_text, records):
+    """
+    Returns the records that were added since ``previous_alignment_text`` was made from
+    ``previous_records``, or None when the earlier records changed (by ID or sequence hash),
+    nothing was added, or the alignment no longer matches its records.
+    """
+    if not previous_records or not previous_alignment_text:
+        return None
+    try:
+        aligned_ids = [record.seq_id for record in parse_fasta_records(previous_alignment_text)]
+    except ValueError:
+        return None
+    previous_digests = {record.seq_id: sequence_digest(record.sequence) for record in previous_records}
+    if sorted(aligned_ids) != sorted(previous_digests):
+        return None
+    current_ids = {record.seq_id for record in records}
+    if any(seq_id not in current_ids for seq_id in previous_digests):
+        return None
+    appended = []
+    for record in records:
+        digest = previous_digests.get(record.seq_id)
+        if digest is None:
+            appended.append(record)
+        elif digest != sequence_digest(record.sequence):
+            return None
+    return appended or None
+
+
+def run_mafft_add(alignment_text, new_records, threads=4, mode="auto", fragments=False):
+    """
+    Aligns ``new_records`` onto an existing alignment with ``mafft --add`` (or
+    ``--addfragments`` for short or partial sequences) and returns (success, output).
+    """
+    with tempfile.TemporaryDirectory(prefix="phylo_mafft_") as workspace:
+        existing_path = os.path.join(workspace, "existing.fasta")
+        new_path = os.path.join(workspace, "new.fasta")
+        with open(existing_path, "w") as f:
+            f.write(alignment_text)
+        with open(new_path, "w") as f:
+            f.write(format_fasta_records(new_records))
+        add_option = "--addfragments" if fragments else "--add"
+        cmd = ["mafft", "--thread", str(threads), *_mafft_mode_args(mode), add_option, new_path, existing_path]
+        try:
+            result = subprocess.run(cmd, text=True, capture_output=True, check=True)
+            return True, result.stdout
+        except (subprocess.CalledProcessError, OSError) as e:
+            err = e.stderr if isinstance(e, subprocess.CalledProcessError) and e.stderr else str(e)
+            return False, err
+
+
+def project_alignment(alignment_text, records, cache_dir=DEFAULT_CACHE_DIR, aliases=None):
+    """
+    Aligned copies of ``records`` taken from an existing alignment, with columns that are
+    gaps in all of them dropped. A record missing from the alignment takes the row of its
+    entry in ``aliases`` (an identical sequence that was aligned in its place).
+    Raises ValueError if a record is not in the alignment.
+    """
+    alignment = AlignmentMatrix.load(alignment_text, cache_dir)
+    row_by_id = {seq_id: row for row, seq_id in enumerate(alignment.ids)}
+    aliases = aliases or {}
+    for seq_id, representative in aliases.items():
+        if seq_id not in row_by_id and representative in row_by_id:
+            row_by_id[seq_id] = row_by_id[representative]
+    missing = [record.seq_id for record in records if record.seq_id not in row_by_id]
+    if missing:
+        raise ValueError(
+            f"{len(missing)} selected sequences are not in the current alignment, e.g. {missing[0]}."
+        )
+    projected = alignment.project([row_by_id[record.seq_id] for record in records])
+    return [
+        SequenceRecord(
+            seq_id=record.seq_id,
+            header=record.header,
+            description=record.description,
+            sequence=projected.sequence(row),
+        )
+        for row, record in enumerate(records)
+    ]
@@ -1,14 +1,24 @@
 import atexit
-import html
+import hashlib
 import shutil
 import subprocess
 import sys
 import tempfile
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from types import ModuleType
 
 import TkEasyGUI as eg
-from remap_support_labels import remap_support_labels
+from newick_tree import leaf_label_changes, parse_newick
+from remap_support_labels import midpoint_root_with_support_labels
+from selection_channel import SELECTION_EVENT, SelectionChannel, decode_leaf_selection
+from ui_common import run_with_progress
+
+# Display trees by SHA-256 of the source Newick, so repeated "View Tree" clicks
+# on an unchanged tree skip rooting and relabeling.
+_DISPLAY_TREE_CACHE_SIZE = 8
+_DISPLAY_TREE_CACHE = OrderedDict()
+_DISPLAY_TREE_CACHE_LOCK = threading.Lock()
 
 
 def _get_tree_text(win) -> str:
@@ -18,78 +28,195 @@ def _get_tree_text(win) -> str:
     return getattr(win, "tree_content", "").strip()
 
 
-def _install_cgi_compat():
-    """Provide the minimal cgi.escape API expected by older ete3 code."""
-    if "cgi" in sys.modules:
-        return
-    cgi_module = ModuleType("cgi")
-    cgi_module.escape = html.escape
-    sys.modules["cgi"] = cgi_module
+def _display_tree_key(newick_text: str) -> str:
+    return hashlib.sha256(newick_text.encode("utf-8")).hexdigest()
 
 
-def _midpoint_root_newick(newick_text: str) -> str:
-    _install_cgi_compat()
-    from ete3 import Tree
+def _cached_display_tree(key: str):
+    with _DISPLAY_TREE_CACHE_LOCK:
+        cached = _DISPLAY_TREE_CACHE.get(key)
+        if cached is not None:
+            _DISPLAY_TREE_CACHE.move_to_end(key)
+        return cached
 
-    tree = Tree(newick_text, format=1)
-    outgroup = tree.get_midpoint_outgroup()
-    if outgroup is not None:
-        tree.set_outgroup(outgroup)
-    return tree.write(format=1)
 
+def _prepare_display_newick(newick_text: str) -> tuple[str, bool, str | None]:
+    """
+    Midpoint-rooted display copy of a tree with its support labels remapped, cached by tree hash.
+    Failures fall back to the original tree and are not cached, so the next view retries.
+    """
+    key = _display_tree_key(newick_text)
+    cached = _cached_display_tree(key)
+    if cached is not None:
+        return cached
+    try:
+        rooted_text, _ = midpoint_root_with_support_labels(newick_text, suppress_root_duplicate_labels=False)
+    except Exception as exc:
+        return newick_text, False, f"Midpoint rooting failed: {exc}"
+    prepared = (rooted_text, True, None)
+    with _DISPLAY_TREE_CACHE_LOCK:
+        _DISPLAY_TREE_CACHE[key] = prepared
+        while len(_DISPLAY_TREE_CACHE) > _DISPLAY_TREE_CACHE_SIZE:
+            _DISPLAY_TREE_CACHE.popitem(last=False)
+    return prepared
+
+
+def _prepare_display_newick_in_background(win, newick_text: str) -> tuple[str, bool, str | None]:
+    """Return a cached display tree at once; otherwise prepare it off the Tk thread behind a progress window."""
+    cached = _cached_display_tree(_display_tree_key(newick_text))
+    if cached is not None:
+        return cached
+    return run_with_progress(
+        "Preparing the tree view (midpoint rooting and support labels)...",
+        _prepare_display_newick,
+        newick_text,
+        parent_window=win,
+        confirm_on_success=False,
+    )
 
-def _write_display_tree(newick_text: str) -> tuple[Path, bool, str | None]:
+
+def _write_display_tree(rooted_text: str) -> Path:
     tmp_dir = Path(tempfile.mkdtemp(prefix="phylotree_display_"))
     atexit.register(shutil.rmtree, tmp_dir, ignore_errors=True)
     newick_path = tmp_dir / "display_tree.nwk"
-    rooted_text = newick_text
-    rooted_ok = False
-    error_messages = []
-    try:
-        rooted_text = _midpoint_root_newick(newick_text)
-        rooted_ok = True
-    except Exception as exc:
-        rooted_text = newick_text
-        error_messages.append(f"Midpoint rooting failed: {exc}")
-
-    if rooted_ok:
-        try:
-            rooted_text, _ = remap_support_labels(
-                newick_text,
-                rooted_text,
-                suppress_root_duplicate_labels=False,
-            )
-        except Exception as exc:
-            error_messages.append(f"Support relabeling failed: {exc}")
     newick_path.write_text(rooted_text, encoding="utf-8")
-    error_message = "\n".join(error_messages) if error_messages else None
-    return newick_path, rooted_ok, error_message
+    return newick_path
+
+
+def _set_view_leaf_order(win, rendered_text: str):
+    """Remember the preorder leaf names of the tree the viewer renders; selections arrive as indices into it."""
+    try:
+        tree = parse_newick(rendered_text)
+        leaf_names = [tree.names[leaf] for leaf in tree.leaf_nodes]
+    except ValueError:
+        leaf_names = None
+    setattr(win, "tree_view_leaf_names", leaf_names)
+    setattr(win, "tree_view_leaf_labels", {})
+    setattr(win, "tree_view_leaf_records", None)
+
+
+def _view_leaf_records(win, leaf_labels: list[str]) -> list[int]:
+    """Record index in context.original_records for every view leaf, or -1; built once per view."""
+    table = getattr(win, "tree_view_leaf_records", None)
+    if table is None:
+        context = win.context
+        positions = {}
+        for position, record in enumerate(context.original_records):
+            positions.setdefault(record.seq_id, position)
+        label_map = context.leaf_label_map
+        table = [positions.get(label_map.get(label, label), -1) for label in leaf_labels]
+        setattr(win, "tree_view_leaf_records", table)
+    return table
+
+
+def resolve_tree_selection(win, payload: dict) -> tuple[list[str], list[int] | None]:
+    """
+    Decode a viewer selection into leaf labels and record indices.
+    Record indices are None for payloads that only list leaf names.
+    """
+    leaf_names = getattr(win, "tree_view_leaf_names", None)
+    if leaf_names is None:
+        return list(payload.get("selected_leaf_names", [])), None
+    indices = decode_leaf_selection(payload, len(leaf_names))
+    if indices is None:
+        return list(payload.get("selected_leaf_names", [])), None
+    labels = getattr(win, "tree_view_leaf_labels", {})
+    leaf_labels = [labels.get(name, name) for name in leaf_names]
+    records = _view_leaf_records(win, leaf_labels)
+    return [leaf_labels[leaf] for leaf in indices], sorted(records[leaf] for leaf in indices if records[leaf] >= 0)
+
+
+def _write_view_sequences(win, display_tree_path: Path) -> Path | None:
+    """Put the session's input sequences next to the display tree so the viewer can serve clade FASTA."""
+    context = getattr(win, "context", None)
+    fasta_text = context.original_fasta_text if context is not None else ""
+    if not fasta_text:
+        return None
+    sequences_path = display_tree_path.with_name("sequences.fa")
+    sequences_path.write_text(fasta_text, encoding="utf-8")
+    return sequences_path
 
 
 def _launch_interactive_viewer(newick_path: Path):
     return _launch_interactive_viewer_with_selection(newick_path, None)
 
 
-def _launch_interactive_viewer_with_selection(newick_path: Path, selection_output_path: Path | None):
+def _launch_interactive_viewer_with_selection(
+    newick_path: Path,
+    selection_channel: SelectionChannel | None,
+    sequences_path: Path | None = None,
+):
     viewer_path = Path(__file__).resolve().parent / "interactive_tree_viewer.py"
     cmd = [sys.executable, str(viewer_path), "--newick-file", str(newick_path)]
-    if selection_output_path is not None:
-        cmd.extend(["--selection-output", str(selection_output_path)])
+    if sequences_path is not None:
+        cmd.extend(["--sequences-fasta", str(sequences_path)])
+    env = None
+    if selection_channel is not None:
+        cmd.extend(["--selection-channel", selection_channel.address])
+        env = selection_channel.client_environment()
     subprocess.Popen(
         cmd,
         stdout=subprocess.DEVNULL,
         stderr=subprocess.DEVNULL,
         start_new_session=True,
+        env=env,
     )
 
 
 def create_tree_view_session(win):
-    session_dir = Path(tempfile.mkdtemp(prefix="phylotree_selection_"))
-    atexit.register(shutil.rmtree, session_dir, ignore_errors=True)
-    selection_path = session_dir / "selection.json"
-    setattr(win, "tree_selection_path", selection_path)
-    setattr(win, "tree_selection_seen_mtime_ns", None)
-    return selection_path
+    """
+    Return the window's selection channel, opening it on first use.
+    Selections arrive as SELECTION_EVENT events posted to the window's event
+    queue, so the window's read() loop needs no polling timeout.
+    """
+    channel = getattr(win, "tree_selection_channel", None)
+    if channel is None:
+        channel = SelectionChannel(lambda payload: win.post_event(SELECTION_EVENT, {SELECTION_EVENT: payload}))
+        setattr(win, "tree_selection_channel", channel)
+    return channel
+
+
+def close_tree_view_session(win):
+    channel = getattr(win, "tree_selection_channel", None)
+    if channel is not None:
+        channel.close()
+        setattr(win, "tree_selection_channel", None)
+
+
+def _label_only_changes(old_text: str, new_text: str) -> dict[str, str] | None:
+    try:
+        return leaf_label_changes(parse_newick(old_text), parse_newick(new_text))
+    except ValueError:
+        return None
+
+
+def push_tree_update(win) -> bool:
+    """
+    Send the window's current tree to the viewers it has open.
+    Leaf renames travel as a label map so the open view keeps its layout;
+    any other edit re-renders the tree. Returns False when no viewer page is open.
+    """
+    channel = getattr(win, "tree_selection_channel", None)
+    base_text = getattr(win, "tree_view_source_text", None)
+    newick_text = _get_tree_text(win)
+    if channel is None or base_text is None or not newick_text or channel.live_viewer_count() == 0:
+        return False
+    if newick_text == getattr(win, "tree_view_pushed_text", base_text):
+        return True
+    labels = _label_only_changes(base_text, newick_text)
+    if labels is not None:
+        channel.broadcast({"type": "labels", "labels": labels})
+        setattr(win, "tree_view_leaf_labels", labels)
+        setattr(win, "tree_view_leaf_records", None)
+    else:
+        rooted_text, rooted_ok, error_message = _prepare_display_newick_in_background(win, newick_text)
+        if not rooted_ok:
+            eg.popup("Midpoint rooting failed. Showing the original tree instead.\n" + error_message)
+        channel.broadcast({"type": "tree", "newick": rooted_text})
+        setattr(win, "tree_view_source_text", newick_text)
+        _set_view_leaf_order(win, rooted_text)
+    setattr(win, "tree_view_pushed_text", newick_text)
+    return True
 
 
 def handle_view_tree(win):
@@ -99,14 +226,21 @@ def handle_view_tree(win):
         if not newick_text:
             eg.popup("Tree data is empty.")
             return
-        display_tree_path, rooted_ok, error_message = _write_display_tree(newick_text)
+        if push_tree_update(win):
+            return
+        rooted_text, rooted_ok, error_message = _prepare_display_newick_in_background(win, newick_text)
+        display_tree_path = _write_display_tree(rooted_text)
         setattr(win, "display_tree_path", display_tree_path)
-        selection_path = create_tree_view_session(win)
-        _launch_interactive_viewer_with_selection(display_tree_path, selection_path)
-        if error_message:
-            if rooted_ok:
-                eg.popup("Tree preprocessing warning:\n" + error_message)
-            else:
-                eg.popup("Midpoint rooting failed. Showing the original tree instead.\n" + error_message)
+        _set_view_leaf_order(win, rooted_text)
+        setattr(win, "tree_view_source_text", newick_text)
+        setattr(win, "tree_view_pushed_text", newick_text)
+        selection_channel = create_tree_view_session(win)
+        _launch_interactive_viewer_with_selection(
+            display_tree_path,
+            selection_channel,
+            _write_view_sequences(win, display_tree_path),
+        )
+        if not rooted_ok:
+            eg.popup("Midpoint rooting failed. Showing the original tree instead.\n" + error_message)
     except Exception as e:
         eg.popup("Failed to display tree:\n" + str(e))
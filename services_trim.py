@@ -1,6 +1,13 @@
 import os
 import subprocess
 import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from alignment_matrix import AlignmentMatrix
+
+
+COMPARE_MODES = ("automated1", "gappyout", "strict", "strictplus", "nogaps")
 
 
 def get_trimal_version():
@@ -13,31 +20,146 @@ def get_trimal_version():
         return "Failed to retrieve version"
 
 
-def run_trimal(trim_input, mode):
+def trim_workspace_root():
+    """Directory for trimal's scratch files: /dev/shm when it is usable, otherwise the system temp dir."""
+    shm = "/dev/shm"
+    if os.path.isdir(shm) and os.access(shm, os.W_OK | os.X_OK):
+        return shm
+    return None
+
+
+def _write_trim_input(workspace, trim_input):
+    input_path = os.path.join(workspace, "input.fasta")
+    with open(input_path, "w") as f:
+        f.write(trim_input)
+    return input_path
+
+
+def _trimal_mode_args(mode, gap_threshold=None):
+    return [f"-{mode}", str(gap_threshold)] if mode == "gt" else [f"-{mode}"]
+
+
+def run_trimal(trim_input, mode, gap_threshold=None):
+    """
+    Runs trimal and returns (success, message, trimmed_result, alignment).
+    The trimmed alignment is read from trimal's stdout instead of an output file and
+    parsed into an AlignmentMatrix. trimmed_result is the decoded text of the same
+    output, kept because it becomes the next stage's input, so the result is held
+    twice. The input only lives in a scratch workspace (on tmpfs when available) for
+    the duration of the run. Mode "gt" runs ``-gt gap_threshold``.
+    On failure, message contains stderr.
+    """
+    with tempfile.TemporaryDirectory(prefix="phylo_trim_", dir=trim_workspace_root()) as workspace:
+        input_path = _write_trim_input(workspace, trim_input)
+        cmd = ["trimal", "-in", input_path, "-fasta", *_trimal_mode_args(mode, gap_threshold)]
+        try:
+            completed = subprocess.run(cmd, capture_output=True, check=True)
+        except (subprocess.CalledProcessError, OSError) as e:
+            if isinstance(e, subprocess.CalledProcessError) and e.stderr:
+                return False, e.stderr.decode("utf-8", errors="replace"), None, None
+            return False, str(e), None, None
+    try:
+        alignment = AlignmentMatrix.from_fasta_bytes(completed.stdout)
+    except ValueError as e:
+        return False, "trimal returned no usable alignment: " + str(e), None, None
+    trimmed_result = completed.stdout.decode("utf-8", errors="replace")
+    return True, "trimal execution complete", trimmed_result, alignment
+
+
+def write_trimal_report(trim_input, mode, gap_threshold=None):
     """
-    Runs trimal and returns (success, message, trimmed_result, output_path, html_path).
-    On failure, message contains stderr and temp files are cleaned up.
+    Runs the whole trim again with ``-htmlout`` to produce trimal's HTML report and
+    returns (success, message, html_path). The caller removes html_path when it is
+    no longer shown.
     """
-    with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".fasta") as temp_in:
-        input_path = temp_in.name
-        temp_in.write(trim_input)
-    with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".fasta") as temp_out:
-        output_path = temp_out.name
     with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".html") as temp_html:
         html_path = temp_html.name
+    with tempfile.TemporaryDirectory(prefix="phylo_trim_", dir=trim_workspace_root()) as workspace:
+        input_path = _write_trim_input(workspace, trim_input)
+        cmd = ["trimal", "-in", input_path, "-htmlout", html_path, *_trimal_mode_args(mode, gap_threshold)]
+        try:
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+        except (subprocess.CalledProcessError, OSError) as e:
+            if os.path.exists(html_path):
+                os.remove(html_path)
+            err = e.stderr if isinstance(e, subprocess.CalledProcessError) and e.stderr else str(e)
+            return False, err, None
+    return True, "trimal report complete", html_path
+
+
+def parse_column_map(stdout):
+    """Returns the 0-based input columns listed on trimal's ``#ColumnsMap`` line, or None."""
+    for line in stdout.splitlines():
+        if line.startswith("#ColumnsMap"):
+            numbers = line[len("#ColumnsMap"):].replace(",", " ").split()
+            return [int(number) for number in numbers]
+    return None
+
+
+def format_column_ranges(columns):
+    """Formats sorted column indices as compact inclusive ranges, e.g. "0-4, 7, 9-12"."""
+    ranges = []
+    for column in columns:
+        if ranges and ranges[-1][1] == column - 1:
+            ranges[-1][1] = column
+        else:
+            ranges.append([column, column])
+    return ", ".join(str(start) if start == end else f"{start}-{end}" for start, end in ranges)
 
-    cmd = ["trimal", "-in", input_path, "-out", output_path, "-htmlout", html_path, f"-{mode}"]
+
+def _run_trimal_mode(input_path, mode):
+    output_path = os.path.join(os.path.dirname(input_path), f"{mode}.fasta")
+    started = time.perf_counter()
+    result = {"mode": mode, "ok": False, "error": None, "columns": None, "length": 0, "gap_fraction": None}
+    try:
+        completed = subprocess.run(
+            ["trimal", "-in", input_path, "-out", output_path, f"-{mode}", "-colnumbering"],
+            text=True,
+            capture_output=True,
+            check=True,
+        )
+        columns = parse_column_map(completed.stdout)
+        if columns is None:
+            raise ValueError("trimal did not report a column map.")
+        with open(output_path, "rb") as f:
+            trimmed = AlignmentMatrix.from_fasta_bytes(f.read())
+        result.update(
+            ok=True,
+            columns=columns,
+            length=len(columns),
+            gap_fraction=float(trimmed.gap_fraction().mean()) if columns else 0.0,
+        )
+    except subprocess.CalledProcessError as e:
+        result["error"] = e.stderr or str(e)
+    except (OSError, ValueError) as e:
+        result["error"] = str(e)
+    finally:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def compare_trimal_modes(trim_input, modes=COMPARE_MODES, max_workers=None):
+    """
+    Runs trimal once per mode, all at the same time, on one shared input file.
+    Returns (success, message, results, input_columns); results follow ``modes``
+    and hold each mode's kept column map, retained length and gap fraction.
+    """
     try:
-        subprocess.run(cmd, text=True, capture_output=True, check=True)
-    except (subprocess.CalledProcessError, OSError) as e:
-        for p in (input_path, output_path, html_path):
-            if os.path.exists(p):
-                os.remove(p)
-        err = e.stderr if isinstance(e, subprocess.CalledProcessError) and e.stderr else str(e)
-        return False, err, None, None, None
-
-    if os.path.exists(input_path):
-        os.remove(input_path)
-    with open(output_path, "r") as f:
-        trimmed_result = f.read()
-    return True, "trimal execution complete", trimmed_result, output_path, html_path
+        input_columns = AlignmentMatrix.from_fasta_text(trim_input).shape[1]
+    except ValueError as e:
+        return False, str(e), [], 0
+    workers = max_workers or max(1, min(len(modes), os.cpu_count() or 1))
+    with tempfile.TemporaryDirectory(prefix="phylo_trim_", dir=trim_workspace_root()) as workspace:
+        input_path = _write_trim_input(workspace, trim_input)
+        # Each trimal is a separate process, so threads are enough to run them in parallel.
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda mode: _run_trimal_mode(input_path, mode), modes))
+    failed = [result["mode"] for result in results if not result["ok"]]
+    if len(failed) == len(results):
+        return False, "\n".join(f"{result['mode']}: {result['error']}" for result in results), results, input_columns
+    message = "trimal mode comparison complete"
+    if failed:
+        message += " (failed: " + ", ".join(failed) + ")"
+    return True, message, results, input_columns
@@ -0,0 +1,21 @@
+import os
+import stat
+import sys
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+
+def install_fake_tool(test_case, name, source):
+    """
+    Writes ``source`` as an executable Python script called ``name`` and puts its
+    directory first on PATH until ``test_case`` finishes.
+    """
+    temp_dir = tempfile.TemporaryDirectory()
+    test_case.addCleanup(temp_dir.cleanup)
+    script = Path(temp_dir.name) / name
+    script.write_text(f"#!{sys.executable}\n" + source)
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    path_patch = patch.dict(os.environ, {"PATH": temp_dir.name + os.pathsep + os.environ.get("PATH", "")})
+    path_patch.start()
+    test_case.addCleanup(path_patch.stop)
@@ -0,0 +1,89 @@
+import math
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+
+from alignment_matrix import CACHE_KEEP, AlignmentMatrix, alignment_summary_text
+
+
+FASTA = """>a first
+ACGT-
+>b
+ACGA-
+>c
+A-GT-
+"""
+
+
+class AlignmentMatrixTests(unittest.TestCase):
+    def test_column_statistics(self):
+        alignment = AlignmentMatrix.from_fasta_text(FASTA)
+
+        self.assertEqual(alignment.ids, ["a", "b", "c"])
+        self.assertEqual(alignment.shape, (3, 5))
+        np.testing.assert_allclose(alignment.gap_fraction(), [0, 1 / 3, 0, 0, 1])
+        entropy = alignment.column_entropy()
+        self.assertEqual(entropy[0], 0)
+        self.assertAlmostEqual(entropy[3], -(2 / 3 * math.log2(2 / 3) + 1 / 3 * math.log2(1 / 3)))
+        self.assertEqual(entropy[4], 0)
+        np.testing.assert_allclose(alignment.sequence_coverage(), [0.8, 0.8, 0.6])
+
+    def test_pairwise_identity_ignores_gapped_columns(self):
+        identity = AlignmentMatrix.from_fasta_text(FASTA).pairwise_identity()
+
+        np.testing.assert_allclose(np.diag(identity), 1)
+        self.assertAlmostEqual(float(identity[0, 1]), 0.75)
+        self.assertAlmostEqual(float(identity[1, 2]), 2 / 3)
+        np.testing.assert_array_equal(identity, identity.T)
+
+    def test_sum_of_pairs_and_column_scores(self):
+        alignment = AlignmentMatrix.from_fasta_text(FASTA)
+
+        # Identical / aligned residue pairs per column: AAA 3/3, CC- 1/1, GGG 3/3, TAT 1/3, --- 0/0.
+        self.assertEqual(alignment.sum_of_pairs(), (8, 10))
+        self.assertAlmostEqual(alignment.sum_of_pairs_score(), 0.8)
+        self.assertAlmostEqual(alignment.column_score(), 0.4)
+
+    def test_unaligned_input_is_rejected(self):
+        with self.assertRaisesRegex(ValueError, "not aligned: b"):
+            AlignmentMatrix.from_fasta_text(">a\nACGT\n>b\nACG\n")
+        self.assertIn("unavailable", alignment_summary_text("ACGT", cache_dir=None))
+
+    def test_cached_matrix_is_memory_mapped(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            first = AlignmentMatrix.load(FASTA, temp_dir)
+            second = AlignmentMatrix.load(FASTA, temp_dir)
+
+            self.assertIsInstance(second.matrix, np.memmap)
+            self.assertEqual(second.ids, first.ids)
+            np.testing.assert_array_equal(second.matrix, first.matrix)
+            self.assertEqual(len(list(Path(temp_dir).glob("*.npy"))), 1)
+
+    def test_cache_pruning_leaves_partial_writes_alone(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            partial = Path(temp_dir) / "feed.1234.partial.npy"
+            np.save(partial, np.zeros((1, 1), dtype=np.uint8))
+            for index in range(CACHE_KEEP + 2):
+                AlignmentMatrix.load(f">s{index}\nACGT\n", temp_dir)
+
+            self.assertTrue(partial.exists())
+            self.assertEqual(len(list(Path(temp_dir).glob("*.npy"))), CACHE_KEEP + 1)
+
+    def test_failed_cache_write_leaves_no_files_behind(self):
+        def save_then_fail(path, matrix):
+            Path(path).write_bytes(b"partial")
+            raise OSError("disk full")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch("alignment_matrix.np.save", side_effect=save_then_fail):
+                alignment = AlignmentMatrix.load(FASTA, temp_dir)
+
+            self.assertEqual(alignment.shape, (3, 5))
+            self.assertEqual(list(Path(temp_dir).iterdir()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+import numpy as np
+
+from alignment_matrix import AlignmentMatrix
+from distance_tree import build_quick_tree, distance_matrix, neighbor_joining
+from newick_tree import parse_newick
+
+
+class DistanceTreeTests(unittest.TestCase):
+    def test_p_distance_skips_gaps_and_jc_corrects_it(self):
+        alignment = AlignmentMatrix.from_fasta_text(">a\nACGTACGT\n>b\nACGTACGA\n>c\nAC--ACGT\n")
+
+        p_distances = distance_matrix(alignment, "p", block_rows=2, block_columns=3)
+        jc_distances = distance_matrix(alignment, "jc")
+
+        self.assertAlmostEqual(p_distances[0, 1], 1 / 8)
+        self.assertAlmostEqual(p_distances[0, 2], 0.0)
+        self.assertAlmostEqual(p_distances[1, 2], 1 / 6)
+        self.assertAlmostEqual(jc_distances[0, 1], -0.75 * np.log(1 - 4 / 3 * 1 / 8))
+        self.assertTrue((p_distances == p_distances.T).all())
+        with self.assertRaisesRegex(ValueError, "Unknown distance model"):
+            distance_matrix(alignment, "k2p")
+
+    def test_neighbor_joining_recovers_an_additive_tree(self):
+        distances = np.array(
+            [
+                [0, 5, 9, 9, 8],
+                [5, 0, 10, 10, 9],
+                [9, 10, 0, 8, 7],
+                [9, 10, 8, 0, 3],
+                [8, 9, 7, 3, 0],
+            ],
+            dtype=float,
+        )
+
+        newick_text = neighbor_joining(distances, ["a", "b", "c", "d", "e"])
+
+        self.assertEqual(newick_text, "(((a:2,b:3):3,c:4):2,e:1,d:2);")
+        with self.assertRaisesRegex(ValueError, "at least three"):
+            neighbor_joining(distances[:2, :2], ["a", "b"])
+
+    def test_quick_tree_names_every_sequence(self):
+        fasta_text = ">s1\nACGTACGTAA\n>s2 second\nACGTACGTAT\n>s3\nACGAACGTTT\n>s4\nTCGAACCTTT\n"
+
+        success, message, newick_text = build_quick_tree(fasta_text, "jc", cache_dir=None)
+
+        self.assertTrue(success, message)
+        self.assertIn("4 sequences", message)
+        self.assertEqual(sorted(parse_newick(newick_text).leaf_names()), ["s1", "s2", "s3", "s4"])
+        self.assertFalse(build_quick_tree(">s1\nAC\n>s2\nAC\n", "p", cache_dir=None)[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
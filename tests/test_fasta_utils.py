@@ -1,6 +1,8 @@
+import tempfile
 import unittest
+from pathlib import Path
 
-from fasta_utils import parse_fasta_records
+from fasta_utils import build_leaf_label_map, index_fasta_file, iter_indexed_fasta, parse_fasta_records
 
 
 class ParseFastaRecordsTests(unittest.TestCase):
@@ -18,5 +20,25 @@ class ParseFastaRecordsTests(unittest.TestCase):
         self.assertEqual(records[0].sequence, "ACGT")
 
 
+class IndexedFastaTests(unittest.TestCase):
+    def test_records_are_streamed_by_offset(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fasta_path = Path(temp_dir) / "seqs.fa"
+            fasta_path.write_bytes(b">a first\nACGT\nAC\n>b\nGG\n>c\nTT")
+            index = index_fasta_file(fasta_path)
+
+            self.assertEqual(sorted(index), ["a", "b", "c"])
+            streamed = b"".join(iter_indexed_fasta(fasta_path, index, ["c", "a"], chunk_size=3))
+            self.assertEqual(streamed, b">c\nTT\n>a first\nACGT\nAC\n")
+
+
+class LeafLabelMapTests(unittest.TestCase):
+    def test_annotated_labels_resolve_to_longest_id(self):
+        records = parse_fasta_records(">AT1\nA\n>AT1<x\nC\n>B\nG\n")
+        label_map = build_leaf_label_map(records, "((AT1<x<gene>:1,AT1<gene>:1):1,B:1,C<y>:1);")
+
+        self.assertEqual(label_map, {"AT1<x<gene>": "AT1<x", "AT1<gene>": "AT1", "B": "B"})
+
+
 if __name__ == "__main__":
     unittest.main()
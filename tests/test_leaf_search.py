@@ -0,0 +1,31 @@
+import re
+import unittest
+
+from leaf_search import LeafSearchIndex
+
+
+class LeafSearchIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.index = LeafSearchIndex(["AT1G01010 NAC001", "AT1G01020", "Os01g0100100", "at5g99999 nac"])
+
+    def test_substring_search_ignores_case(self):
+        self.assertEqual(self.index.search("nac"), ([0, 3], 2))
+        self.assertEqual(self.index.search("g0"), ([0, 1, 2], 3))
+        self.assertEqual(self.index.search("zzz"), ([], 0))
+
+    def test_regex_search_anchors_on_each_label(self):
+        self.assertEqual(self.index.search(r"^at\dg010[12]", regex=True), ([0, 1], 2))
+        self.assertEqual(self.index.search(r"nac$", regex=True), ([3], 1))
+        with self.assertRaises(re.error):
+            self.index.search("(", regex=True)
+
+    def test_regex_matches_do_not_span_labels(self):
+        self.assertEqual(self.index.search(r"[^x]+", regex=True), ([0, 1, 2, 3], 4))
+        self.assertEqual(self.index.search(r"0\s+a", regex=True), ([], 0))
+
+    def test_limit_keeps_total(self):
+        self.assertEqual(self.index.search("g", limit=2), ([0, 1], 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
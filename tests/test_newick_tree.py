@@ -0,0 +1,45 @@
+import unittest
+
+from newick_tree import build_view, leaf_label_changes, parse_newick, write_newick
+
+
+class NewickTreeTests(unittest.TestCase):
+    def test_round_trip_preserves_labels_lengths_and_quoting(self):
+        newick_text = "((A:1,'B c':2)90:0.5,(C,(D,E)80:1)70:2,F)root;"
+
+        self.assertEqual(write_newick(parse_newick(newick_text)), newick_text)
+
+    def test_subtrees_are_contiguous_leaf_intervals(self):
+        tree = parse_newick("((A,B)X,(C,(D,E)Y)Z,F);")
+        node_y = tree.names.index("Y")
+
+        self.assertEqual(tree.leaf_names(), ["A", "B", "C", "D", "E", "F"])
+        self.assertEqual(tree.leaf_names(node_y), ["D", "E"])
+        self.assertEqual(tree.leaf_count(tree.names.index("Z")), 3)
+
+    def test_view_replaces_deep_clades_with_placeholders(self):
+        tree = parse_newick("((A:1,B:1)X:1,(C:1,(D:1,E:1)Y:1)Z:2,F:1);")
+
+        view, placeholders = build_view(tree, max_depth=1, inline_leaves=1)
+
+        self.assertEqual(view, "(__clade_1:1,__clade_4:2,F:1);")
+        self.assertEqual(placeholders["__clade_4"], {"node": 4, "leafCount": 3, "leafStart": 2})
+        subtree, _ = build_view(tree, 4, max_depth=1, inline_leaves=1)
+        self.assertEqual(subtree, "(C:1,__clade_6:1)Z")
+
+    def test_unbalanced_input_is_rejected(self):
+        with self.assertRaisesRegex(ValueError, "Unbalanced"):
+            parse_newick("((A,B);")
+
+    def test_label_changes_only_when_topology_is_unchanged(self):
+        old = parse_newick("((AT1G01010:1,B:2)90:0.5,C:1);")
+        renamed = parse_newick("((AT1G01010<NAC001>:1,B:2)90:0.5,C:1);")
+        regrouped = parse_newick("((AT1G01010:1,C:1)90:0.5,B:2);")
+
+        self.assertEqual(leaf_label_changes(old, renamed), {"AT1G01010": "AT1G01010<NAC001>"})
+        self.assertEqual(leaf_label_changes(old, old), {})
+        self.assertIsNone(leaf_label_changes(old, regrouped))
+
+
+if __name__ == "__main__":
+    unittest.main()
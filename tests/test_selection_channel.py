@@ -0,0 +1,79 @@
+import base64
+import os
+import queue
+import time
+import unittest
+from unittest.mock import patch
+
+from selection_channel import (
+    CHANNEL_KEY_ENV,
+    SelectionChannel,
+    SelectionSender,
+    decode_leaf_selection,
+    encode_leaf_ranges,
+    parse_channel_address,
+)
+
+
+class SelectionChannelTests(unittest.TestCase):
+    def test_payload_reaches_gui_callback(self):
+        received = queue.Queue()
+        channel = SelectionChannel(received.put)
+        try:
+            with patch.dict(os.environ, {CHANNEL_KEY_ENV: channel.client_environment()[CHANNEL_KEY_ENV]}):
+                sender = SelectionSender.from_environment(channel.address)
+            try:
+                sender.send({"selected_leaf_names": ["A", "B"]})
+                self.assertEqual(received.get(timeout=5), {"selected_leaf_names": ["A", "B"]})
+            finally:
+                sender.close()
+        finally:
+            channel.close()
+
+    def test_broadcast_reaches_only_viewers_with_open_pages(self):
+        channel = SelectionChannel(lambda payload: None)
+        received = queue.Queue()
+        try:
+            sender = SelectionSender(channel.address, channel.authkey)
+            try:
+                sender.start_receiving(received.put)
+                self.assertEqual(channel.broadcast({"type": "labels", "labels": {}}), 0)
+                sender.report_open_pages(1)
+                for _ in range(500):
+                    if channel.live_viewer_count() == 1:
+                        break
+                    time.sleep(0.01)
+                self.assertEqual(channel.broadcast({"type": "labels", "labels": {"A": "B"}}), 1)
+                self.assertEqual(received.get(timeout=5), {"type": "labels", "labels": {"A": "B"}})
+            finally:
+                sender.close()
+        finally:
+            channel.close()
+
+    def test_wrong_key_is_rejected(self):
+        channel = SelectionChannel(lambda payload: None)
+        try:
+            with self.assertRaises(Exception):
+                SelectionSender(channel.address, b"not-the-key")
+        finally:
+            channel.close()
+
+    def test_compact_selection_round_trips(self):
+        selected = [0, 1, 2, 7, 9, 10]
+        ranges = encode_leaf_ranges([10, 2, 1, 0, 9, 7, 7])
+        self.assertEqual(ranges, [0, 3, 7, 8, 9, 11])
+        self.assertEqual(decode_leaf_selection({"leaf_count": 12, "selected_leaf_ranges": ranges}, 12), selected)
+        bitmap = base64.b64encode(bytes([0b10000111, 0b00000110])).decode("ascii")
+        self.assertEqual(decode_leaf_selection({"leaf_count": 12, "selected_leaf_bitmap": bitmap}, 12), selected)
+        self.assertIsNone(decode_leaf_selection({"selected_leaf_names": ["A"]}, 12))
+        with self.assertRaises(ValueError):
+            decode_leaf_selection({"leaf_count": 11, "selected_leaf_ranges": ranges}, 12)
+
+    def test_address_must_include_port(self):
+        self.assertEqual(parse_channel_address("127.0.0.1:8123"), ("127.0.0.1", 8123))
+        with self.assertRaises(ValueError):
+            parse_channel_address("127.0.0.1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+from context import AnalysisContext, SequenceRecord
+from fasta_utils import build_leaf_label_map
+from newick_tree import parse_newick
+from sequence_dedup import (
+    collapse_identical_records,
+    expand_identical_leaves,
+    member_aliases,
+    merge_identical_groups,
+)
+from services_alignment import project_alignment
+
+
+def _records(*pairs):
+    return [SequenceRecord(seq_id=seq_id, header=seq_id, sequence=sequence) for seq_id, sequence in pairs]
+
+
+class SequenceDedupTests(unittest.TestCase):
+    def test_first_record_represents_identical_sequences(self):
+        records = _records(("A", "ACGT"), ("B", "acg-t"), ("C", "AGGT"), ("D", "ACGT"))
+
+        representatives, groups = collapse_identical_records(records)
+
+        self.assertEqual([record.seq_id for record in representatives], ["A", "C"])
+        self.assertEqual(groups, {"A": ["B", "D"]})
+        _, aligned_groups = collapse_identical_records(records, ignore_gaps=False)
+        self.assertEqual(aligned_groups, {"A": ["D"]})
+
+    def test_chained_passes_merge_into_one_group(self):
+        merged = merge_identical_groups({"A": ["B"], "C": ["D", "E"]}, {"A": ["C"]})
+
+        self.assertEqual(merged, {"A": ["B", "C", "D", "E"]})
+        self.assertEqual(member_aliases(merged)["E"], "A")
+
+    def test_expanded_tree_holds_every_original_id_on_zero_branches(self):
+        records = _records(("A", "AC"), ("B", "AC"), ("C", "GG"), ("D", "TT"), ("E", "GG"))
+        tree_text = "(A:0.1,(C<note>:0.2,D:0.3)90:0.4);"
+
+        expanded = expand_identical_leaves(tree_text, {"A": ["B"], "C": ["E"]})
+
+        self.assertEqual(expanded, "((A:0,B:0):0.1,((C<note>:0,E:0):0.2,D:0.3)90:0.4);")
+        self.assertEqual(sorted(parse_newick(expanded).leaf_names()), ["A", "B", "C<note>", "D", "E"])
+        self.assertEqual(sorted(build_leaf_label_map(records, expanded).values()), ["A", "B", "C", "D", "E"])
+        self.assertEqual(expand_identical_leaves(tree_text, {}), tree_text)
+
+    def test_projection_reads_collapsed_members_from_their_representative(self):
+        alignment_text = ">A\nAC-GT\n>C\nACTGT\n"
+        records = _records(("B", "ACGT"), ("C", "ACTGT"))
+
+        with self.assertRaisesRegex(ValueError, "not in the current alignment"):
+            project_alignment(alignment_text, records)
+        projected = project_alignment(alignment_text, records, aliases={"B": "A"})
+
+        self.assertEqual([(record.seq_id, record.sequence) for record in projected], [("B", "AC-GT"), ("C", "ACTGT")])
+
+    def test_groups_only_apply_to_the_text_they_were_computed_for(self):
+        context = AnalysisContext()
+        context.set_alignment_output(">A\nAC\n>C\nGG\n>D\nTT\n", {"A": ["B"]})
+
+        context.set_trim_output(">A\nA\n>C\nG\n>D\nT\n", source_text=">A\nAC\n>C\nGG\n>D\nTT\n")
+
+        self.assertEqual(context.identical_groups_for(">A\nAC\n>C\nGG\n>D\nTT"), {"A": ["B"]})
+        self.assertEqual(context.identical_groups_for(context.trim_output_text), {"A": ["B"]})
+        self.assertEqual(context.identical_groups_for(">A\nAC\n>E\nGG\n>D\nTT\n"), {})
+        context.set_trim_output(">A\nA\n>C\nG\n", source_text=">X\nA\n")
+        self.assertEqual(context.identical_groups_for(context.trim_output_text), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
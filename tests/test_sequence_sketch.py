@@ -0,0 +1,74 @@
+import random
+import unittest
+
+from context import SequenceRecord
+from sequence_sketch import (
+    PROTEIN_KMER,
+    NUCLEOTIDE_KMER,
+    SKETCH_BINS,
+    cluster_records,
+    guess_kmer_size,
+    jaccard_for_identity,
+    reduce_records,
+    sketch_records,
+)
+
+
+def _record(seq_id, sequence):
+    return SequenceRecord(seq_id=seq_id, header=seq_id, sequence=sequence)
+
+
+def _mutated(rng, sequence, rate, alphabet):
+    return "".join(rng.choice(alphabet) if rng.random() < rate else residue for residue in sequence)
+
+
+class SequenceSketchTests(unittest.TestCase):
+    def test_kmer_size_follows_the_alphabet(self):
+        self.assertEqual(guess_kmer_size([_record("a", "ACGTACGTNN")]), NUCLEOTIDE_KMER)
+        self.assertEqual(guess_kmer_size([_record("a", "MKLVQEWRST")]), PROTEIN_KMER)
+
+    def test_identity_threshold_maps_to_a_jaccard_threshold(self):
+        self.assertEqual(jaccard_for_identity(1.0, 11), 1.0)
+        self.assertLess(jaccard_for_identity(0.9, 11), jaccard_for_identity(0.95, 11))
+        with self.assertRaisesRegex(ValueError, "Similarity threshold"):
+            jaccard_for_identity(0, 11)
+
+    def test_sketches_ignore_gaps_and_do_not_span_sequences(self):
+        records = [_record("a", "ACGTTGCAAGGT"), _record("b", "ACG-TTG-CAAGGT"), _record("c", "ACG")]
+
+        sketches = sketch_records(records, 4)
+
+        self.assertEqual(sketches.shape, (3, SKETCH_BINS))
+        self.assertTrue((sketches[0] == sketches[1]).all())
+        self.assertTrue((sketches[2] == sketches.max()).all())
+
+    def test_close_variants_collapse_onto_the_longest_member(self):
+        rng = random.Random(3)
+        alphabet = "ACDEFGHIKLMNPQRSTVWY"
+        records = []
+        for family in range(4):
+            base = "".join(rng.choice(alphabet) for _ in range(300))
+            records.append(_record(f"f{family}_long", base + "WWW"))
+            records.extend(_record(f"f{family}_{copy}", _mutated(rng, base, 0.02, alphabet)) for copy in range(5))
+        shares = []
+
+        representatives, clusters = cluster_records(records, 0.9, progress=shares.append)
+
+        self.assertEqual([record.seq_id for record in representatives], [f"f{family}_long" for family in range(4)])
+        self.assertEqual(sorted(clusters["f2_long"]), [f"f2_{copy}" for copy in range(5)])
+        self.assertEqual(shares[-1], 1.0)
+        self.assertEqual(shares, sorted(shares))
+
+    def test_reduction_report_states_the_shrinkage(self):
+        records = [_record(f"s{index}", "ACGTACGGTTACGATCGATCG") for index in range(4)]
+
+        success, message, representatives, clusters = reduce_records(records, 0.95)
+
+        self.assertTrue(success)
+        self.assertEqual(len(representatives), 1)
+        self.assertIn("Kept 1 of 4 sequences (3 removed, 75.0% smaller)", message)
+        self.assertFalse(reduce_records([], 0.9)[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
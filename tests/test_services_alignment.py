@@ -0,0 +1,133 @@
+import textwrap
+import unittest
+
+from fake_tools import install_fake_tool
+from fasta_utils import parse_fasta_records
+from services_alignment import (
+    find_appended_records,
+    project_alignment,
+    run_mafft_add,
+    run_mafft_tournament,
+    split_thread_budget,
+)
+
+
+# Stands in for mafft: --localpair returns the input unchanged, --globalpair
+# shifts the second sequence by one column, --genafpair gaps the last residues
+# apart, --auto fails, and --add or
+# --addfragments appends gap-padded new records to the existing alignment.
+FAKE_MAFFT = textwrap.dedent(
+    """\
+    import sys
+
+    args = sys.argv[1:]
+    for option in ("--add", "--addfragments"):
+        if option in args:
+            # Echo the existing alignment, then the new records padded to its width.
+            existing = open(args[-1]).read().strip()
+            width = len(existing.split("\\n", 2)[1])
+            new = [record.split("\\n", 1) for record in open(args[args.index(option) + 1]).read().strip()[1:].split("\\n>")]
+            print(existing)
+            for header, sequence in new:
+                print(">" + header + "\\n" + sequence.replace("\\n", "").ljust(width, "-") + "  " + option)
+            sys.exit(0)
+    if "--auto" in args:
+        sys.exit("auto is broken")
+    records = sys.stdin.read().strip()[1:].split("\\n>")
+    out = []
+    for index, record in enumerate(records):
+        header, sequence = record.split("\\n", 1)
+        sequence = sequence.replace("\\n", "")
+        if "--globalpair" in args:
+            sequence = "-" + sequence if index == 1 else sequence + "-"
+        if "--genafpair" in args:
+            sequence = sequence[:-1] + "-" + sequence[-1] if index == 1 else sequence + "-"
+        out.append(">" + header + "\\n" + sequence)
+    print("\\n".join(out))
+    print("threads", args[args.index("--thread") + 1], file=sys.stderr)
+    """
+)
+
+
+class FakeMafftTestCase(unittest.TestCase):
+    def setUp(self):
+        install_fake_tool(self, "mafft", FAKE_MAFFT)
+
+
+class MafftAddTests(FakeMafftTestCase):
+    PREVIOUS = parse_fasta_records(">a\nACGT\n>b\nACGA\n")
+    ALIGNED = ">a\nACG-T\n>b\nAC-GA\n"
+
+    def test_appended_records_are_found_by_id_and_hash(self):
+        records = parse_fasta_records(">b\nacga\n>a\nACGT\n>c\nAAG\n")
+
+        appended = find_appended_records(self.PREVIOUS, self.ALIGNED, records)
+
+        self.assertEqual([record.seq_id for record in appended], ["c"])
+
+    def test_changed_removed_or_unchanged_inputs_need_a_full_alignment(self):
+        changed = parse_fasta_records(">a\nACGG\n>b\nACGA\n>c\nAAG\n")
+        removed = parse_fasta_records(">a\nACGT\n>c\nAAG\n")
+
+        self.assertIsNone(find_appended_records(self.PREVIOUS, self.ALIGNED, changed))
+        self.assertIsNone(find_appended_records(self.PREVIOUS, self.ALIGNED, removed))
+        self.assertIsNone(find_appended_records(self.PREVIOUS, self.ALIGNED, self.PREVIOUS))
+        self.assertIsNone(find_appended_records(self.PREVIOUS, ">a\nACGT\n", self.PREVIOUS + removed[1:]))
+
+    def test_new_records_are_added_to_the_existing_alignment(self):
+        new_records = parse_fasta_records(">c\nAAG\n")
+
+        success, output = run_mafft_add(self.ALIGNED, new_records, threads=2, fragments=True)
+
+        self.assertTrue(success, output)
+        self.assertTrue(output.startswith(self.ALIGNED))
+        self.assertIn(">c\nAAG--  --addfragments", output)
+
+
+class MafftTournamentTests(FakeMafftTestCase):
+    def test_thread_budget_is_shared(self):
+        self.assertEqual(split_thread_budget(8, 3), [3, 3, 2])
+        self.assertEqual(split_thread_budget(2, 3), [1, 1, 1])
+
+    def test_modes_are_scored_and_the_best_is_reported(self):
+        success, message, results, best_mode = run_mafft_tournament(">a\nACGT\n>b\nACGA\n", threads=4)
+
+        self.assertTrue(success, message)
+        self.assertEqual(best_mode, "linsi")
+        by_mode = {result["mode"]: result for result in results}
+        self.assertFalse(by_mode["auto"]["ok"])
+        self.assertIn("auto is broken", by_mode["auto"]["error"])
+        self.assertAlmostEqual(by_mode["linsi"]["sp_score"], 0.75)
+        self.assertAlmostEqual(by_mode["linsi"]["column_score"], 0.75)
+        self.assertEqual(by_mode["ginsi"]["length"], 5)
+        self.assertLess(by_mode["ginsi"]["sp_score"], by_mode["linsi"]["sp_score"])
+        self.assertEqual(sum(result["threads"] for result in results), 4)
+
+    def test_over_gapped_alignment_does_not_win_on_identity_ratio(self):
+        success, message, results, best_mode = run_mafft_tournament(
+            ">a\nACGT\n>b\nACGA\n", threads=2, modes=("linsi", "einsi")
+        )
+
+        self.assertTrue(success, message)
+        by_mode = {result["mode"]: result for result in results}
+        self.assertGreater(by_mode["einsi"]["sp_score"], by_mode["linsi"]["sp_score"])
+        self.assertEqual(by_mode["einsi"]["identical_pairs"], by_mode["linsi"]["identical_pairs"])
+        self.assertEqual(best_mode, "linsi")
+
+
+class ProjectAlignmentTests(unittest.TestCase):
+    ALIGNED = ">a first\nACGT-\n>b\nACGA-\n>c\nA-GT-\n"
+
+    def test_projection_keeps_rows_and_drops_shared_gap_columns(self):
+        records = parse_fasta_records(">c note\nAGT\n>a first\nACGT\n")
+
+        projected = project_alignment(self.ALIGNED, records, cache_dir=None)
+
+        self.assertEqual([record.header for record in projected], ["c note", "a first"])
+        self.assertEqual([record.sequence for record in projected], ["A-GT", "ACGT"])
+        with self.assertRaisesRegex(ValueError, "not in the current alignment"):
+            project_alignment(self.ALIGNED, parse_fasta_records(">z\nAC\n"), cache_dir=None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import textwrap
+import unittest
+from pathlib import Path
+
+from fake_tools import install_fake_tool
+from services_trim import compare_trimal_modes, format_column_ranges, parse_column_map, run_trimal, write_trimal_report
+
+
+# Stands in for trimal: keeps every column without gaps (every column for
+# "automated1"), writes to -out or stdout, reports the kept columns with
+# -colnumbering, and fails for "strict".
+FAKE_TRIMAL = textwrap.dedent(
+    """\
+    import sys
+
+    args = sys.argv[1:]
+    source = args[args.index("-in") + 1]
+    mode = next(arg for arg in args if arg in ("-automated1", "-gappyout", "-strict", "-strictplus", "-nogaps"))
+    if mode == "-strict":
+        sys.exit("strict is broken")
+    records = [block.split("\\n", 1) for block in open(source).read().strip()[1:].split("\\n>")]
+    rows = [body.replace("\\n", "") for _, body in records]
+    keep = [c for c in range(len(rows[0])) if mode == "-automated1" or all(row[c] != "-" for row in rows)]
+    text = "".join(">" + header + "\\n" + "".join(row[c] for c in keep) + "\\n" for (header, _), row in zip(records, rows))
+    if "-htmlout" in args:
+        with open(args[args.index("-htmlout") + 1], "w") as f:
+            f.write("<html>" + mode + "</html>")
+    if "-out" in args:
+        with open(args[args.index("-out") + 1], "w") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    if "-colnumbering" in args:
+        print("#ColumnsMap\\t" + ", ".join(map(str, keep)))
+    """
+)
+
+
+class FakeTrimalTestCase(unittest.TestCase):
+    def setUp(self):
+        install_fake_tool(self, "trimal", FAKE_TRIMAL)
+
+
+class RunTrimalTests(FakeTrimalTestCase):
+    def test_trimmed_alignment_is_read_from_stdout(self):
+        success, message, trimmed_result, alignment = run_trimal(">a\nAC-T\n>b\nA-GT\n", "nogaps")
+
+        self.assertTrue(success, message)
+        self.assertEqual(trimmed_result, ">a\nAT\n>b\nAT\n")
+        self.assertEqual(alignment.ids, ["a", "b"])
+        self.assertEqual(alignment.shape, (2, 2))
+
+    def test_failures_return_stderr(self):
+        success, message, trimmed_result, alignment = run_trimal(">a\nACGT\n", "strict")
+
+        self.assertFalse(success)
+        self.assertIn("strict is broken", message)
+        self.assertIsNone(alignment)
+
+    def test_report_is_written_on_request(self):
+        success, message, html_path = write_trimal_report(">a\nACGT\n", "gappyout")
+        self.addCleanup(os.remove, html_path)
+
+        self.assertTrue(success, message)
+        self.assertEqual(Path(html_path).read_text(), "<html>-gappyout</html>")
+
+
+class TrimalColumnMapTests(FakeTrimalTestCase):
+    def test_parse_and_format_column_map(self):
+        self.assertEqual(parse_column_map("#ColumnsMap\t0, 1, 2, 5, 7, 8\n"), [0, 1, 2, 5, 7, 8])
+        self.assertIsNone(parse_column_map("no map here"))
+        self.assertEqual(format_column_ranges([0, 1, 2, 5, 7, 8]), "0-2, 5, 7-8")
+        self.assertEqual(format_column_ranges([]), "")
+
+    def test_compare_modes_runs_each_mode_and_reports_failures(self):
+        success, message, results, input_columns = compare_trimal_modes(">a\nAC-T\n>b\nA-GT\n")
+
+        self.assertTrue(success)
+        self.assertIn("failed: strict", message)
+        self.assertEqual(input_columns, 4)
+        by_mode = {result["mode"]: result for result in results}
+        self.assertEqual([result["mode"] for result in results], ["automated1", "gappyout", "strict", "strictplus", "nogaps"])
+        self.assertEqual(by_mode["automated1"]["columns"], [0, 1, 2, 3])
+        self.assertEqual(by_mode["automated1"]["gap_fraction"], 0.25)
+        self.assertEqual(by_mode["nogaps"]["columns"], [0, 3])
+        self.assertEqual(by_mode["nogaps"]["gap_fraction"], 0.0)
+        self.assertFalse(by_mode["strict"]["ok"])
+        self.assertIn("strict is broken", by_mode["strict"]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
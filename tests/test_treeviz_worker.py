@@ -0,0 +1,70 @@
+import io
+import json
+import tempfile
+import threading
+import unittest
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from unittest.mock import patch
+
+from treeviz_worker import RenderWorkerPool, _write_future_result, run_batch
+
+
+class RenderWorkerPoolTests(unittest.TestCase):
+    def test_failed_jobs_report_timing_and_write_error_pages(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            jobs = [
+                {
+                    "id": index,
+                    "newick_path": str(Path(temp_dir) / "missing.nwk"),
+                    "img_path": str(Path(temp_dir) / f"tree{index}.png"),
+                    "html_path": str(Path(temp_dir) / f"tree{index}.html"),
+                }
+                for index in range(3)
+            ]
+            with RenderWorkerPool(processes=2) as pool:
+                results = pool.render_batch(jobs)
+
+            self.assertEqual([result["id"] for result in results], [0, 1, 2])
+            for result in results:
+                self.assertFalse(result["ok"])
+                self.assertGreaterEqual(result["seconds"], 0)
+                self.assertIn("Tree rendering failed", Path(result["html_path"]).read_text())
+
+    def test_a_broken_pool_still_writes_a_result_line(self):
+        future = Future()
+        future.set_exception(BrokenProcessPool("worker died"))
+
+        with patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            _write_future_result(7, future, threading.Lock())
+
+        result = json.loads(stdout.getvalue())
+        self.assertEqual(result["id"], 7)
+        self.assertFalse(result["ok"])
+        self.assertIn("worker died", result["error"])
+
+    def test_batch_reports_invalid_jobs_and_refused_submissions_in_place(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            jobs_path = Path(temp_dir) / "jobs.jsonl"
+            job = {"newick_path": "missing.nwk", "img_path": "tree.png", "html_path": str(Path(temp_dir) / "tree.html")}
+            jobs_path.write_text(
+                "\n".join([json.dumps({"id": 0, "img_path": "tree.png"}), json.dumps({"id": 1, **job}), "[]"]) + "\n"
+            )
+
+            with (
+                patch.object(RenderWorkerPool, "submit", side_effect=BrokenProcessPool("pool is gone")),
+                patch("sys.stdout", new_callable=io.StringIO) as stdout,
+                patch("sys.stderr", new_callable=io.StringIO),
+            ):
+                run_batch(str(jobs_path), processes=1)
+
+        results = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual([result["id"] for result in results], [0, 1, None])
+        self.assertIn("missing newick_path, html_path", results[0]["error"])
+        self.assertIn("pool is gone", results[1]["error"])
+        self.assertIn("JSON object", results[2]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+import numpy as np
+
+from alignment_matrix import AlignmentMatrix
+from trim_engine import column_mask, format_retention_preview, gap_threshold_mask, gappyout_mask, nogaps_mask
+
+
+def _alignment(columns):
+    """Build an alignment from column strings, one character per sequence."""
+    rows = ["".join(column[row] for column in columns) for row in range(len(columns[0]))]
+    return AlignmentMatrix.from_fasta_text("".join(f">s{index}\n{row}\n" for index, row in enumerate(rows)))
+
+
+class TrimEngineTests(unittest.TestCase):
+    def test_nogaps_and_gap_threshold(self):
+        alignment = _alignment(["AAAA", "A-AA", "A--A", "---A"])
+
+        np.testing.assert_array_equal(nogaps_mask(alignment), [True, False, False, False])
+        np.testing.assert_array_equal(gap_threshold_mask(alignment, 0.5), [True, True, True, False])
+        np.testing.assert_array_equal(gap_threshold_mask(alignment, 0), [True, True, True, True])
+        with self.assertRaises(ValueError):
+            gap_threshold_mask(alignment, 1.5)
+
+    def test_gappyout_removes_columns_past_the_gap_knee(self):
+        columns = ["ACGTACGTAC"] * 30 + ["ACGTACGTA-"] * 10 + ["ACGTACG---"] * 3 + ["A---------"] * 2
+        mask = gappyout_mask(_alignment(columns))
+
+        self.assertEqual(mask[:40].tolist(), [True] * 40)
+        self.assertEqual(mask[43:].tolist(), [False, False])
+
+    def test_gappyout_without_a_curve_drops_only_all_gap_columns(self):
+        alignment = _alignment(["AAA", "---", "AAA"])
+        np.testing.assert_array_equal(gappyout_mask(alignment), [True, False, True])
+
+    def test_preview_lists_every_gap_mode(self):
+        alignment = _alignment(["AAAA", "A-AA", "A--A", "---A"])
+
+        self.assertEqual(
+            format_retention_preview(alignment, 0.75),
+            "Columns kept: gappyout 2/4 (50%), nogaps 1/4 (25%), gt 0.75 2/4 (50%)",
+        )
+        with self.assertRaises(ValueError):
+            column_mask(alignment, "strict")
+
+
+if __name__ == "__main__":
+    unittest.main()
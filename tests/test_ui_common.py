@@ -137,6 +137,46 @@ class ProgressWindowTests(unittest.TestCase):
         self.assertFalse(parent_window.hidden)
         self.assertTrue(parent_window.refreshed)
 
+    def test_success_can_skip_the_confirmation_step(self):
+        progress_window = FakeProgressWindow()
+
+        with (
+            patch.object(ui_common.eg, "Window", return_value=progress_window, create=True),
+            patch.object(ui_common.eg, "Multiline", return_value=object(), create=True),
+            patch.object(ui_common.eg, "Button", return_value=object(), create=True),
+        ):
+            result = ui_common.run_with_progress(
+                "Preparing...",
+                lambda: (True, "prepared"),
+                confirm_on_success=False,
+            )
+
+        self.assertEqual(result, (True, "prepared"))
+        self.assertTrue(progress_window.closed)
+
+
+class FakeEventWindow:
+    def __init__(self):
+        self.events = []
+        self.posted = threading.Event()
+
+    def post_event(self, key, values):
+        self.events.append((key, values))
+        self.posted.set()
+
+
+class AlignmentSummaryTests(unittest.TestCase):
+    def test_summary_event_names_the_text_it_was_computed_for(self):
+        window = FakeEventWindow()
+
+        ui_common.start_alignment_summary(window, ">a\nAC-T\n>b\nACGT")
+
+        self.assertTrue(window.posted.wait(5))
+        key, values = window.events[0]
+        self.assertEqual(key, ui_common.ALIGNMENT_SUMMARY_EVENT)
+        self.assertEqual(values["fasta_text"], ">a\nAC-T\n>b\nACGT")
+        self.assertEqual(values["alignment"].shape, (2, 4))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -26,6 +26,22 @@ class PipelineNavigationTests(unittest.TestCase):
 
         self.assertEqual(calls, ["alignment", "trim", "iqtree"])
 
+    def test_cluster_stage_returns_to_alignment(self):
+        calls = []
+        modules = {
+            "ui_cluster": types.SimpleNamespace(
+                open_cluster_options_window=lambda context: calls.append("cluster") or "alignment"
+            ),
+            "ui_alignment": types.SimpleNamespace(
+                open_alignment_options_window=lambda context: calls.append("alignment") or None
+            ),
+        }
+
+        with patch.dict(sys.modules, modules):
+            run_pipeline_windows(object(), "cluster")
+
+        self.assertEqual(calls, ["cluster", "alignment"])
+
     def test_unknown_stage_is_rejected(self):
         with self.assertRaisesRegex(ValueError, "Unknown pipeline stage"):
             run_pipeline_windows(object(), "unknown")
@@ -0,0 +1,86 @@
+import io
+import re
+import tempfile
+import unittest
+from pathlib import Path
+
+from newick_tree import parse_newick
+from treeviz_worker import RenderWorkerPool
+from vector_tree_render import layout_tree, render_newick, split_gene_label, write_pdf, write_svg
+
+
+TREE = "((AT1G01010.1<NAC001>:0.1,AT1G01020.1:0.2)95/100:0.05,(A&B:0.3,C:0.1)80:0.2);"
+
+
+class VectorTreeRenderTests(unittest.TestCase):
+    def test_split_gene_label(self):
+        self.assertEqual(split_gene_label("AT1G01010.1<NAC001>"), ("AT1G01010.1", "NAC001"))
+        self.assertEqual(split_gene_label("<odd>"), ("<odd>", None))
+        self.assertEqual(split_gene_label("plain"), ("plain", None))
+
+    def test_layout_places_parents_between_children(self):
+        layout = layout_tree(parse_newick(TREE))
+        tree = layout.tree
+        for node in range(len(tree)):
+            children = tree.children[node]
+            if children:
+                self.assertLess(layout.x[node], min(layout.x[child] for child in children))
+                self.assertEqual(layout.y[node], (layout.y[children[0]] + layout.y[children[-1]]) / 2)
+
+    def test_svg_has_labels_gene_names_and_support(self):
+        handle = io.StringIO()
+        write_svg(layout_tree(parse_newick(TREE)), handle)
+        svg = handle.getvalue()
+
+        self.assertIn('<tspan font-style="italic" fill="#555">NAC001</tspan>', svg)
+        self.assertIn(">A&amp;B</text>", svg)
+        self.assertIn(">95/100</text>", svg)
+        self.assertIn(">80</text>", svg)
+        self.assertEqual(svg.count("<path "), 6)
+
+    def test_pdf_cross_reference_and_length_are_consistent(self):
+        handle = io.BytesIO()
+        write_pdf(layout_tree(parse_newick(TREE)), handle)
+        data = handle.getvalue()
+
+        self.assertTrue(data.startswith(b"%PDF-1.4"))
+        startxref = int(re.search(rb"startxref\n(\d+)", data).group(1))
+        self.assertTrue(data[startxref:].startswith(b"xref\n0 8\n"))
+        offsets = re.findall(rb"(\d{10}) 00000 n ", data[startxref:])
+        for number, offset in enumerate(offsets, start=1):
+            self.assertTrue(data[int(offset):].startswith(f"{number} 0 obj".encode()))
+        stream = data[data.index(b"stream\n") + 7:data.index(b"endstream")]
+        length = int(re.search(rb"7 0 obj\n(\d+)", data).group(1))
+        self.assertEqual(length, len(stream))
+        self.assertIn(b"/F2 10 Tf ( NAC001) Tj", stream)
+
+    def test_output_is_reproducible(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            first = Path(temp_dir) / "a.pdf"
+            second = Path(temp_dir) / "b.pdf"
+            render_newick(TREE, first)
+            render_newick(TREE, second)
+            self.assertEqual(first.read_bytes(), second.read_bytes())
+            with self.assertRaises(ValueError):
+                render_newick(TREE, Path(temp_dir) / "tree.png")
+
+    def test_worker_renders_vector_jobs_without_ete3(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            newick_path = Path(temp_dir) / "tree.nwk"
+            newick_path.write_text(TREE)
+            job = {
+                "id": "svg",
+                "newick_path": str(newick_path),
+                "img_path": str(Path(temp_dir) / "tree.svg"),
+                "html_path": str(Path(temp_dir) / "tree.html"),
+            }
+            with RenderWorkerPool(processes=1) as pool:
+                (result,) = pool.render_batch([job])
+
+            self.assertTrue(result["ok"], result["error"])
+            self.assertIn('src="tree.svg"', Path(job["html_path"]).read_text())
+            self.assertIn("<svg", Path(job["img_path"]).read_text())
+
+
+if __name__ == "__main__":
+    unittest.main()
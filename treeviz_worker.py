@@ -1,9 +1,23 @@
+import argparse
+import functools
 import html
+import json
 import os
 import sys
+import threading
+import time
 import webbrowser
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
 from types import ModuleType
 
+from vector_tree_render import VECTOR_FORMATS, render_newick
+
+# Rendering is CPU-bound and each process holds its own Qt instance, so a few
+# workers are enough to keep a batch busy.
+DEFAULT_PROCESSES = max(1, min(4, os.cpu_count() or 1))
+JOB_KEYS = ("newick_path", "img_path", "html_path")
+
 
 def _install_cgi_compat():
     """Provide the minimal cgi.escape API expected by older ete3 code."""
@@ -70,28 +84,199 @@ def _render_tree(newick_path, img_path, html_path):
     t.set_outgroup(midpoint)
     t.render(img_path, w=600, units="px", tree_style=ts)
 
+    image_src = os.path.relpath(os.path.abspath(img_path), os.path.dirname(os.path.abspath(html_path)))
     _write_html(
         html_path,
-        """    <h1>IQTREE Tree Viewer</h1>
-    <img src="tree.png" alt="Tree">
+        f"""    <h1>IQTREE Tree Viewer</h1>
+    <img src="{html.escape(image_src)}" alt="Tree">
 """,
     )
 
 
-def main():
-    if len(sys.argv) != 4:
-        raise SystemExit("Usage: treeviz_worker.py <newick_path> <img_path> <html_path>")
+def _render_vector_tree(newick_path, img_path, html_path):
+    with open(newick_path, "r") as f:
+        render_newick(f.read().strip(), img_path)
+
+    image_src = os.path.relpath(os.path.abspath(img_path), os.path.dirname(os.path.abspath(html_path)))
+    if img_path.lower().endswith(".svg"):
+        figure = f'<img src="{html.escape(image_src)}" alt="Tree">'
+    else:
+        figure = f'<a href="{html.escape(image_src)}">Open the tree PDF</a>'
+    _write_html(html_path, f"    <h1>IQTREE Tree Viewer</h1>\n    {figure}\n")
 
-    newick_path, img_path, html_path = sys.argv[1:4]
+
+def _warm_up():
+    """Pool initializer: pay the ete3 and Qt import cost once per worker process."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    _install_cgi_compat()
+    try:
+        from ete3 import TreeStyle  # noqa: F401
+    except Exception:
+        # Leave the error to the first job, which reports it per tree.
+        pass
+
+
+def render_job(job: dict) -> dict:
+    """Render one job and return its result with the time it took."""
+    started = time.perf_counter()
+    error = None
     try:
-        _render_tree(newick_path, img_path, html_path)
+        # SVG and PDF are drawn in pure Python, so those jobs need neither ete3 nor Qt.
+        if os.path.splitext(job["img_path"])[1].lower() in VECTOR_FORMATS:
+            _render_vector_tree(job["newick_path"], job["img_path"], job["html_path"])
+        else:
+            _render_tree(job["newick_path"], job["img_path"], job["html_path"])
     except Exception as exc:
+        error = str(exc)
         _write_html(
-            html_path,
+            job["html_path"],
             "    <h1>IQTREE Tree Viewer</h1>\n"
             "    <p>Tree rendering failed.</p>\n"
-            f"    <pre>{html.escape(str(exc))}</pre>\n",
+            f"    <pre>{html.escape(error)}</pre>\n",
         )
+    return {
+        "id": job.get("id"),
+        "ok": error is None,
+        "error": error,
+        "html_path": job["html_path"],
+        "seconds": round(time.perf_counter() - started, 3),
+        "pid": os.getpid(),
+    }
+
+
+class RenderWorkerPool:
+    """Long-lived pool of rendering processes fed through the executor's job queue."""
+
+    def __init__(self, processes: int = DEFAULT_PROCESSES):
+        self._executor = ProcessPoolExecutor(
+            max_workers=max(1, processes),
+            mp_context=get_context("spawn"),
+            initializer=_warm_up,
+        )
+
+    def submit(self, job: dict):
+        return self._executor.submit(render_job, job)
+
+    def render_batch(self, jobs) -> list[dict]:
+        """Results in job order; a job the pool could not run gets an error result."""
+        pending = []
+        for job in jobs:
+            try:
+                pending.append(self.submit(job))
+            except Exception as exc:
+                # A broken pool refuses new work; the job is reported instead of aborting the batch.
+                pending.append(_pool_failure(job.get("id"), exc))
+        return [
+            item if isinstance(item, dict) else _future_result(job.get("id"), item)
+            for job, item in zip(jobs, pending)
+        ]
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _write_result(result: dict, lock: threading.Lock):
+    with lock:
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+
+def _pool_failure(job_id, exc: Exception) -> dict:
+    return {"id": job_id, "ok": False, "error": f"Render worker failed: {exc!r}"}
+
+
+def _future_result(job_id, future) -> dict:
+    """A finished job's result, or an error result for it if the job or the pool failed."""
+    try:
+        return future.result()
+    except Exception as exc:
+        return _pool_failure(job_id, exc)
+
+
+def _write_future_result(job_id, future, lock: threading.Lock):
+    _write_result(_future_result(job_id, future), lock)
+
+
+def _parse_job(line: str):
+    """Returns (job, None) for a valid JSON job line, otherwise (None, error result)."""
+    job = None
+    try:
+        job = json.loads(line)
+        if not isinstance(job, dict):
+            raise TypeError("a job must be a JSON object")
+        missing = [key for key in JOB_KEYS if key not in job]
+        if missing:
+            raise ValueError("missing " + ", ".join(missing))
+    except (ValueError, TypeError) as exc:
+        job_id = job.get("id") if isinstance(job, dict) else None
+        return None, {"id": job_id, "ok": False, "error": f"Invalid job: {exc}"}
+    return job, None
+
+
+def serve(processes: int):
+    """Read JSON job lines from stdin and write one JSON result line per job as each finishes."""
+    lock = threading.Lock()
+    with RenderWorkerPool(processes) as pool:
+        for line in sys.stdin:
+            if not line.strip():
+                continue
+            job, invalid = _parse_job(line)
+            if invalid is not None:
+                _write_result(invalid, lock)
+                continue
+            try:
+                future = pool.submit(job)
+            except Exception as exc:
+                # A broken pool refuses new work; every job still gets its result line.
+                _write_result(_pool_failure(job.get("id"), exc), lock)
+                continue
+            future.add_done_callback(functools.partial(_write_future_result, job.get("id"), lock=lock))
+
+
+def run_batch(jobs_path: str, processes: int):
+    """Render every job in a JSON-lines file; invalid jobs get an error result in their place."""
+    with open(jobs_path, "r", encoding="utf-8") as handle:
+        parsed = [_parse_job(line) for line in handle if line.strip()]
+    started = time.perf_counter()
+    with RenderWorkerPool(processes) as pool:
+        rendered = iter(pool.render_batch([job for job, _ in parsed if job is not None]))
+    results = [invalid if job is None else next(rendered) for job, invalid in parsed]
+    for result in results:
+        sys.stdout.write(json.dumps(result) + "\n")
+    failed = sum(1 for result in results if not result["ok"])
+    print(
+        f"rendered={len(results) - failed} failed={failed} "
+        f"job_seconds={sum(result.get('seconds', 0) for result in results):.2f} "
+        f"wall_seconds={time.perf_counter() - started:.2f}",
+        file=sys.stderr,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render static ete3 tree images, one at a time or as a worker pool.")
+    parser.add_argument("paths", nargs="*", metavar="PATH", help="<newick_path> <img_path> <html_path> for a single tree.")
+    parser.add_argument("--serve", action="store_true", help="Keep running and read JSON jobs from stdin.")
+    parser.add_argument("--batch", metavar="JOBS_JSONL", help="Render every job in a JSON-lines file and exit.")
+    parser.add_argument("--processes", type=int, default=DEFAULT_PROCESSES, help="Rendering processes for --serve and --batch.")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.processes)
+        return
+    if args.batch:
+        run_batch(args.batch, args.processes)
+        return
+    if len(args.paths) != 3:
+        raise SystemExit("Usage: treeviz_worker.py <newick_path> <img_path> <html_path>")
+
+    newick_path, img_path, html_path = args.paths
+    render_job({"newick_path": newick_path, "img_path": img_path, "html_path": html_path})
     webbrowser.open("file://" + os.path.abspath(html_path))
 
 
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import numpy as np
+
+from alignment_matrix import AlignmentMatrix
+
+
+# trimAl modes that only look at gap content and can therefore be previewed from
+# column gap counts; the similarity-based modes are left to trimAl itself.
+PREVIEW_MODES = ("gappyout", "nogaps", "gt")
+DEFAULT_GAP_THRESHOLD = 0.5
+
+
+def nogaps_mask(alignment: AlignmentMatrix) -> np.ndarray:
+    """Keep only the columns without any gap (trimAl ``-nogaps``)."""
+    return alignment.column_gap_counts() == 0
+
+
+def gap_threshold_mask(alignment: AlignmentMatrix, threshold: float) -> np.ndarray:
+    """Keep columns where at least ``threshold`` of the sequences have a residue (trimAl ``-gt``)."""
+    if not 0 <= threshold <= 1:
+        raise ValueError(f"Gap threshold must be between 0 and 1, got {threshold}.")
+    rows = alignment.shape[0]
+    # Compare integer counts so thresholds like 0.5 on an even row count are exact.
+    return (rows - alignment.column_gap_counts()) >= threshold * rows - 1e-9
+
+
+def gappyout_mask(alignment: AlignmentMatrix) -> np.ndarray:
+    """
+    Approximate trimAl ``-gappyout``. Columns are ordered by gap count and the
+    cumulative curve of gap fraction against alignment length is followed
+    until its slope jumps the most; columns past that knee are removed.
+    """
+    gaps = alignment.column_gap_counts()
+    rows, columns = alignment.shape
+    if columns == 0 or rows == 0:
+        return np.zeros(columns, dtype=bool)
+    levels, per_level = np.unique(gaps, return_counts=True)
+    if len(levels) < 3:
+        # No curve to follow; only columns that are entirely gaps are gappy.
+        keep = gaps < rows
+        return keep if keep.any() else np.ones(columns, dtype=bool)
+    x = np.cumsum(per_level) / columns
+    y = levels / rows
+    slopes = np.diff(y) / np.diff(x)
+    # slopes[i] joins levels i and i + 1; the knee is the level where it grows most.
+    knee = int(np.argmax(np.diff(slopes))) + 1
+    return gaps <= levels[knee]
+
+
+def column_mask(alignment: AlignmentMatrix, mode: str, gap_threshold: float = DEFAULT_GAP_THRESHOLD) -> np.ndarray:
+    if mode == "gappyout":
+        return gappyout_mask(alignment)
+    if mode == "nogaps":
+        return nogaps_mask(alignment)
+    if mode == "gt":
+        return gap_threshold_mask(alignment, gap_threshold)
+    raise ValueError(f"No in-process preview for trimAl mode {mode!r}.")
+
+
+def format_retention_preview(alignment: AlignmentMatrix, gap_threshold: float = DEFAULT_GAP_THRESHOLD) -> str:
+    """One line with the columns each previewable mode would keep."""
+    columns = alignment.shape[1]
+    parts = []
+    for mode in PREVIEW_MODES:
+        kept = int(column_mask(alignment, mode, gap_threshold).sum())
+        label = f"gt {gap_threshold:g}" if mode == "gt" else mode
+        parts.append(f"{label} {kept}/{columns} ({kept / columns if columns else 0:.0%})")
+    return "Columns kept: " + ", ".join(parts)
@@ -1,6 +1,7 @@
 import TkEasyGUI as eg
 
-from fasta_utils import parse_fasta_records
+from fasta_utils import format_fasta_records, parse_fasta_records
+from sequence_dedup import MIN_REPRESENTATIVES, collapse_identical_records
 from ui_common import (
     discard_pending_events,
     install_inactive_button_indicator,
@@ -9,7 +10,81 @@ from ui_common import (
     reactivate_window,
     run_with_progress,
 )
-from services_alignment import run_mafft
+from services_alignment import (
+    TOURNAMENT_MODES,
+    find_appended_records,
+    run_mafft,
+    run_mafft_add,
+    run_mafft_tournament,
+)
+
+ALIGNMENT_MODES = ("auto", "linsi", "ginsi", "einsi")
+
+
+def _collapsed_input(alignment_input, records, enabled):
+    """
+    Returns (fasta_text, groups) for MAFFT: only one representative per group of identical
+    sequences when collapsing is enabled and worthwhile, otherwise the input unchanged.
+    """
+    if not enabled:
+        return alignment_input, {}
+    representatives, groups = collapse_identical_records(records)
+    if not groups or len(representatives) < MIN_REPRESENTATIVES:
+        return alignment_input, {}
+    return format_fasta_records(representatives), groups
+
+
+def _format_tournament(results, best_mode):
+    lines = []
+    for result in results:
+        if not result["ok"]:
+            lines.append(f"{result['mode']}: failed: {result['error'].strip()}")
+            continue
+        marker = "  <- best" if result["mode"] == best_mode else ""
+        lines.append(
+            f"{result['mode']}: {result['length']} columns, {result['identical_pairs']} identical pairs, "
+            f"sum-of-pairs identity {result['sp_score']:.3f}, "
+            f"conserved columns {result['column_score']:.1%}, {result['threads']} threads, "
+            f"{result['seconds']:.1f} s{marker}"
+        )
+    return "\n".join(lines)
+
+
+def open_alignment_compare_window(results, best_mode):
+    """
+    Shows the scores of every compared MAFFT mode.
+    Returns the result the user chose to keep, or None.
+    """
+    layout = [
+        [
+            eg.Text(
+                "Best: most identical residue pairs; conserved columns (columns without variation) break ties.\n"
+                "Sum-of-pairs identity (identical share of aligned pairs) is shown for reference only."
+            )
+        ],
+        [eg.Multiline(key="comparison", default_text=_format_tournament(results, best_mode), size=(100, 8), expand_x=True, expand_y=True)],
+        [eg.Text("Use alignment:")]
+        + [
+            eg.Button(result["mode"] + (" (best)" if result["mode"] == best_mode else ""), key="use_" + result["mode"])
+            for result in results
+            if result["ok"]
+        ],
+        [eg.Button("Close")],
+    ]
+    cmp_win = eg.Window("MAFFT Mode Comparison", layout, modal=True, resizable=True)
+    install_inactive_button_indicator(cmp_win)
+    install_active_title_indicator(cmp_win)
+    relax_modal_window(cmp_win)
+    chosen = None
+    while True:
+        event, _ = cmp_win.read()
+        if event in ("Close", eg.WINDOW_CLOSED):
+            break
+        if isinstance(event, str) and event.startswith("use_"):
+            chosen = next(result for result in results if result["mode"] == event[len("use_"):])
+            break
+    cmp_win.close()
+    return chosen
 
 
 def open_alignment_options_window(context):
@@ -28,7 +103,20 @@ def open_alignment_options_window(context):
             eg.Radio("ginsi", "align_mode", key="mode_ginsi"),
             eg.Radio("einsi", "align_mode", key="mode_einsi"),
         ],
-        [eg.Button("Run Alignment"), eg.Button("Skip to Trim"), eg.Button("Cancel")],
+        [
+            eg.Checkbox("Add new sequences to the previous alignment (mafft --add)", default=False, key="add_to_previous"),
+            eg.Checkbox("as fragments", default=False, key="add_fragments"),
+        ],
+        [eg.Checkbox("Collapse identical sequences (duplicates rejoin the final tree)", default=False, key="collapse_identical")],
+        [eg.Text("Compare:")]
+        + [eg.Checkbox(mode, default=mode in TOURNAMENT_MODES, key="compare_" + mode) for mode in ALIGNMENT_MODES],
+        [
+            eg.Button("Run Alignment"),
+            eg.Button("Compare Modes"),
+            eg.Button("Reduce Dataset"),
+            eg.Button("Skip to Trim"),
+            eg.Button("Cancel"),
+        ],
     ]
     opt_win = eg.Window("Alignment Options", layout, modal=True, resizable=True)
     install_inactive_button_indicator(opt_win)
@@ -38,6 +126,16 @@ def open_alignment_options_window(context):
         event, values = opt_win.read()
         if event in ("Cancel", eg.WINDOW_CLOSED):
             break
+        elif event == "Reduce Dataset":
+            alignment_input = values["alignment_input"].strip()
+            try:
+                context.set_original_input(alignment_input, parse_fasta_records(alignment_input))
+            except ValueError as exc:
+                eg.popup("FASTA input error:\n" + str(exc))
+                reactivate_window(opt_win)
+                continue
+            opt_win.close()
+            return "cluster"
         elif event == "Skip to Trim":
             alignment_input = values["alignment_input"].strip()
             try:
@@ -50,6 +148,52 @@ def open_alignment_options_window(context):
                 continue
             opt_win.close()
             return "trim"
+        elif event == "Compare Modes":
+            try:
+                threads = int(values["threads"].strip())
+                if threads < 1:
+                    raise ValueError("Threads must be at least 1.")
+            except ValueError as ve:
+                eg.popup("Threads input error: " + str(ve))
+                reactivate_window(opt_win)
+                continue
+            modes = tuple(mode for mode in ALIGNMENT_MODES if values.get("compare_" + mode))
+            if len(modes) < 2:
+                eg.popup("Tick at least two modes to compare.")
+                reactivate_window(opt_win)
+                continue
+            alignment_input = values["alignment_input"].strip()
+            try:
+                records = parse_fasta_records(alignment_input)
+            except ValueError as exc:
+                eg.popup("FASTA input error:\n" + str(exc))
+                reactivate_window(opt_win)
+                continue
+            mafft_input, groups = _collapsed_input(alignment_input, records, values.get("collapse_identical"))
+            success, message, results, best_mode = run_with_progress(
+                "MAFFT mode comparison is running...",
+                run_mafft_tournament,
+                mafft_input,
+                threads,
+                modes,
+                parent_window=opt_win,
+                confirm_on_success=False,
+            )
+            discard_pending_events(opt_win)
+            if not success:
+                eg.popup("Error: MAFFT execution failed.\n" + message)
+                reactivate_window(opt_win)
+                continue
+            chosen = open_alignment_compare_window(results, best_mode)
+            discard_pending_events(opt_win)
+            if chosen is None:
+                reactivate_window(opt_win)
+                continue
+            # Earlier results are only replaced once a compared alignment is accepted.
+            context.set_original_input(alignment_input, records)
+            context.set_alignment_output(chosen["output"], groups)
+            opt_win.close()
+            return "trim"
         elif event == "Run Alignment":
             try:
                 threads = int(values["threads"].strip())
@@ -65,26 +209,50 @@ def open_alignment_options_window(context):
                 else ("linsi" if values.get("mode_linsi") else ("ginsi" if values.get("mode_ginsi") else "einsi"))
             )
             alignment_input = values["alignment_input"].strip()
+            previous_records = context.original_records
+            previous_alignment = context.alignment_output_text
             try:
-                context.set_original_input(alignment_input, parse_fasta_records(alignment_input))
+                records = parse_fasta_records(alignment_input)
             except ValueError as exc:
                 eg.popup("FASTA input error:\n" + str(exc))
                 reactivate_window(opt_win)
                 continue
-            result = run_with_progress(
-                "MAFFT alignment is running...",
-                run_mafft,
-                alignment_input,
-                threads,
-                mode,
-                parent_window=opt_win,
-            )
+            appended = None
+            if values.get("add_to_previous"):
+                appended = find_appended_records(previous_records, previous_alignment, records)
+            context.set_original_input(alignment_input, records)
+            groups = {}
+            if appended:
+                result = run_with_progress(
+                    f"MAFFT --add is running ({len(appended)} new sequences added to the previous alignment, no full realignment)...",
+                    run_mafft_add,
+                    previous_alignment,
+                    appended,
+                    threads,
+                    mode,
+                    bool(values.get("add_fragments")),
+                    parent_window=opt_win,
+                )
+            else:
+                mafft_input, groups = _collapsed_input(alignment_input, records, values.get("collapse_identical"))
+                message = "MAFFT alignment is running..."
+                if groups:
+                    collapsed = sum(len(members) for members in groups.values())
+                    message = f"MAFFT alignment is running ({len(records) - collapsed} of {len(records)} sequences after collapsing)..."
+                result = run_with_progress(
+                    message,
+                    run_mafft,
+                    mafft_input,
+                    threads,
+                    mode,
+                    parent_window=opt_win,
+                )
             discard_pending_events(opt_win)
             if not result[0]:
                 eg.popup("Error: MAFFT execution failed.\n" + result[1])
                 reactivate_window(opt_win)
             else:
-                context.set_alignment_output(result[1])
+                context.set_alignment_output(result[1], groups)
                 opt_win.close()
                 return "trim"
     opt_win.close()
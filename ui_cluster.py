@@ -0,0 +1,107 @@
+import TkEasyGUI as eg
+
+from fasta_utils import format_fasta_records, parse_fasta_records
+from sequence_sketch import DEFAULT_IDENTITY, reduce_records
+from ui_common import (
+    discard_pending_events,
+    install_inactive_button_indicator,
+    install_active_title_indicator,
+    relax_modal_window,
+    reactivate_window,
+    run_with_progress,
+)
+
+
+def _parse_cluster_options(values):
+    identity = float(values["identity"].strip())
+    if not 0 < identity <= 1:
+        raise ValueError("Similarity threshold must be above 0 and at most 1.")
+    kmer_text = values["kmer_size"].strip().lower()
+    kmer_size = None if kmer_text in ("", "auto") else int(kmer_text)
+    if kmer_size is not None and kmer_size < 1:
+        raise ValueError("k-mer size must be at least 1.")
+    return identity, kmer_size
+
+
+def _format_largest_clusters(clusters, limit=5):
+    largest = sorted(clusters.items(), key=lambda item: -len(item[1]))[:limit]
+    if not largest:
+        return "No sequences were merged."
+    return "Largest clusters: " + ", ".join(f"{rep} ({len(members) + 1})" for rep, members in largest)
+
+
+def open_cluster_options_window(context):
+    """
+    Opens the optional dataset reduction stage before alignment.
+    Sequences are clustered on k-mer sketches and, after "Use Representatives",
+    only one sequence per cluster goes on to the Alignment options window.
+    """
+    layout = [
+        [eg.Multiline(key="cluster_input", default_text=context.get_alignment_input_text(), size=(80, 20), expand_x=True, expand_y=True)],
+        [
+            eg.Text("Similarity threshold (estimated identity):"),
+            eg.Input(default_text=str(DEFAULT_IDENTITY), key="identity", size=(6, 1)),
+            eg.Text("k-mer size:"),
+            eg.Input(default_text="auto", key="kmer_size", size=(6, 1)),
+        ],
+        [eg.Text("", key="cluster_report")],
+        [eg.Text("", key="cluster_sizes")],
+        [
+            eg.Button("Run Clustering"),
+            eg.Button("Use Representatives", disabled=True),
+            eg.Button("Back to Alignment"),
+            eg.Button("Cancel"),
+        ],
+    ]
+    opt_win = eg.Window("Reduce Dataset", layout, modal=True, resizable=True)
+    install_inactive_button_indicator(opt_win)
+    install_active_title_indicator(opt_win)
+    relax_modal_window(opt_win)
+    representatives = None
+    while True:
+        event, values = opt_win.read()
+        if event in ("Cancel", eg.WINDOW_CLOSED):
+            break
+        elif event == "Back to Alignment":
+            opt_win.close()
+            return "alignment"
+        elif event == "Run Clustering":
+            try:
+                identity, kmer_size = _parse_cluster_options(values)
+            except ValueError as exc:
+                eg.popup("Clustering option error: " + str(exc))
+                reactivate_window(opt_win)
+                continue
+            try:
+                records = parse_fasta_records(values["cluster_input"].strip())
+            except ValueError as exc:
+                eg.popup("FASTA input error:\n" + str(exc))
+                reactivate_window(opt_win)
+                continue
+            success, message, representatives, clusters = run_with_progress(
+                f"Clustering {len(records)} sequences is running...",
+                reduce_records,
+                records,
+                identity,
+                kmer_size,
+                parent_window=opt_win,
+                confirm_on_success=False,
+                progress_bar=True,
+            )
+            discard_pending_events(opt_win)
+            if not success:
+                representatives = None
+                eg.popup("Error: clustering failed.\n" + message)
+                reactivate_window(opt_win)
+                continue
+            opt_win["cluster_report"].update(message)
+            opt_win["cluster_sizes"].update(_format_largest_clusters(clusters))
+            opt_win["Use Representatives"].update(disabled=False)
+            reactivate_window(opt_win)
+        elif event == "Use Representatives" and representatives:
+            fasta_text = format_fasta_records(representatives)
+            context.set_original_input(fasta_text, representatives)
+            opt_win.close()
+            return "alignment"
+    opt_win.close()
+    return None
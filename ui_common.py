@@ -4,6 +4,10 @@ from pathlib import Path
 
 import TkEasyGUI as eg
 
+from alignment_matrix import load_alignment_with_summary
+
+ALIGNMENT_SUMMARY_EVENT = "-alignment-summary-"
+
 
 def discard_pending_events(window, max_reads=3):
     """Best-effort flush of queued GUI events after a modal child window closes."""
@@ -222,18 +226,30 @@ def _restore_grab(widget):
         return
 
 
-def run_with_progress(initial_message, run_func, *args, parent_window=None, **kwargs):
+def run_with_progress(
+    initial_message, run_func, *args, parent_window=None, confirm_on_success=True, progress_bar=False, **kwargs
+):
     """
     Displays a progress window with an initial message, executes the given function
     (blocking), then updates the progress window with a success message and waits for
     user confirmation.
 
-    If an error occurs, the progress window is closed immediately.
+    If an error occurs, the progress window is closed immediately. With
+    confirm_on_success=False it also closes as soon as the function returns.
+    With progress_bar=True the function is called with a ``progress`` keyword: a
+    callback taking the share of work done (0 to 1), shown in a progress bar.
     """
-    prog_layout = [
-        [eg.Multiline(key="progress", default_text=initial_message, size=(80, 10))],
-        [eg.Button("OK", key="ok", disabled=True)],
-    ]
+    prog_layout = [[eg.Multiline(key="progress", default_text=initial_message, size=(80, 10))]]
+    shared_progress = [0.0]
+    if progress_bar:
+        prog_layout.append([eg.Progressbar(value_range=(0, 100), default_value=0, key="progress_bar", length=400)])
+
+        def report_progress(share):
+            # Only the Tk loop below touches the window; the worker just records the share.
+            shared_progress[0] = share
+
+        kwargs["progress"] = report_progress
+    prog_layout.append([eg.Button("OK", key="ok", disabled=True)])
     prog_win = eg.Window("Progress", prog_layout, modal=False, resizable=True)
     install_inactive_button_indicator(prog_win)
     previous_grab = _release_current_grab(prog_win)
@@ -267,6 +283,8 @@ def run_with_progress(initial_message, run_func, *args, parent_window=None, **kw
     try:
         while result is None and worker_error is None:
             prog_win.read(timeout=100)
+            if progress_bar:
+                prog_win["progress_bar"].update(value=int(shared_progress[0] * 100))
             try:
                 outcome, value = completed.get_nowait()
             except queue.Empty:
@@ -279,7 +297,7 @@ def run_with_progress(initial_message, run_func, *args, parent_window=None, **kw
         if worker_error is not None:
             raise worker_error
 
-        if result[0]:
+        if confirm_on_success and result[0]:
             final_message = initial_message.replace("running", "completed") + "\nPress OK to continue."
             prog_win["progress"].update(final_message)
             prog_win["ok"].update(disabled=False)
@@ -301,6 +319,29 @@ def run_with_progress(initial_message, run_func, *args, parent_window=None, **kw
         _restore_grab(previous_grab)
 
 
+def start_alignment_summary(window, fasta_text):
+    """
+    Computes alignment statistics for ``fasta_text`` in a background thread and
+    delivers the one-line summary to ``window`` as ALIGNMENT_SUMMARY_EVENT. The
+    loaded AlignmentMatrix (or None) travels with it under the "alignment" key and
+    the summarized text under "fasta_text", so callers can drop results that arrive
+    after the text was edited again.
+    """
+
+    def run_in_worker():
+        alignment, summary = load_alignment_with_summary(fasta_text)
+        try:
+            window.post_event(
+                ALIGNMENT_SUMMARY_EVENT,
+                {ALIGNMENT_SUMMARY_EVENT: summary, "alignment": alignment, "fasta_text": fasta_text},
+            )
+        except Exception:
+            # The window was closed before the statistics were ready.
+            pass
+
+    threading.Thread(target=run_in_worker, daemon=True).start()
+
+
 def load_file(window_obj, key):
     """Opens a file dialog to load a FASTA file and updates the given GUI element."""
     context = getattr(window_obj, "context", None)
@@ -1,21 +1,29 @@
-import json
+import atexit
+import os
+import shutil
+import tempfile
 
 import TkEasyGUI as eg
 
-from fasta_utils import build_leaf_label_map, parse_fasta_records
+from distance_tree import build_quick_tree
+from fasta_utils import build_leaf_label_map, format_fasta_records, parse_fasta_records
 from feature_flags import ENABLE_DOWNLOAD_DISPLAY_TREE
 from ui_common import (
+    ALIGNMENT_SUMMARY_EVENT,
     discard_pending_events,
     install_inactive_button_indicator,
     install_active_title_indicator,
     relax_modal_window,
     reactivate_window,
     run_with_progress,
+    start_alignment_summary,
 )
 from services_iqtree import get_iqtree_version, run_iqtree, get_model_line
-from services_treeviz import handle_view_tree
+from services_treeviz import close_tree_view_session, handle_view_tree, push_tree_update, resolve_tree_selection
 from services_downloads import handle_download_newick, handle_download_display_tree, handle_download_all_files, handle_add_atha_gene_names
-from ui_leaf_selection import load_selection_payload, open_leaf_selection_window
+from selection_channel import SELECTION_EVENT
+from sequence_dedup import MIN_REPRESENTATIVES, collapse_identical_records, expand_identical_leaves, merge_identical_groups
+from ui_leaf_selection import open_leaf_selection_window
 
 
 def _sync_tree_output(win_res):
@@ -26,26 +34,19 @@ def _sync_tree_output(win_res):
     return tree_text
 
 
-def _maybe_handle_tree_selection(win_res):
-    selection_path = getattr(win_res, "tree_selection_path", None)
-    if not selection_path or not selection_path.exists():
-        return
-
-    try:
-        mtime_ns = selection_path.stat().st_mtime_ns
-    except OSError:
-        return
-    if getattr(win_res, "tree_selection_seen_mtime_ns", None) == mtime_ns:
-        return
-
+def _handle_tree_selection(win_res, selection_payload):
     try:
-        selection_payload = load_selection_payload(selection_path)
-    except (OSError, json.JSONDecodeError):
-        # The browser callback normally replaces this file atomically. If an
-        # external process changes it concurrently, retry on the next poll.
-        return
-    win_res.tree_selection_seen_mtime_ns = mtime_ns
-    action = open_leaf_selection_window(win_res.context, selection_payload, parent_iqtree_window=win_res)
+        selected_leaf_names, record_indices = resolve_tree_selection(win_res, selection_payload)
+    except ValueError as exc:
+        eg.popup("Failed to read the viewer selection:\n" + str(exc))
+        discard_pending_events(win_res)
+        return None
+    action = open_leaf_selection_window(
+        win_res.context,
+        selected_leaf_names,
+        record_indices,
+        parent_iqtree_window=win_res,
+    )
     discard_pending_events(win_res)
     return action
 
@@ -55,6 +56,40 @@ def _restore_result_window_interaction(win_res):
     reactivate_window(win_res)
 
 
+def _close_result_window(win_res):
+    close_tree_view_session(win_res)
+    try:
+        win_res.close()
+    except Exception:
+        pass
+
+
+def _stage_after_result(action):
+    if action == "Open in Alignment":
+        return "alignment"
+    if action == "Open in Trim":
+        return "trim"
+    if action == "Back to IQTREE Options":
+        return "iqtree"
+    return None
+
+
+QUICK_TREE_PREFIX = "quick_tree"
+_quick_tree_dir = None
+
+
+def _write_quick_tree(newick_text):
+    # One directory per session; each preview overwrites the previous tree file.
+    global _quick_tree_dir
+    if _quick_tree_dir is None:
+        _quick_tree_dir = tempfile.mkdtemp(prefix="phylo_quick_tree_")
+        atexit.register(shutil.rmtree, _quick_tree_dir, ignore_errors=True)
+    treefile = os.path.join(_quick_tree_dir, QUICK_TREE_PREFIX + ".nwk")
+    with open(treefile, "w") as f:
+        f.write(newick_text)
+    return _quick_tree_dir, treefile
+
+
 def open_iqtree_options_window(context):
     """
     Opens the IQ-TREE options window.
@@ -62,7 +97,17 @@ def open_iqtree_options_window(context):
     After execution, displays the IQ-TREE result window.
     """
     layout = [
-        [eg.Multiline(key="iqtree_input", default_text=context.get_iqtree_input_text(), size=(80, 20), expand_x=True, expand_y=True)],
+        [
+            eg.Multiline(
+                key="iqtree_input",
+                default_text=context.get_iqtree_input_text(),
+                size=(80, 20),
+                expand_x=True,
+                expand_y=True,
+                enable_focus_events=True,
+            )
+        ],
+        [eg.Text("Computing alignment statistics...", key="alignment_summary")],
         [eg.Text("IQ-TREE version: " + get_iqtree_version())],
         [eg.Text("threads (0 = auto):"), eg.Input(default_text="0", key="threads", size=(10, 1))],
         [eg.Text("Confidence analyses")],
@@ -77,6 +122,13 @@ def open_iqtree_options_window(context):
         [eg.Text("abayes:"), eg.Checkbox("Use abayes", default=False, key="abayes")],
         [eg.Text("Substitution model:"), eg.Input(default_text="auto", key="subst_model", size=(20, 1))],
         [eg.Text("Output prefix:"), eg.Input(default_text="tmp", key="output_prefix", size=(10, 1))],
+        [eg.Checkbox("Collapse identical aligned sequences (duplicates rejoin the final tree)", default=False, key="collapse_identical")],
+        [
+            eg.Text("Quick tree distances:"),
+            eg.Radio("JC", "quick_model", default=True, key="quick_model_jc"),
+            eg.Radio("p-distance", "quick_model", key="quick_model_p"),
+            eg.Button("Quick Tree"),
+        ],
         [eg.Button("Run IQTREE"), eg.Button("Back to Trim"), eg.Button("Back to Alignment"), eg.Button("Cancel")],
     ]
     win = eg.Window("IQTREE Options", layout, modal=True, resizable=True)
@@ -84,16 +136,76 @@ def open_iqtree_options_window(context):
     install_active_title_indicator(win)
     relax_modal_window(win)
     setattr(context, "close_iqtree_stage_requested", False)
+    summarized_text = context.get_iqtree_input_text().strip()
+    start_alignment_summary(win, summarized_text)
     while True:
         event, values = win.read()
         if event in ("Cancel", eg.WINDOW_CLOSED):
             break
+        elif event == ALIGNMENT_SUMMARY_EVENT:
+            # Summaries can finish out of order; only the one for the current text is shown.
+            if values["fasta_text"] == summarized_text:
+                win["alignment_summary"].update(values[ALIGNMENT_SUMMARY_EVENT])
+        elif event == "iqtree_input":
+            iqtree_input = values["iqtree_input"].strip()
+            if values.get("event_type") == "focusout" and iqtree_input != summarized_text:
+                summarized_text = iqtree_input
+                win["alignment_summary"].update("Computing alignment statistics...")
+                start_alignment_summary(win, summarized_text)
         elif event == "Back to Trim":
             win.close()
             return "trim"
         elif event == "Back to Alignment":
             win.close()
             return "alignment"
+        elif event == "Quick Tree":
+            # A neighbor-joining preview from the same input, shown in the usual result
+            # window, so a dataset can be checked before a full IQ-TREE run.
+            model = "p" if values.get("quick_model_p") else "jc"
+            iqtree_input = values["iqtree_input"].strip()
+            if context.tree_newick_text and context.iqtree_prefix != QUICK_TREE_PREFIX:
+                should_continue = eg.popup_yes_no(
+                    "The quick tree preview replaces the current IQ-TREE result in this session.\n\nContinue?"
+                )
+                reactivate_window(win)
+                if should_continue != "Yes":
+                    continue
+            success, message, tree_content = run_with_progress(
+                "Quick tree (neighbor joining) is running...",
+                build_quick_tree,
+                iqtree_input,
+                model,
+                parent_window=win,
+                confirm_on_success=False,
+            )
+            discard_pending_events(win)
+            if not success:
+                eg.popup("Error: quick tree failed.\n" + message)
+                reactivate_window(win)
+                continue
+            identical_groups = context.identical_groups_for(iqtree_input)
+            if identical_groups:
+                try:
+                    tree_content = expand_identical_leaves(tree_content, identical_groups)
+                except (OSError, ValueError) as exc:
+                    eg.popup("Could not restore the collapsed sequences in the tree:\n" + str(exc))
+            try:
+                output_dir, treefile = _write_quick_tree(tree_content)
+            except OSError as exc:
+                eg.popup("Error: could not write the quick tree.\n" + str(exc))
+                reactivate_window(win)
+                continue
+            context.set_iqtree_output(
+                output_dir=output_dir,
+                prefix=QUICK_TREE_PREFIX,
+                treefile_path=treefile,
+                report_path=None,
+                newick_text=tree_content,
+            )
+            context.leaf_label_map = build_leaf_label_map(context.original_records, tree_content)
+            win.close()
+            action = open_iqtree_result_window(context, summary=message + " (preview, not an IQ-TREE result)")
+            return _stage_after_result(action)
         elif event == "Run IQTREE":
             try:
                 threads = int(values["threads"].strip())
@@ -109,11 +221,22 @@ def open_iqtree_options_window(context):
             iqtree_input = values["iqtree_input"].strip()
             output_prefix = values["output_prefix"].strip()
             try:
-                parse_fasta_records(iqtree_input)
+                records = parse_fasta_records(iqtree_input)
             except ValueError as exc:
                 eg.popup("FASTA input error:\n" + str(exc))
                 reactivate_window(win)
                 continue
+            # Groups collapsed before alignment travel through trim unchanged and rejoin here too,
+            # unless this input is not the text they were computed for.
+            earlier_groups = context.identical_groups_for(iqtree_input)
+            later_groups = {}
+            if values.get("collapse_identical"):
+                representatives, later_groups = collapse_identical_records(records, ignore_gaps=False)
+                if later_groups and len(representatives) >= MIN_REPRESENTATIVES:
+                    iqtree_input = format_fasta_records(representatives)
+                else:
+                    later_groups = {}
+            identical_groups = merge_identical_groups(earlier_groups, later_groups)
             result = run_with_progress(
                 "IQTREE analysis is running...",
                 run_iqtree,
@@ -135,6 +258,13 @@ def open_iqtree_options_window(context):
                 treefile = result[2]
                 with open(treefile, "r") as f:
                     tree_content = f.read()
+                if identical_groups:
+                    try:
+                        tree_content = expand_identical_leaves(tree_content, identical_groups)
+                        with open(treefile, "w") as f:
+                            f.write(tree_content)
+                    except (OSError, ValueError) as exc:
+                        eg.popup("Could not restore the collapsed sequences in the tree:\n" + str(exc))
                 context.set_iqtree_output(
                     output_dir=result[5],
                     prefix=output_prefix,
@@ -144,23 +274,26 @@ def open_iqtree_options_window(context):
                 )
                 context.leaf_label_map = build_leaf_label_map(context.original_records, tree_content)
                 win.close()
-                action = open_iqtree_result_window(context)
-                if action == "Open in Alignment":
-                    return "alignment"
-                if action == "Back to IQTREE Options":
-                    return "iqtree"
-                return None
+                return _stage_after_result(open_iqtree_result_window(context))
     win.close()
     return None
 
 
-def open_iqtree_result_window(context):
-    """Displays the IQ-TREE result window and offers further actions."""
+def open_iqtree_result_window(context, summary=None):
+    """
+    Displays the IQ-TREE result window and offers further actions.
+    summary replaces the model line in the header, e.g. for a quick-tree preview.
+    """
     win_res = None
     try:
         treefile = str(context.treefile_path)
         tree_content = context.tree_newick_text or ""
-        model_info = get_model_line(str(context.iqtree_report_path)) if context.iqtree_report_path else "External tree loaded"
+        if summary:
+            model_info = summary
+        elif context.iqtree_report_path:
+            model_info = get_model_line(str(context.iqtree_report_path))
+        else:
+            model_info = "External tree loaded"
         result_header = f"{model_info}\n"
         action_buttons = [eg.Button("View Tree")]
         utility_buttons = [eg.Button("Copy"), eg.Button("Add Atha gene names"), eg.Button("Download Newick")]
@@ -169,7 +302,16 @@ def open_iqtree_result_window(context):
         utility_buttons.append(eg.Button("Download all files"))
         layout = [
             [eg.Text(result_header)],
-            [eg.Multiline(key="tree_output", default_text=tree_content, size=(80, 20), expand_x=True, expand_y=True)],
+            [
+                eg.Multiline(
+                    key="tree_output",
+                    default_text=tree_content,
+                    size=(80, 20),
+                    expand_x=True,
+                    expand_y=True,
+                    enable_focus_events=True,
+                )
+            ],
             action_buttons,
             utility_buttons,
             [eg.Button("Back to IQTREE Options"), eg.Button("Close")],
@@ -183,11 +325,10 @@ def open_iqtree_result_window(context):
         win_res.tree_content = tree_content
         win_res.treefile = treefile
         win_res.display_tree_path = None
-        win_res.tree_selection_path = None
-        win_res.tree_selection_seen_mtime_ns = None
+        win_res.tree_selection_channel = None
         ret = None
         while True:
-            event, _ = win_res.read(timeout=250)
+            event, values = win_res.read()
             try:
                 _sync_tree_output(win_res)
             except Exception:
@@ -195,17 +336,29 @@ def open_iqtree_result_window(context):
                     raise
             if event in ("Close", eg.WINDOW_CLOSED):
                 break
-            selection_action = _maybe_handle_tree_selection(win_res)
-            if selection_action and selection_action.get("action") == "open_alignment":
-                context.set_original_input(selection_action["fasta_text"], selection_action["records"])
-                ret = "Open in Alignment"
-                break
+            if event == "tree_output":
+                # Edits reach an open viewer once the text box loses focus.
+                if values.get("event_type") == "focusout":
+                    push_tree_update(win_res)
+            elif event == SELECTION_EVENT:
+                selection_action = _handle_tree_selection(win_res, values[SELECTION_EVENT])
+                if selection_action and selection_action.get("action") == "open_alignment":
+                    context.set_original_input(selection_action["fasta_text"], selection_action["records"])
+                    ret = "Open in Alignment"
+                    break
+                if selection_action and selection_action.get("action") == "open_trim":
+                    context.set_original_input(selection_action["fasta_text"], selection_action["records"])
+                    context.set_alignment_output(selection_action["alignment_text"])
+                    ret = "Open in Trim"
+                    break
             elif event == "Copy":
                 eg.set_clipboard(win_res.tree_content)
                 eg.popup("Result copied to clipboard.")
                 _restore_result_window_interaction(win_res)
             elif event == "Add Atha gene names":
                 handle_add_atha_gene_names(win_res)
+                _sync_tree_output(win_res)
+                push_tree_update(win_res)
                 _restore_result_window_interaction(win_res)
             elif event == "View Tree":
                 handle_view_tree(win_res)
@@ -231,15 +384,9 @@ def open_iqtree_result_window(context):
         return ret
     except Exception as e:
         if win_res is not None:
-            try:
-                win_res.close()
-            except Exception:
-                pass
+            _close_result_window(win_res)
             win_res = None
         eg.popup("Failed to load output file:\n" + str(e))
     finally:
         if win_res is not None:
-            try:
-                win_res.close()
-            except Exception:
-                pass
+            _close_result_window(win_res)
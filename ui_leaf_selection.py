@@ -1,9 +1,10 @@
-import json
 import tkinter.filedialog as fd
 
 import TkEasyGUI as eg
 
 from fasta_utils import format_fasta_records, select_records_by_ids
+from sequence_dedup import member_aliases
+from services_alignment import project_alignment
 from ui_common import (
     install_inactive_button_indicator,
     install_active_title_indicator,
@@ -18,15 +19,18 @@ def _resolve_selected_ids(context, selected_leaf_names):
     return [context.leaf_label_map.get(name, name) for name in selected_leaf_names]
 
 
-def _build_selected_fasta(context, selected_leaf_names):
-    resolved_ids = _resolve_selected_ids(context, selected_leaf_names)
-    records = select_records_by_ids(context.original_records, resolved_ids)
+def _build_selected_fasta(context, selected_leaf_names, record_indices=None):
+    if record_indices is None:
+        resolved_ids = _resolve_selected_ids(context, selected_leaf_names)
+        records = select_records_by_ids(context.original_records, resolved_ids)
+    else:
+        records = [context.original_records[index] for index in record_indices]
     return records, format_fasta_records(records)
 
 
-def open_leaf_selection_window(context, selection_payload, parent_iqtree_window=None):
-    selected_leaf_names = selection_payload.get("selected_leaf_names", [])
-    records, fasta_text = _build_selected_fasta(context, selected_leaf_names)
+def open_leaf_selection_window(context, selected_leaf_names, record_indices=None, parent_iqtree_window=None):
+    """record_indices, when given, are positions in context.original_records already resolved from the selection."""
+    records, fasta_text = _build_selected_fasta(context, selected_leaf_names, record_indices)
     missing_count = max(0, len(selected_leaf_names) - len(records))
 
     layout = [
@@ -37,7 +41,10 @@ def open_leaf_selection_window(context, selection_payload, parent_iqtree_window=
         [eg.Multiline(key="selected_leaf_names", default_text="", size=(80, 12), expand_x=True, expand_y=True)],
         [eg.Text("Selected FASTA")],
         [eg.Multiline(key="selected_fasta", default_text="", size=(80, 16), expand_x=True, expand_y=True)],
-        [eg.Button("Open in Alignment")],
+        [
+            eg.Button("Open in Alignment"),
+            eg.Button("Project Alignment to Trim", disabled=not (context and context.alignment_output_text)),
+        ],
         [eg.Button("Copy FASTA"), eg.Button("Export FASTA")],
         [eg.Button("Close")],
     ]
@@ -89,11 +96,30 @@ def open_leaf_selection_window(context, selection_payload, parent_iqtree_window=
             except Exception as exc:
                 eg.popup("Failed to open Alignment window:\n" + str(exc))
                 reactivate_window(window)
+        elif event == "Project Alignment to Trim":
+            # Reuses the current alignment's rows instead of realigning; "Open in Alignment"
+            # remains the way to realign the selection from scratch.
+            try:
+                projected_records = project_alignment(
+                    context.alignment_output_text, records, aliases=member_aliases(context.identical_groups)
+                )
+            except ValueError as exc:
+                eg.popup("Cannot project the alignment:\n" + str(exc))
+                reactivate_window(window)
+                continue
+            should_continue = eg.popup_yes_no(
+                "Opening Trim with the projected alignment will reset the current trim and IQ-TREE results.\n\nContinue?"
+            )
+            reactivate_window(window)
+            if should_continue != "Yes":
+                continue
+            window.close()
+            return {
+                "action": "open_trim",
+                "fasta_text": fasta_text,
+                "records": records,
+                "alignment_text": format_fasta_records(projected_records),
+            }
 
     window.close()
     return None
-
-
-def load_selection_payload(selection_path):
-    with open(selection_path, "r", encoding="utf-8") as handle:
-        return json.load(handle)
@@ -2,7 +2,11 @@ def run_pipeline_windows(context, start_stage="alignment"):
     """Run pipeline windows from one loop so Back/Next does not grow the call stack."""
     stage = start_stage
     while stage:
-        if stage == "alignment":
+        if stage == "cluster":
+            from ui_cluster import open_cluster_options_window
+
+            stage = open_cluster_options_window(context)
+        elif stage == "alignment":
             from ui_alignment import open_alignment_options_window
 
             stage = open_alignment_options_window(context)
@@ -63,6 +63,8 @@ def _open_tree_result_bypass(context, portal_fasta_text):
     action = open_iqtree_result_window(context)
     if action == "Open in Alignment":
         run_pipeline_windows(context, "alignment")
+    elif action == "Open in Trim":
+        run_pipeline_windows(context, "trim")
 
 
 def open_portal_window(context=None):
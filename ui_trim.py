@@ -5,15 +5,53 @@ import tkinter.filedialog as fd
 import TkEasyGUI as eg
 
 from fasta_utils import parse_fasta_records
-from services_trim import get_trimal_version, run_trimal
+from services_trim import (
+    compare_trimal_modes,
+    format_column_ranges,
+    get_trimal_version,
+    run_trimal,
+    write_trimal_report,
+)
+from trim_engine import DEFAULT_GAP_THRESHOLD, format_retention_preview
 from ui_common import (
+    ALIGNMENT_SUMMARY_EVENT,
     discard_pending_events,
     install_inactive_button_indicator,
     install_active_title_indicator,
     relax_modal_window,
     reactivate_window,
+    run_with_progress,
+    start_alignment_summary,
 )
 
+_SHOW_REPORT_BUTTON = "Show report (reruns trimal)"
+_MODE_RADIO_KEYS = {
+    "automated1": "trim_mode_automated1",
+    "gappyout": "trim_mode_gappyout",
+    "strict": "trim_mode_strict",
+    "strictplus": "trim_mode_strictplus",
+    "nogaps": "trim_mode_nogap",
+}
+
+
+def _parse_gap_threshold(text):
+    threshold = float(text.strip())
+    if not 0 <= threshold <= 1:
+        raise ValueError("Gap threshold must be between 0 and 1.")
+    return threshold
+
+
+def _update_trim_preview(opt_win, alignment, gap_threshold_text):
+    """Shows the columns the gap-based modes would keep; trimAl's own run stays authoritative."""
+    if alignment is None:
+        opt_win["trim_preview"].update("")
+        return
+    try:
+        gap_threshold = _parse_gap_threshold(gap_threshold_text)
+    except ValueError:
+        gap_threshold = DEFAULT_GAP_THRESHOLD
+    opt_win["trim_preview"].update(format_retention_preview(alignment, gap_threshold))
+
 
 def open_trim_options_window(context):
     """
@@ -24,7 +62,17 @@ def open_trim_options_window(context):
     """
     trimal_version = get_trimal_version()
     layout = [
-        [eg.Multiline(key="trim_input", default_text=context.get_trim_input_text(), size=(80, 20), expand_x=True, expand_y=True)],
+        [
+            eg.Multiline(
+                key="trim_input",
+                default_text=context.get_trim_input_text(),
+                size=(80, 20),
+                expand_x=True,
+                expand_y=True,
+                enable_focus_events=True,
+            )
+        ],
+        [eg.Text("Computing alignment statistics...", key="alignment_summary")],
         [eg.Text("trimal: " + trimal_version)],
         [
             eg.Text("Mode:"),
@@ -33,17 +81,41 @@ def open_trim_options_window(context):
             eg.Radio("strict", "trim_mode", key="trim_mode_strict"),
             eg.Radio("strictplus", "trim_mode", key="trim_mode_strictplus"),
             eg.Radio("nogaps", "trim_mode", key="trim_mode_nogap"),
+            eg.Radio("gt", "trim_mode", key="trim_mode_gt"),
+            eg.Input(default_text=str(DEFAULT_GAP_THRESHOLD), key="gap_threshold", size=(6, 1), enable_events=True),
         ],
-        [eg.Button("Run Trim"), eg.Button("Skip to IQTREE"), eg.Button("Back to Alignment"), eg.Button("Cancel")],
+        [eg.Text("", key="trim_preview")],
+        [eg.Button("Run Trim"), eg.Button("Compare Modes"), eg.Button("Skip to IQTREE"), eg.Button("Back to Alignment"), eg.Button("Cancel")],
     ]
     opt_win = eg.Window("Trim Options", layout, modal=True, resizable=True)
     install_inactive_button_indicator(opt_win)
     install_active_title_indicator(opt_win)
     relax_modal_window(opt_win)
+    summarized_text = context.get_trim_input_text().strip()
+    alignment = None
+    start_alignment_summary(opt_win, summarized_text)
     while True:
         event, values = opt_win.read()
         if event in ("Cancel", eg.WINDOW_CLOSED):
             break
+        elif event == ALIGNMENT_SUMMARY_EVENT:
+            # Summaries can finish out of order; an older one would put the wrong matrix
+            # behind the retention preview.
+            if values["fasta_text"] != summarized_text:
+                continue
+            alignment = values["alignment"]
+            opt_win["alignment_summary"].update(values[ALIGNMENT_SUMMARY_EVENT])
+            _update_trim_preview(opt_win, alignment, opt_win["gap_threshold"].get())
+        elif event == "gap_threshold":
+            _update_trim_preview(opt_win, alignment, values["gap_threshold"])
+        elif event == "trim_input":
+            trim_input = values["trim_input"].strip()
+            if values.get("event_type") == "focusout" and trim_input != summarized_text:
+                summarized_text = trim_input
+                alignment = None
+                opt_win["alignment_summary"].update("Computing alignment statistics...")
+                _update_trim_preview(opt_win, None, "")
+                start_alignment_summary(opt_win, summarized_text)
         elif event == "Back to Alignment":
             opt_win.close()
             return "alignment"
@@ -55,9 +127,34 @@ def open_trim_options_window(context):
                 eg.popup("FASTA input error:\n" + str(exc))
                 reactivate_window(opt_win)
                 continue
-            context.set_trim_output(trim_input)
+            context.set_trim_output(trim_input, source_text=trim_input)
             opt_win.close()
             return "iqtree"
+        elif event == "Compare Modes":
+            trim_input = values["trim_input"].strip()
+            try:
+                parse_fasta_records(trim_input)
+            except ValueError as exc:
+                eg.popup("FASTA input error:\n" + str(exc))
+                reactivate_window(opt_win)
+                continue
+            success, message, results, input_columns = run_with_progress(
+                "Comparing trimal modes is running...",
+                compare_trimal_modes,
+                trim_input,
+                parent_window=opt_win,
+                confirm_on_success=False,
+            )
+            discard_pending_events(opt_win)
+            if not success:
+                eg.popup("Error: trimal mode comparison failed.\n" + message)
+                reactivate_window(opt_win)
+                continue
+            chosen_mode = open_trim_compare_window(results, input_columns)
+            if chosen_mode:
+                opt_win[_MODE_RADIO_KEYS[chosen_mode]].select()
+            discard_pending_events(opt_win)
+            reactivate_window(opt_win)
         elif event == "Run Trim":
             mode = (
                 "automated1"
@@ -68,8 +165,18 @@ def open_trim_options_window(context):
                 if values.get("trim_mode_strict")
                 else "strictplus"
                 if values.get("trim_mode_strictplus")
+                else "gt"
+                if values.get("trim_mode_gt")
                 else "nogaps"
             )
+            gap_threshold = None
+            if mode == "gt":
+                try:
+                    gap_threshold = _parse_gap_threshold(values["gap_threshold"])
+                except ValueError as exc:
+                    eg.popup("Gap threshold error: " + str(exc))
+                    reactivate_window(opt_win)
+                    continue
             trim_input = values["trim_input"].strip()
             try:
                 parse_fasta_records(trim_input)
@@ -77,19 +184,15 @@ def open_trim_options_window(context):
                 eg.popup("FASTA input error:\n" + str(exc))
                 reactivate_window(opt_win)
                 continue
-            success, message, trimmed_result, output_path, html_path = run_trimal(trim_input, mode)
+            success, message, trimmed_result, trimmed_alignment = run_trimal(
+                trim_input, mode, gap_threshold=gap_threshold
+            )
             if not success:
                 eg.popup("Error: trimal execution failed.\n" + message)
                 reactivate_window(opt_win)
                 continue
-            context.set_trim_output(trimmed_result)
-            action = open_trim_result_window(context, output_path, html_path)
-            for _p in (output_path, html_path):
-                try:
-                    if _p and os.path.exists(_p):
-                        os.remove(_p)
-                except OSError:
-                    pass
+            context.set_trim_output(trimmed_result, source_text=trim_input)
+            action = open_trim_result_window(context, trimmed_alignment, (trim_input, mode, gap_threshold))
             discard_pending_events(opt_win)
             if action == "Go to IQTREE":
                 opt_win.close()
@@ -101,16 +204,76 @@ def open_trim_options_window(context):
     return None
 
 
-def open_trim_result_window(context, output_path, html_path):
+def _format_mode_comparison(results, input_columns):
+    lines = []
+    for result in results:
+        if not result["ok"]:
+            lines.append(f"{result['mode']}: failed: {result['error'].strip()}")
+            lines.append("")
+            continue
+        kept = result["length"]
+        lines.append(
+            f"{result['mode']}: kept {kept} of {input_columns} columns "
+            f"({kept / input_columns if input_columns else 0:.1%}), gaps {result['gap_fraction']:.1%}, "
+            f"{result['seconds']:.2f} s"
+        )
+        lines.append("  kept columns (0-based): " + (format_column_ranges(result["columns"]) or "none"))
+        lines.append("")
+    return "\n".join(lines)
+
+
+def open_trim_compare_window(results, input_columns):
+    """
+    Shows every mode's retained length, gap content and kept-column map side by side.
+    Returns the mode the user chose to use, or None.
+    """
+    layout = [
+        [eg.Text(f"Input alignment: {input_columns} columns")],
+        [
+            eg.Multiline(
+                key="comparison",
+                default_text=_format_mode_comparison(results, input_columns),
+                size=(100, 24),
+                expand_x=True,
+                expand_y=True,
+            )
+        ],
+        [eg.Text("Use mode:")]
+        + [eg.Button(result["mode"], key="use_" + result["mode"]) for result in results if result["ok"]],
+        [eg.Button("Close")],
+    ]
+    cmp_win = eg.Window("Trim Mode Comparison", layout, modal=True, resizable=True)
+    install_inactive_button_indicator(cmp_win)
+    install_active_title_indicator(cmp_win)
+    relax_modal_window(cmp_win)
+    chosen_mode = None
+    while True:
+        event, _ = cmp_win.read()
+        if event in ("Close", eg.WINDOW_CLOSED):
+            break
+        if isinstance(event, str) and event.startswith("use_"):
+            chosen_mode = event[len("use_"):]
+            break
+    cmp_win.close()
+    return chosen_mode
+
+
+def open_trim_result_window(context, alignment, report_args):
     """
     Displays the trim result window.
+    report_args are the (trim_input, mode, gap_threshold) of the run; trimal's HTML
+    report is only generated from them, by running the whole trim again, when
+    "Show report (reruns trimal)" is pressed.
     If the user selects "Go to IQTREE", returns that event.
     Otherwise, closes normally.
     """
+    rows, columns = alignment.shape
+    gap_fraction = alignment.gap_fraction().mean() if columns else 0.0
     layout = [
         [eg.Multiline(key="trimmed_output", default_text=context.trim_output_text or "", size=(80, 20), expand_x=True, expand_y=True)],
+        [eg.Text(f"Trimmed alignment: {rows} sequences x {columns} columns; gaps {gap_fraction:.1%}")],
         [eg.Button("Go to IQTREE")],
-        [eg.Button("Copy"), eg.Button("Show result"), eg.Button("Download")],
+        [eg.Button("Copy"), eg.Button(_SHOW_REPORT_BUTTON), eg.Button("Download")],
         [eg.Button("Back to Options"), eg.Button("Close Stage")],
     ]
     res_win = eg.Window("Trim Result", layout, modal=True, finalize=True, resizable=True)
@@ -118,6 +281,7 @@ def open_trim_result_window(context, output_path, html_path):
     install_active_title_indicator(res_win)
     relax_modal_window(res_win)
     ret = None
+    html_path = None
     while True:
         event, vals = res_win.read()
         if vals and "trimmed_output" in vals:
@@ -128,7 +292,20 @@ def open_trim_result_window(context, output_path, html_path):
             eg.set_clipboard(vals["trimmed_output"])
             eg.popup("Result copied to clipboard.")
             reactivate_window(res_win)
-        elif event == "Show result":
+        elif event == _SHOW_REPORT_BUTTON:
+            if html_path is None:
+                success, message, html_path = run_with_progress(
+                    "Running trimal again to build its HTML report...",
+                    write_trimal_report,
+                    *report_args,
+                    parent_window=res_win,
+                    confirm_on_success=False,
+                )
+                discard_pending_events(res_win)
+                if not success:
+                    eg.popup("Error: trimal report failed.\n" + message)
+                    reactivate_window(res_win)
+                    continue
             webbrowser.open("file://" + os.path.abspath(html_path))
             reactivate_window(res_win)
         elif event == "Download":
@@ -150,4 +327,9 @@ def open_trim_result_window(context, output_path, html_path):
             ret = event
             break
     res_win.close()
+    if html_path and os.path.exists(html_path):
+        try:
+            os.remove(html_path)
+        except OSError:
+            pass
     return ret
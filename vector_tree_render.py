@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""Render a Newick tree to SVG or PDF without ete3, Qt or a display."""
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from newick_tree import FlatTree, parse_newick
+
+
+DEFAULT_WIDTH = 800
+ROW_HEIGHT = 14
+FONT_SIZE = 10
+SUPPORT_FONT_SIZE = 7
+MARGIN = 20
+# Rough Helvetica advance per character, used only to reserve room for labels.
+CHAR_WIDTH = 0.6
+# Most PDF viewers refuse pages larger than 200 inches; taller trees are scaled down to fit.
+PDF_MAX_PAGE = 14400
+VECTOR_FORMATS = (".svg", ".pdf")
+
+
+@dataclass
+class TreeLayout:
+    """Rectangular phylogram positions in points; y grows downwards, one row per leaf."""
+
+    tree: FlatTree
+    x: list[float]
+    y: list[float]
+    width: float
+    height: float
+
+
+def split_gene_label(name: str) -> tuple[str, str | None]:
+    """Split an ``ID<gene>`` leaf label into its id and gene-name annotation."""
+    cut = name.find("<")
+    if cut > 0 and name.endswith(">"):
+        return name[:cut], name[cut + 1:-1]
+    return name, None
+
+
+def _leaf_label(name: str) -> str:
+    base, gene = split_gene_label(name)
+    return base + (" " + gene if gene else "")
+
+
+def _branch_length(text: str | None) -> float:
+    try:
+        return max(0.0, float(text)) if text is not None else 0.0
+    except ValueError:
+        return 0.0
+
+
+def layout_tree(tree: FlatTree, *, width: float = DEFAULT_WIDTH, row_height: float = ROW_HEIGHT) -> TreeLayout:
+    count = len(tree)
+    use_lengths = any(length is not None for length in tree.lengths[1:])
+    depth = [0.0] * count
+    # Preorder ids put every parent before its children.
+    for node in range(1, count):
+        step = _branch_length(tree.lengths[node]) if use_lengths else 1.0
+        depth[node] = depth[tree.parents[node]] + step
+
+    longest_label = max((len(_leaf_label(tree.names[leaf])) for leaf in tree.leaf_nodes), default=0)
+    label_room = longest_label * FONT_SIZE * CHAR_WIDTH + 8
+    plot_width = max(width - 2 * MARGIN - label_room, 50.0)
+    deepest = max(depth) or 1.0
+    x = [MARGIN + plot_width * value / deepest for value in depth]
+
+    y = [0.0] * count
+    for order, leaf in enumerate(tree.leaf_nodes):
+        y[leaf] = MARGIN + (order + 0.5) * row_height
+    for node in range(count - 1, -1, -1):
+        children = tree.children[node]
+        if children:
+            y[node] = (y[children[0]] + y[children[-1]]) / 2
+
+    height = 2 * MARGIN + len(tree.leaf_nodes) * row_height
+    return TreeLayout(tree=tree, x=x, y=y, width=MARGIN + plot_width + label_room + MARGIN, height=height)
+
+
+def _support_label(tree: FlatTree, node: int) -> str:
+    name = tree.names[node]
+    if node == 0 or not tree.children[node] or not name or name.startswith("__"):
+        return ""
+    return name
+
+
+def write_svg(layout: TreeLayout, handle):
+    """Write the layout as SVG, one element per line, so memory use does not grow with the tree."""
+    tree = layout.tree
+    x = layout.x
+    y = layout.y
+    handle.write(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{layout.width:.1f}" height="{layout.height:.1f}" '
+        f'viewBox="0 0 {layout.width:.1f} {layout.height:.1f}" font-family="Helvetica, Arial, sans-serif">\n'
+        '<g fill="none" stroke="#000" stroke-width="1">\n'
+    )
+    for node in range(1, len(tree)):
+        parent = tree.parents[node]
+        handle.write(f'<path d="M{x[parent]:.2f} {y[parent]:.2f}V{y[node]:.2f}H{x[node]:.2f}"/>\n')
+    handle.write(f'</g>\n<g font-size="{FONT_SIZE}" dominant-baseline="middle">\n')
+    for leaf in tree.leaf_nodes:
+        base, gene = split_gene_label(tree.names[leaf])
+        gene_span = f' <tspan font-style="italic" fill="#555">{escape(gene)}</tspan>' if gene else ""
+        handle.write(f'<text x="{x[leaf] + 4:.2f}" y="{y[leaf]:.2f}">{escape(base)}{gene_span}</text>\n')
+    handle.write(f'</g>\n<g font-size="{SUPPORT_FONT_SIZE}" fill="#444">\n')
+    for node in range(1, len(tree)):
+        label = _support_label(tree, node)
+        if label:
+            left = x[tree.parents[node]] + 2
+            handle.write(f'<text x="{left:.2f}" y="{y[node] - 2:.2f}">{escape(label)}</text>\n')
+    handle.write("</g>\n</svg>\n")
+
+
+def _pdf_text(text: str) -> str:
+    data = text.encode("cp1252", errors="replace").decode("latin-1")
+    return "(" + data.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+class _PdfWriter:
+    """Tracks byte offsets so objects can be streamed straight to the output."""
+
+    def __init__(self, handle):
+        self._handle = handle
+        self.offsets = {}
+        self.position = 0
+
+    def write(self, text: str):
+        data = text.encode("latin-1")
+        self._handle.write(data)
+        self.position += len(data)
+        return len(data)
+
+    def begin_object(self, number: int):
+        self.offsets[number] = self.position
+        self.write(f"{number} 0 obj\n")
+
+
+def write_pdf(layout: TreeLayout, handle):
+    """Write the layout as a single-page PDF; ``handle`` must be opened in binary mode."""
+    tree = layout.tree
+    x = layout.x
+    scale = min(1.0, PDF_MAX_PAGE / max(layout.width, layout.height))
+    page_height = layout.height
+    y = [page_height - value for value in layout.y]
+    pdf = _PdfWriter(handle)
+
+    pdf.write("%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    pdf.begin_object(1)
+    pdf.write("<< /Type /Catalog /Pages 2 0 R >>\nendobj\n")
+    pdf.begin_object(2)
+    pdf.write("<< /Type /Pages /Kids [3 0 R] /Count 1 >>\nendobj\n")
+    pdf.begin_object(3)
+    pdf.write(
+        f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {layout.width * scale:.2f} {layout.height * scale:.2f}] "
+        "/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> /Contents 6 0 R >>\nendobj\n"
+    )
+    for number, font in ((4, "Helvetica"), (5, "Helvetica-Oblique")):
+        pdf.begin_object(number)
+        pdf.write(f"<< /Type /Font /Subtype /Type1 /BaseFont /{font} /Encoding /WinAnsiEncoding >>\nendobj\n")
+
+    # The stream length is an indirect object written afterwards, so the
+    # content never has to be held in memory to be measured.
+    pdf.begin_object(6)
+    pdf.write("<< /Length 7 0 R >>\nstream\n")
+    length = pdf.write(f"{scale:.6f} 0 0 {scale:.6f} 0 0 cm\n0 0 0 RG 1 w\n")
+    for node in range(1, len(tree)):
+        parent = tree.parents[node]
+        length += pdf.write(
+            f"{x[parent]:.2f} {y[parent]:.2f} m {x[parent]:.2f} {y[node]:.2f} l {x[node]:.2f} {y[node]:.2f} l S\n"
+        )
+    for leaf in tree.leaf_nodes:
+        base, gene = split_gene_label(tree.names[leaf])
+        text = f"BT /F1 {FONT_SIZE} Tf {x[leaf] + 4:.2f} {y[leaf] - FONT_SIZE * 0.35:.2f} Td {_pdf_text(base)} Tj"
+        if gene:
+            text += f" 0.33 g /F2 {FONT_SIZE} Tf {_pdf_text(' ' + gene)} Tj 0 g"
+        length += pdf.write(text + " ET\n")
+    for node in range(1, len(tree)):
+        label = _support_label(tree, node)
+        if label:
+            left = x[tree.parents[node]] + 2
+            length += pdf.write(
+                f"0.27 g BT /F1 {SUPPORT_FONT_SIZE} Tf {left:.2f} {y[node] + 2:.2f} Td {_pdf_text(label)} Tj ET 0 g\n"
+            )
+    pdf.write("endstream\nendobj\n")
+    pdf.begin_object(7)
+    pdf.write(f"{length}\nendobj\n")
+
+    xref_offset = pdf.position
+    pdf.write("xref\n0 8\n0000000000 65535 f \n")
+    for number in range(1, 8):
+        pdf.write(f"{pdf.offsets[number]:010d} 00000 n \n")
+    pdf.write(f"trailer\n<< /Size 8 /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n")
+
+
+def render_newick(newick_text: str, output_path, *, width: float = DEFAULT_WIDTH):
+    """Render Newick text to ``output_path``; the format follows its .svg or .pdf suffix."""
+    path = Path(output_path)
+    suffix = path.suffix.lower()
+    if suffix not in VECTOR_FORMATS:
+        raise ValueError(f"Unsupported output format {suffix!r}; use .svg or .pdf.")
+    layout = layout_tree(parse_newick(newick_text), width=width)
+    if suffix == ".svg":
+        with open(path, "w", encoding="utf-8") as handle:
+            write_svg(layout, handle)
+    else:
+        with open(path, "wb") as handle:
+            write_pdf(layout, handle)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a Newick tree to SVG or PDF without a display.")
+    parser.add_argument("newick_file", help="Newick tree to draw (drawn as rooted in the file).")
+    parser.add_argument("output", help="Output path ending in .svg or .pdf.")
+    parser.add_argument("--width", type=float, default=DEFAULT_WIDTH, help="Figure width in points.")
+    args = parser.parse_args()
+
+    newick_text = Path(args.newick_file).read_text(encoding="utf-8")
+    render_newick(newick_text, args.output, width=args.width)
+
+
+if __name__ == "__main__":
+    main()
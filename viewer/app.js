@@ -6,6 +6,10 @@
     app.initDevTools();
     app.bindZoomControls();
     app.bindNodeActions();
+    app.bindLevelOfDetailControls();
+    app.bindLeafSearch();
+    app.initProgressiveState();
+    app.initLabelOverrides();
     try {
       app.setStatus("Rendering tree...", false);
       app.renderTree(window.__TREE_VIEWER_DATA__ && window.__TREE_VIEWER_DATA__.newick);
@@ -13,6 +17,7 @@
       app.setStatus(error.message, true);
       throw error;
     }
+    app.connectLiveUpdates();
   }
 
   window.addEventListener("DOMContentLoaded", init);
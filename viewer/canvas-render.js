@@ -0,0 +1,496 @@
+(function () {
+  var app = window.PhyloApp;
+  // Collapsed clades keep a fifth of their rows, matching phylotree's default compression.
+  var COLLAPSED_ROW_RATIO = 0.2;
+  var LAYOUT_PADDING = 20;
+  var MIN_LABEL_PX = 3;
+  var HIT_RADIUS_PX = 4;
+  var COLORS = {
+    branch: "#999999",
+    selectedBranch: "#ff0000",
+    boxBranch: "#d62828",
+    activeBranch: "#8d0801",
+    internalCircle: "#cccccc",
+    collapsedCircle: "#000000",
+    clade: "rgba(211, 211, 211, 0.5)",
+    cladeStroke: "rgba(34, 34, 34, 0.5)",
+    label: "#000000",
+    internalLabel: "#6f5f2e",
+    placeholderLabel: "#6b7280",
+    selectedLabel: "#0e4b38",
+    activeLabel: "#8d0801",
+  };
+
+  app.shouldUseCanvas = function (index) {
+    var data = window.__TREE_VIEWER_DATA__;
+    var threshold = data && data.canvasThreshold;
+    return Boolean(index) && threshold > 0 && index.nodes.length > 0 && index.nodes[0]._tipCount > threshold;
+  };
+
+  function getBranchLength(tree, node) {
+    var value = tree.branch_length_accessor ? tree.branch_length_accessor(node) : null;
+    return isFinite(value) && value > 0 ? Number(value) : 0;
+  }
+
+  function unhide(node) {
+    if (node.children && !node.collapsed) {
+      node.children.forEach(unhide);
+    }
+    node.hidden = false;
+  }
+
+  function estimateLabelWidth(index, fontSize) {
+    var longest = 0;
+    index.nodes.forEach(function (node) {
+      if (app.isLeaf(node)) {
+        longest = Math.max(longest, app.getDisplayLabel(node).length);
+      }
+    });
+    return longest * fontSize * 0.6;
+  }
+
+  // Rectangular left-to-right layout written straight into node.screen_x /
+  // node.screen_y, so the spatial index, fit and placeholder lookups work the
+  // same way they do for phylotree's SVG layout.
+  function computeLayout(display) {
+    var tree = display.tree;
+    var index = app.getTreeIndex();
+    var nodes = index.nodes;
+    var count = nodes.length;
+    var depth = new Float64Array(count);
+    var rows = new Float64Array(count);
+    var reach = new Float64Array(count);
+    var useLengths = nodes.some(function (node) {
+      return Boolean(node.parent) && getBranchLength(tree, node) > 0;
+    });
+    var row = 0;
+    var maxDepth = 0;
+    var position;
+    var node;
+    var parentPosition;
+    var end;
+    var scaleX;
+    var rowPx;
+    var labelWidth;
+    var children;
+
+    for (position = 0; position < count; position += 1) {
+      node = nodes[position];
+      node.hidden = false;
+      if (node.parent) {
+        parentPosition = node.parent._dfsPre;
+        depth[position] = depth[parentPosition] + (useLengths ? getBranchLength(tree, node) : 1);
+      }
+      maxDepth = Math.max(maxDepth, depth[position]);
+    }
+
+    position = 0;
+    while (position < count) {
+      node = nodes[position];
+      if (node.collapsed && !app.isLeaf(node)) {
+        rows[position] = row + Math.max(1, node._tipCount * COLLAPSED_ROW_RATIO) / 2;
+        row += Math.max(1, node._tipCount * COLLAPSED_ROW_RATIO);
+        end = node._dfsPost;
+        for (parentPosition = position; parentPosition < end; parentPosition += 1) {
+          reach[position] = Math.max(reach[position], depth[parentPosition]);
+          if (parentPosition > position) {
+            nodes[parentPosition].hidden = true;
+          }
+        }
+        position = end;
+        continue;
+      }
+      if (app.isLeaf(node)) {
+        rows[position] = row + 0.5;
+        row += 1;
+      }
+      position += 1;
+    }
+    for (position = count - 1; position >= 0; position -= 1) {
+      node = nodes[position];
+      children = node.children;
+      if (!node.hidden && children && children.length > 0 && !node.collapsed) {
+        rows[position] = (rows[children[0]._dfsPre] + rows[children[children.length - 1]._dfsPre]) / 2;
+      }
+    }
+
+    labelWidth = Math.min(display.size[1] * 0.4, estimateLabelWidth(index, app.state.fontSizePx || 10));
+    scaleX = maxDepth > 0 ? (display.size[1] - labelWidth - LAYOUT_PADDING * 2) / maxDepth : 0;
+    rowPx = row > 0 ? (display.size[0] - LAYOUT_PADDING * 2) / row : 0;
+    for (position = 0; position < count; position += 1) {
+      node = nodes[position];
+      node.screen_x = depth[position] * scaleX;
+      node.screen_y = rows[position] * rowPx;
+      node._cladeReach = (reach[position] - depth[position]) * scaleX;
+    }
+
+    display.rowPx = rowPx;
+    display.extent = {
+      width: maxDepth * scaleX + labelWidth,
+      height: row * rowPx,
+    };
+  }
+
+  function visibleTreeRect(display, transform) {
+    var canvas = display.canvas;
+    var k = transform.k;
+    var offsetX = transform.x + display.baseTransform.x * k;
+    var offsetY = transform.y + display.baseTransform.y * k;
+
+    return {
+      left: -offsetX / k,
+      top: -offsetY / k,
+      right: (canvas.clientWidth - offsetX) / k,
+      bottom: (canvas.clientHeight - offsetY) / k,
+    };
+  }
+
+  function strokeBatch(context, segments, color, width) {
+    var i;
+    if (segments.length === 0) {
+      return;
+    }
+    context.beginPath();
+    for (i = 0; i < segments.length; i += 4) {
+      context.moveTo(segments[i], segments[i + 1]);
+      context.lineTo(segments[i], segments[i + 3]);
+      context.lineTo(segments[i + 2], segments[i + 3]);
+    }
+    context.strokeStyle = color;
+    context.lineWidth = width;
+    context.stroke();
+  }
+
+  function getLabelColor(node, highlight) {
+    if (highlight.activeNodeId === node._viewerNodeId) {
+      return COLORS.activeLabel;
+    }
+    if (app.getPlaceholderInfo(node) || app.isAutoCollapsed(node)) {
+      return COLORS.placeholderLabel;
+    }
+    if (highlight.leafNames.has(app.getNodeName(node)) && app.isLeaf(node)) {
+      return COLORS.selectedLabel;
+    }
+    return app.isLeaf(node) ? COLORS.label : COLORS.internalLabel;
+  }
+
+  // Branches are stroked in a handful of batched paths, one per highlight
+  // colour; labels are only drawn for rows on screen and large enough to read.
+  function draw(display) {
+    var appState = app.state;
+    var canvas = display.canvas;
+    var context = canvas.getContext("2d");
+    var ratio = window.devicePixelRatio || 1;
+    var transform = display.currentZoomTransform || { x: 0, y: 0, k: 1 };
+    var k = transform.k;
+    var view = visibleTreeRect(display, transform);
+    var index = app.getTreeIndex();
+    var highlight = appState.highlight || app.emptyHighlightState();
+    var batches = { plain: [], selected: [], box: [], active: [] };
+    var clades = [];
+    var circles = [];
+    var labels = [];
+    var leafFontSize = appState.fontSizePx || 10;
+    var internalFontSize = app.getInternalFontSize();
+    var radius = appState.nodeRadiusPx || 3;
+
+    display.frame = null;
+    context.setTransform(ratio, 0, 0, ratio, 0, 0);
+    context.clearRect(0, 0, canvas.width, canvas.height);
+    if (!index) {
+      return;
+    }
+    context.translate(transform.x + display.baseTransform.x * k, transform.y + display.baseTransform.y * k);
+    context.scale(k, k);
+
+    index.nodes.forEach(function (node) {
+      var parent = node.parent;
+      var batch;
+      var top;
+      var bottom;
+
+      if (node.hidden) {
+        return;
+      }
+      top = parent ? Math.min(parent.screen_y, node.screen_y) : node.screen_y;
+      bottom = parent ? Math.max(parent.screen_y, node.screen_y) : node.screen_y;
+      if (bottom < view.top - radius || top > view.bottom + radius) {
+        return;
+      }
+      if (parent) {
+        batch = batches.plain;
+        if (highlight.activeNodeId === node._viewerNodeId) {
+          batch = batches.active;
+        } else if (highlight.branchNodeIds.has(node._viewerNodeId)) {
+          batch = batches.box;
+        } else if (node.selected) {
+          batch = batches.selected;
+        }
+        batch.push(parent.screen_x, parent.screen_y, node.screen_x, node.screen_y);
+      }
+      if (node.collapsed && !app.isLeaf(node)) {
+        clades.push(node);
+      }
+      if (node.screen_y >= view.top && node.screen_y <= view.bottom) {
+        circles.push(node);
+        labels.push(node);
+      }
+    });
+
+    context.lineJoin = "round";
+    strokeBatch(context, batches.plain, COLORS.branch, 2 / k);
+    strokeBatch(context, batches.selected, COLORS.selectedBranch, 3 / k);
+    strokeBatch(context, batches.box, COLORS.boxBranch, 3 / k);
+    strokeBatch(context, batches.active, COLORS.activeBranch, 3 / k);
+
+    clades.forEach(function (node) {
+      var halfHeight = Math.max(1, node._tipCount * COLLAPSED_ROW_RATIO) * display.rowPx / 2;
+      context.beginPath();
+      context.moveTo(node.screen_x, node.screen_y);
+      context.lineTo(node.screen_x + node._cladeReach, node.screen_y - halfHeight);
+      context.lineTo(node.screen_x + node._cladeReach, node.screen_y + halfHeight);
+      context.closePath();
+      context.fillStyle = COLORS.clade;
+      context.fill();
+      context.strokeStyle = COLORS.cladeStroke;
+      context.lineWidth = 1 / k;
+      context.stroke();
+    });
+
+    if (radius * k >= 1) {
+      context.lineWidth = 0.5 / k;
+      context.strokeStyle = "#000000";
+      circles.forEach(function (node) {
+        if (app.isLeaf(node)) {
+          return;
+        }
+        context.beginPath();
+        context.arc(node.screen_x, node.screen_y, radius, 0, Math.PI * 2);
+        context.fillStyle = node.collapsed ? COLORS.collapsedCircle : COLORS.internalCircle;
+        context.fill();
+        context.stroke();
+      });
+    }
+
+    context.textBaseline = "middle";
+    labels.forEach(function (node) {
+      var leaf = app.isLeaf(node);
+      var fontSize = leaf ? leafFontSize : internalFontSize;
+      var text;
+
+      if (fontSize * k < MIN_LABEL_PX) {
+        return;
+      }
+      text = app.getDisplayLabel(node);
+      if (!text) {
+        return;
+      }
+      context.font = (leaf && highlight.leafNames.has(app.getNodeName(node)) ? "700 " : "") + fontSize + "px sans-serif";
+      context.fillStyle = getLabelColor(node, highlight);
+      context.fillText(
+        text,
+        node.screen_x + (node.collapsed && !leaf ? node._cladeReach : 0) + radius + 2,
+        node.screen_y
+      );
+    });
+  }
+
+  function resizeCanvas(display) {
+    var ratio = window.devicePixelRatio || 1;
+    var width = display.size[1];
+    var height = display.size[0];
+
+    display.canvas.width = Math.round(width * ratio);
+    display.canvas.height = Math.round(height * ratio);
+    display.canvas.style.width = width + "px";
+    display.canvas.style.height = height + "px";
+    display.svg.attr("width", width).attr("height", height);
+  }
+
+  function applyZoomTransform(display) {
+    var zt = display.currentZoomTransform || { x: 0, y: 0, k: 1 };
+    display.svg
+      .select(".phylotree-container")
+      .attr(
+        "transform",
+        "translate(" + (zt.x + display.baseTransform.x * zt.k) + "," + (zt.y + display.baseTransform.y * zt.k) + ") scale(" + zt.k + ")"
+      );
+  }
+
+  function findNodeAt(display, event) {
+    var treeRect = app.viewportRectToTreeRect({
+      left: event.clientX - HIT_RADIUS_PX,
+      right: event.clientX + HIT_RADIUS_PX,
+      top: event.clientY - HIT_RADIUS_PX,
+      bottom: event.clientY + HIT_RADIUS_PX,
+    });
+    var centerX;
+    var centerY;
+    var best = null;
+    var bestDistance = Infinity;
+
+    if (!treeRect) {
+      return null;
+    }
+    centerX = (treeRect.left + treeRect.right) / 2;
+    centerY = (treeRect.top + treeRect.bottom) / 2;
+    app.querySpatialIndex(treeRect).forEach(function (entry) {
+      var distance = Math.abs(entry.node.screen_y - centerY) +
+        (centerX < entry.left || centerX > entry.right ? Math.abs(entry.node.screen_x - centerX) : 0);
+      if (distance < bestDistance) {
+        best = entry.node;
+        bestDistance = distance;
+      }
+    });
+    return best;
+  }
+
+  // phylotree bundles d3 privately. A throwaway two-leaf display hands over a
+  // d3 selection and a zoom behaviour without loading a second copy of d3.
+  function borrowD3Helpers() {
+    var probe = new window.phylotree.phylotree("(a,b);").render({
+      container: document.createElement("div"),
+      width: 10,
+      height: 10,
+      zoom: true,
+      "show-scale": false,
+    });
+    return { selection: probe.svg, zoomBehavior: probe.zoomBehavior };
+  }
+
+  // Implements the part of phylotree's display API the viewer relies on, so
+  // selection, collapse, zoom and fit code paths stay backend-agnostic.
+  app.createCanvasDisplay = function (tree, width, height) {
+    var stage = document.createElement("div");
+    var canvas = document.createElement("canvas");
+    var svgNode = document.createElementNS("http://www.w3.org/2000/svg", "svg");
+    var helpers = borrowD3Helpers();
+    var display;
+
+    stage.className = "canvas-stage";
+    canvas.className = "tree-canvas";
+    svgNode.setAttribute("class", "canvas-overlay");
+    stage.appendChild(canvas);
+    stage.appendChild(svgNode);
+
+    display = {
+      tree: tree,
+      canvas: canvas,
+      stage: stage,
+      svg: helpers.selection.select(function () {
+        return svgNode;
+      }),
+      size: [height, width],
+      baseTransform: { x: LAYOUT_PADDING, y: LAYOUT_PADDING },
+      currentZoomTransform: null,
+      rowPx: 0,
+      extent: { width: 0, height: 0 },
+      frame: null,
+      node_styler: undefined,
+      edge_styler: undefined,
+      _selectionCallback: null,
+      handle_node_click: function () {},
+
+      show: function () {
+        return stage;
+      },
+
+      update: function () {
+        computeLayout(display);
+        display.svg
+          .select(".canvas-extent")
+          .attr("width", Math.max(1, display.extent.width))
+          .attr("height", Math.max(1, display.extent.height));
+        app.invalidateSpatialIndex();
+        display.requestDraw();
+        return display;
+      },
+
+      requestDraw: function () {
+        if (!display.frame) {
+          display.frame = window.requestAnimationFrame(function () {
+            draw(display);
+          });
+        }
+        return display;
+      },
+
+      toggleCollapse: function (node) {
+        if (node.collapsed) {
+          node.collapsed = false;
+          unhide(node);
+        } else {
+          node.collapsed = true;
+        }
+        return display;
+      },
+
+      selectionCallback: function (callback) {
+        if (!callback) {
+          return display._selectionCallback;
+        }
+        display._selectionCallback = callback;
+        return display;
+      },
+
+      getSelection: function () {
+        var index = app.getTreeIndex();
+        return index ? index.nodes.filter(function (node) {
+          return Boolean(node.selected);
+        }) : [];
+      },
+
+      modifySelection: function (nodes, value) {
+        var changed = false;
+        nodes.forEach(function (node) {
+          if (Boolean(node.selected) !== value) {
+            node.selected = value;
+            changed = true;
+          }
+        });
+        if (changed && display._selectionCallback) {
+          display._selectionCallback(display.getSelection());
+        }
+        display.requestDraw();
+        return display;
+      },
+
+      selectNodes: function (names) {
+        var wanted = new Set(names || []);
+        var index = app.getTreeIndex();
+        if (!index || wanted.size === 0) {
+          return display;
+        }
+        return display.modifySelection(index.nodes.filter(function (node) {
+          return wanted.has(app.getNodeName(node));
+        }), true);
+      },
+
+      clearSelection: function () {
+        return display.modifySelection(display.getSelection(), false);
+      },
+    };
+
+    display.svg
+      .append("g")
+      .attr("class", "phylotree-container")
+      .append("rect")
+      .attr("class", "canvas-extent")
+      .attr("fill", "none");
+    display.zoomBehavior = helpers.zoomBehavior
+      .scaleExtent([0.1, 200])
+      .on("zoom", function (event) {
+        display.currentZoomTransform = event.transform;
+        applyZoomTransform(display);
+        display.requestDraw();
+      });
+    display.svg.call(display.zoomBehavior);
+    resizeCanvas(display);
+    applyZoomTransform(display);
+
+    stage.addEventListener("click", function (event) {
+      display.handle_node_click(findNodeAt(display, event), event);
+    });
+    return display;
+  };
+})();
@@ -17,24 +17,94 @@
     if (appState.display) {
       appState.display.currentZoomTransform = zoomTransform;
     }
+    app.scheduleLevelOfDetail();
   };
 
-  app.sanitizeRenderedLabels = function () {
-    var container = document.getElementById("tree-container");
-
-    if (!container) {
-      return;
-    }
+  function styleNodeLabel(element, node) {
+    var appState = app.state;
+    var profile = appState.renderProfile || app.getRenderProfile();
+    var text = element.querySelector(".phylotree-node-text");
+    var circle;
+    var raw;
 
-    container.querySelectorAll("g.internal-node .phylotree-node-text").forEach(function (text) {
-      var raw = (text.textContent || "").trim();
-      if (/^__/.test(raw)) {
+    if (text) {
+      if (app.isLeaf(node) && appState.labelOverrides.has(app.getNodeName(node))) {
+        text.textContent = app.getDisplayLabel(node);
+      }
+      raw = (text.textContent || "").trim();
+      if (!app.isLeaf(node) && /^__/.test(raw)) {
         text.textContent = "";
         text.style.display = "none";
       } else {
         text.style.display = "";
       }
-    });
+    }
+    if (!app.isLeaf(node) && !app.supportsCssNodeRadius()) {
+      circle = element.querySelector("circle");
+      if (circle) {
+        circle.setAttribute("r", String(appState.nodeRadiusPx || profile.nodeRadius || 3));
+      }
+    }
+  }
+
+  // phylotree calls these for every element it (re)draws, so ids, label
+  // cleanup and highlight classes ride along with its own pass
+  // instead of needing extra querySelectorAll sweeps after each update.
+  app.installElementStylers = function (display) {
+    var appState = app.state;
+
+    display.node_styler = function (container, node) {
+      var element = container && container.node ? container.node() : null;
+      if (!(element instanceof Element) || !node || !node._viewerNodeId) {
+        return;
+      }
+      element.setAttribute("data-viewer-node-id", node._viewerNodeId);
+      appState.nodeElements.set(node._viewerNodeId, element);
+      styleNodeLabel(element, node);
+      app.applyNodeHighlight(element, node);
+    };
+
+    display.edge_styler = function (container, edge) {
+      var element = container && container.node ? container.node() : null;
+      var nodeId = edge && edge.target ? edge.target._viewerNodeId : null;
+      if (!nodeId) {
+        return;
+      }
+      // phylotree's refresh() passes a selection that does not wrap the path,
+      // so fall back to the registered element for this branch.
+      if (!(element instanceof Element)) {
+        element = appState.branchElements.get(nodeId);
+        if (!element) {
+          return;
+        }
+      }
+      element.setAttribute("data-viewer-target-node-id", nodeId);
+      appState.branchElements.set(nodeId, element);
+      app.applyBranchHighlight(element, nodeId);
+    };
+  };
+
+  app.pruneElementRegistry = function (node) {
+    var appState = app.state;
+    var index = app.getTreeIndex();
+    var position;
+    var nodeId;
+    var element;
+
+    if (!index || !node) {
+      return;
+    }
+    for (position = node._dfsPre; position < node._dfsPost; position += 1) {
+      nodeId = index.nodes[position]._viewerNodeId;
+      element = appState.nodeElements.get(nodeId);
+      if (element && !element.isConnected) {
+        appState.nodeElements.delete(nodeId);
+      }
+      element = appState.branchElements.get(nodeId);
+      if (element && !element.isConnected) {
+        appState.branchElements.delete(nodeId);
+      }
+    }
   };
 
   app.installDisplayBindings = function () {
@@ -72,13 +142,12 @@
           return;
         }
         appState.selectedLeafNames = (selectedNodes || [])
-          .filter(app.isLeaf)
+          .filter(app.isSelectableLeaf)
           .map(function (node) {
             return node.data.name;
           });
-        app.assignViewerNodeIds();
+        appState.selectedPlaceholderRanges = [];
         appState.selectedBranchNodeIds = app.computeSelectedBranchNodeIds();
-        app.applyRenderProfileToSvg();
         app.syncPanels();
       });
       appState.display._callbacksBound = true;
@@ -104,6 +173,7 @@
       });
       appState.display.svg.on("wheel.viewer-state", function () {
         window.requestAnimationFrame(app.captureZoomState);
+        app.scheduleProgressiveExpansion();
       });
     }
   };
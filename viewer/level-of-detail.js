@@ -0,0 +1,148 @@
+(function () {
+  var app = window.PhyloApp;
+  // Clades shorter than LOD_COLLAPSE_PX on screen are drawn as one wedge. They
+  // only reopen once they would be LOD_EXPAND_PX tall, so small zoom changes
+  // around the threshold do not make them flicker.
+  var LOD_COLLAPSE_PX = 8;
+  var LOD_EXPAND_PX = 12;
+
+  app.isAutoCollapsed = function (node) {
+    return Boolean(node && node._viewerNodeId && app.state.autoCollapsedIds.has(node._viewerNodeId));
+  };
+
+  app.resetLevelOfDetail = function () {
+    var appState = app.state;
+    appState.autoCollapsedIds = new Set();
+    appState.lodPinnedIds = new Set();
+    appState.lodZoomK = null;
+  };
+
+  function unhide(node) {
+    if (node.children && !node.collapsed) {
+      node.children.forEach(unhide);
+    }
+    node.hidden = false;
+  }
+
+  function getRowPixels(display, root) {
+    var transform = display.currentZoomTransform;
+    var k = transform && isFinite(transform.k) ? transform.k : 1;
+    var height = display.size && isFinite(display.size[0]) ? display.size[0] : 0;
+
+    // Heights are measured against the fully expanded layout, so a clade's
+    // on-screen size depends only on zoom and not on what is collapsed now.
+    return root._tipCount > 0 ? (height / root._tipCount) * k : 0;
+  }
+
+  function computeAutoCollapsed(index, rowPx) {
+    var appState = app.state;
+    var desired = new Set();
+    var position = 0;
+    var node;
+    var nodeId;
+    var threshold;
+
+    while (position < index.nodes.length) {
+      node = index.nodes[position];
+      nodeId = node._viewerNodeId;
+      if (app.isLeaf(node)) {
+        position += 1;
+        continue;
+      }
+      if (node.collapsed && !appState.autoCollapsedIds.has(nodeId)) {
+        // Collapsed by the user; leave it and everything under it alone.
+        position = node._dfsPost;
+        continue;
+      }
+      threshold = appState.autoCollapsedIds.has(nodeId) ? LOD_EXPAND_PX : LOD_COLLAPSE_PX;
+      if (node.parent && !appState.lodPinnedIds.has(nodeId) && node._tipCount * rowPx < threshold) {
+        desired.add(nodeId);
+        position = node._dfsPost;
+        continue;
+      }
+      position += 1;
+    }
+    return desired;
+  }
+
+  app.updateLevelOfDetail = function () {
+    var appState = app.state;
+    var display = appState.display;
+    var index = app.getTreeIndex();
+    var desired;
+    var collapsed = 0;
+    var expanded = 0;
+
+    if (!display || !index || !index.nodes.length) {
+      return;
+    }
+    desired = appState.levelOfDetail ? computeAutoCollapsed(index, getRowPixels(display, index.nodes[0])) : new Set();
+
+    // Collapse first so expanding a parent stops unhiding at the new wedges.
+    desired.forEach(function (nodeId) {
+      var node = app.getNodeById(nodeId);
+      if (node && !appState.autoCollapsedIds.has(nodeId)) {
+        node.collapsed = true;
+        collapsed += 1;
+      }
+    });
+    appState.autoCollapsedIds.forEach(function (nodeId) {
+      var node = app.getNodeById(nodeId);
+      if (node && !desired.has(nodeId)) {
+        node.collapsed = false;
+        unhide(node);
+        expanded += 1;
+      }
+    });
+    appState.autoCollapsedIds = desired;
+    if (collapsed === 0 && expanded === 0) {
+      return;
+    }
+
+    display.update();
+    app.refreshBindingsAfterTreeMutation(
+      desired.size > 0
+        ? "Level of detail: " + desired.size + " dense clade" + (desired.size === 1 ? "" : "s") + " condensed."
+        : "Level of detail: all clades shown."
+    );
+  };
+
+  // A clade the user opens by hand stays open until the next render.
+  app.pinAutoCollapsed = function (node) {
+    var appState = app.state;
+    if (app.isAutoCollapsed(node)) {
+      appState.autoCollapsedIds.delete(node._viewerNodeId);
+      appState.lodPinnedIds.add(node._viewerNodeId);
+    }
+  };
+
+  app.scheduleLevelOfDetail = function () {
+    var appState = app.state;
+    var transform = appState.display && appState.display.currentZoomTransform;
+    var k = transform && isFinite(transform.k) ? transform.k : 1;
+
+    if (appState.lodZoomK === k || (!appState.levelOfDetail && appState.autoCollapsedIds.size === 0)) {
+      return;
+    }
+    window.clearTimeout(appState.lodTimer);
+    appState.lodTimer = window.setTimeout(function () {
+      appState.lodZoomK = k;
+      app.updateLevelOfDetail();
+    }, 150);
+  };
+
+  app.bindLevelOfDetailControls = function () {
+    var appState = app.state;
+    var toggleButton = document.getElementById("level-of-detail-toggle");
+
+    if (toggleButton) {
+      toggleButton.onclick = function () {
+        appState.levelOfDetail = !appState.levelOfDetail;
+        appState.lodPinnedIds = new Set();
+        app.updateLevelOfDetail();
+        app.syncPanels();
+        app.setStatus(appState.levelOfDetail ? "Level of detail enabled." : "Level of detail disabled.", false);
+      };
+    }
+  };
+})();
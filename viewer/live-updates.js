@@ -0,0 +1,91 @@
+(function () {
+  var app = window.PhyloApp;
+
+  app.initLabelOverrides = function () {
+    var data = window.__TREE_VIEWER_DATA__;
+    var labels = data && data.labelOverrides ? data.labelOverrides : {};
+    app.state.labelOverrides = new Map(Object.keys(labels).map(function (name) {
+      return [name, String(labels[name])];
+    }));
+  };
+
+  // Renames only touch the label text of the affected leaves; the layout,
+  // collapse state and selection of the open tree are kept as they are.
+  app.applyLabelOverrides = function (labels) {
+    var appState = app.state;
+    var previous = appState.labelOverrides;
+    var next = new Map();
+    var changed = new Set();
+    var index = app.getTreeIndex();
+
+    Object.keys(labels || {}).forEach(function (name) {
+      next.set(name, String(labels[name]));
+    });
+    next.forEach(function (label, name) {
+      if (previous.get(name) !== label) {
+        changed.add(name);
+      }
+    });
+    previous.forEach(function (label, name) {
+      if (!next.has(name)) {
+        changed.add(name);
+      }
+    });
+    appState.labelOverrides = next;
+    if (changed.size === 0) {
+      return;
+    }
+
+    if (appState.canvasMode) {
+      appState.display.requestDraw();
+    } else if (index) {
+      changed.forEach(function (name) {
+        var node = index.nodesByName.get(name);
+        var element = node ? appState.nodeElements.get(node._viewerNodeId) : null;
+        var text = element ? element.querySelector(".phylotree-node-text") : null;
+        if (text && app.isLeaf(node)) {
+          text.textContent = app.getDisplayLabel(node);
+        }
+      });
+    }
+    app.invalidateSpatialIndex();
+    app.syncPanels();
+    app.setStatus("Updated " + changed.size + " leaf label" + (changed.size === 1 ? "" : "s") + " from the GUI.", false);
+  };
+
+  function applyTreeUpdate(message) {
+    var data = window.__TREE_VIEWER_DATA__;
+
+    data.newick = message.newick;
+    data.progressive = message.progressive || null;
+    data.labelOverrides = {};
+    app.initProgressiveState();
+    app.initLabelOverrides();
+    app.setStatus("Tree updated from the GUI; rendering...", false);
+    app.renderTree(message.newick);
+  }
+
+  app.connectLiveUpdates = function () {
+    var appState = app.state;
+    var data = window.__TREE_VIEWER_DATA__;
+
+    if (!data || !data.eventsApiUrl || !window.EventSource || appState.eventSource) {
+      return;
+    }
+    appState.eventSource = new EventSource(data.eventsApiUrl);
+    appState.eventSource.onmessage = function (event) {
+      var message;
+
+      try {
+        message = JSON.parse(event.data);
+      } catch (error) {
+        return;
+      }
+      if (message.type === "labels") {
+        app.applyLabelOverrides(message.labels);
+      } else if (message.type === "tree" && message.newick) {
+        applyTreeUpdate(message);
+      }
+    };
+  };
+})();
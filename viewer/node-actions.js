@@ -1,6 +1,27 @@
 (function () {
   var app = window.PhyloApp;
 
+  // A form post lets the browser save the streamed FASTA as a download
+  // instead of buffering it in the page.
+  function downloadFasta(selection, filename) {
+    var viewerData = window.__TREE_VIEWER_DATA__ || {};
+    var form = document.createElement("form");
+
+    form.method = "POST";
+    form.action = viewerData.fastaApiUrl;
+    form.hidden = true;
+    [["selection", JSON.stringify(selection)], ["filename", filename]].forEach(function (field) {
+      var input = document.createElement("input");
+      input.type = "hidden";
+      input.name = field[0];
+      input.value = field[1];
+      form.appendChild(input);
+    });
+    document.body.appendChild(form);
+    form.submit();
+    form.remove();
+  }
+
   app.bindNodeActions = function () {
     var appState = app.state;
     var toggleCollapseButton = document.getElementById("toggle-collapse-button");
@@ -10,18 +31,27 @@
     var clearSelectedLeavesButton = document.getElementById("clear-selected-leaves-button");
     var copySelectedLeavesButton = document.getElementById("copy-selected-leaves-button");
     var saveSelectionJsonButton = document.getElementById("save-selection-json-button");
+    var exportCladeFastaButton = document.getElementById("export-clade-fasta-button");
+    var exportSelectionFastaButton = document.getElementById("export-selection-fasta-button");
 
     if (toggleCollapseButton) {
       toggleCollapseButton.onclick = function () {
         var activeNode = app.getActiveNode();
+        var placeholder = app.getPlaceholderInfo(activeNode);
         var action;
+        if (placeholder) {
+          app.expandPlaceholders([app.getNodeName(activeNode)]);
+          return;
+        }
         if (!activeNode || app.isLeaf(activeNode) || !appState.display) {
           return;
         }
         action = activeNode.collapsed ? "expanded" : "collapsed";
+        app.pinAutoCollapsed(activeNode);
         appState.display.toggleCollapse(activeNode).update();
         app.refreshBindingsAfterTreeMutation(
-          "Subtree " + action + " for " + app.formatValue(activeNode.data && activeNode.data.name) + "."
+          "Subtree " + action + " for " + app.formatValue(activeNode.data && activeNode.data.name) + ".",
+          activeNode
         );
       };
     }
@@ -33,30 +63,30 @@
         if (!activeNode || app.isLeaf(activeNode) || !appState.display) {
           return;
         }
-        leafNames = appState.display.selectAllDescendants(activeNode, true, false).map(function (node) {
-          return node.data.name;
-        });
-        app.applyLeafSelection(leafNames, "active node descendants", []);
+        leafNames = app.getLeafNamesUnderNode(activeNode);
+        app.applyLeafSelection(
+          leafNames,
+          "active node descendants",
+          [],
+          app.getPlaceholderRangesUnderNode(activeNode)
+        );
       };
     }
 
     if (selectOppositeSideButton) {
       selectOppositeSideButton.onclick = function () {
         var activeNode = app.getActiveNode();
-        var activeLeafNames;
-        var activeLeafSet;
-        var oppositeLeafNames;
 
         if (!activeNode || !activeNode.parent || !appState.display) {
           return;
         }
 
-        activeLeafNames = app.getLeafNamesUnderNode(activeNode);
-        activeLeafSet = new Set(activeLeafNames);
-        oppositeLeafNames = app.getAllLeafNames().filter(function (name) {
-          return !activeLeafSet.has(name);
-        });
-        app.applyLeafSelection(oppositeLeafNames, "opposite side of active node", []);
+        app.applyLeafSelection(
+          app.getOppositeLeafNames(activeNode),
+          "opposite side of active node",
+          [],
+          app.getOppositePlaceholderRanges(activeNode)
+        );
       };
     }
 
@@ -74,9 +104,9 @@
           appState.display.clearSelection();
         }
         appState.selectedLeafNames = [];
+        appState.selectedPlaceholderRanges = [];
         appState.boxSelectedNodeIds = [];
         appState.selectedBranchNodeIds = [];
-        app.applyRenderProfileToSvg();
         app.syncPanels();
         app.setStatus("Selected leaves cleared.", false);
       };
@@ -87,8 +117,13 @@
         if (!navigator.clipboard || appState.selectedLeafNames.length === 0) {
           return;
         }
-        navigator.clipboard.writeText(appState.selectedLeafNames.slice().sort().join("\n")).then(function () {
-          app.setStatus("Selected leaf names copied to clipboard.", false);
+        navigator.clipboard.writeText(appState.selectedLeafNames.map(app.getLiveLeafName).sort().join("\n")).then(function () {
+          var hiddenCount = app.getSelectedLeafCount() - appState.selectedLeafNames.length;
+          app.setStatus(
+            "Selected leaf names copied to clipboard" +
+              (hiddenCount > 0 ? "; " + hiddenCount + " leaves in unloaded clades are not included." : "."),
+            false
+          );
         }).catch(function (error) {
           app.setStatus("Failed to copy leaf names: " + error, true);
         });
@@ -100,16 +135,15 @@
         var viewerData = window.__TREE_VIEWER_DATA__ || {};
         var payload;
 
-        if (!viewerData.selectionApiUrl || appState.selectedLeafNames.length === 0) {
+        if (!viewerData.selectionApiUrl || app.getSelectedLeafCount() === 0) {
           return;
         }
 
-        payload = {
-          selected_leaf_names: appState.selectedLeafNames.slice().sort(),
-          selected_count: appState.selectedLeafNames.length,
+        payload = Object.assign(app.encodeLeafSelection(appState.selectedLeafNames, appState.selectedPlaceholderRanges), {
+          selected_count: app.getSelectedLeafCount(),
           exported_at: new Date().toISOString(),
           title: viewerData.title || "Phylo GUI Tree Viewer",
-        };
+        });
 
         fetch(viewerData.selectionApiUrl, {
           method: "POST",
@@ -129,5 +163,38 @@
         });
       };
     }
+
+    if (exportCladeFastaButton) {
+      exportCladeFastaButton.onclick = function () {
+        var activeNode = app.getActiveNode();
+        var index = app.getTreeIndex();
+
+        if (!activeNode || !index || activeNode._leafOrdinal === undefined) {
+          return;
+        }
+        downloadFasta(
+          {
+            leaf_order: "preorder",
+            leaf_count: index.leafOrdinalCount,
+            selected_leaf_ranges: [activeNode._leafOrdinal, activeNode._leafOrdinal + activeNode._leafWeight],
+          },
+          app.isLeaf(activeNode) && !app.getPlaceholderInfo(activeNode) ? app.getNodeName(activeNode) : "clade"
+        );
+        app.setStatus("Exporting FASTA for " + app.getLeafCount(activeNode) + " leaves.", false);
+      };
+    }
+
+    if (exportSelectionFastaButton) {
+      exportSelectionFastaButton.onclick = function () {
+        if (app.getSelectedLeafCount() === 0) {
+          return;
+        }
+        downloadFasta(
+          app.encodeLeafSelection(appState.selectedLeafNames, appState.selectedPlaceholderRanges),
+          "selected_leaves"
+        );
+        app.setStatus("Exporting FASTA for " + app.getSelectedLeafCount() + " selected leaves.", false);
+      };
+    }
   };
 })();
@@ -18,22 +18,44 @@
     return "";
   };
 
+  app.isPlaceholderName = function (name) {
+    return Boolean(name) && Object.prototype.hasOwnProperty.call(app.state.placeholders, String(name));
+  };
+
+  app.getPlaceholderInfo = function (node) {
+    var name = app.getNodeName(node);
+    return app.isLeaf(node) && app.isPlaceholderName(name) ? app.state.placeholders[name] : null;
+  };
+
   function isSyntheticInternalName(name) {
     return Boolean(name) && /^__/.test(String(name));
   }
 
   app.getDisplayLabel = function (node) {
     var name = app.getNodeName(node);
+    if (app.isAutoCollapsed(node)) {
+      return "[" + node._leafWeight + " leaves]";
+    }
     if (!name) {
       return "";
     }
     if (!node.parent && name === "root") {
       return "Midpoint root";
     }
+    if (app.getPlaceholderInfo(node)) {
+      return "[" + app.state.placeholders[name].leafCount + " leaves]";
+    }
     if (!app.isLeaf(node) && isSyntheticInternalName(name)) {
       return "";
     }
-    return name;
+    return app.isLeaf(node) ? app.getLiveLeafName(name) : name;
+  };
+
+  // Leaves keep the name they were rendered with; renames pushed from the GUI
+  // only change what is shown and what is sent back.
+  app.getLiveLeafName = function (name) {
+    var override = app.state.labelOverrides.get(String(name));
+    return override === undefined ? String(name) : override;
   };
 
   app.getNodeType = function (node) {
@@ -43,48 +65,78 @@
     if (!node.parent) {
       return "Root";
     }
+    if (app.getPlaceholderInfo(node)) {
+      return "Unloaded clade";
+    }
     return app.isLeaf(node) ? "Leaf" : "Internal";
   };
 
   app.getLeafCount = function (node) {
-    var descendants;
-    var count = 0;
-    if (!node || !node.descendants) {
+    if (!node || node._leafWeight === undefined) {
       return 0;
     }
-    descendants = node.descendants();
-    descendants.forEach(function (descendant) {
-      if (app.isLeaf(descendant)) {
-        count += 1;
-      }
-    });
-    return count;
+    return node._leafWeight;
+  };
+
+  app.isSelectableLeaf = function (node) {
+    return (
+      app.isLeaf(node) &&
+      Boolean(node.data) &&
+      node.data.name !== undefined &&
+      node.data.name !== null &&
+      !app.isPlaceholderName(node.data.name)
+    );
   };
 
   app.getLeafNamesUnderNode = function (node) {
-    var names = [];
+    var index = app.getTreeIndex();
+
+    if (!node || !index || node._leafStart === undefined) {
+      return [];
+    }
+    return index.leafNames.slice(node._leafStart, node._leafEnd);
+  };
+
+  app.getOppositeLeafNames = function (node) {
+    var index = app.getTreeIndex();
 
-    if (!node || !node.descendants) {
-      return names;
+    if (!node || !index || node._leafStart === undefined) {
+      return [];
     }
+    return index.leafNames.slice(0, node._leafStart).concat(index.leafNames.slice(node._leafEnd));
+  };
 
-    node.descendants().forEach(function (descendant) {
-      if (app.isLeaf(descendant) && descendant.data && descendant.data.name !== undefined && descendant.data.name !== null) {
-        names.push(String(descendant.data.name));
-      }
-    });
+  // Unloaded clades keep their leaves on the server, so selections that cover a
+  // placeholder carry its [leafStart, leafStart + leafCount) range instead of names.
+  function getPlaceholderRange(node) {
+    return [node._leafOrdinal, node._leafOrdinal + node._leafWeight];
+  }
 
-    return names;
+  app.getPlaceholderRangesUnderNode = function (node) {
+    var index = app.getTreeIndex();
+
+    if (!node || !index) {
+      return [];
+    }
+    return index.placeholderNodes.filter(function (placeholder) {
+      return app.isDescendantOf(placeholder, node);
+    }).map(getPlaceholderRange);
   };
 
-  app.getAllLeafNames = function () {
-    var appState = app.state;
+  app.getOppositePlaceholderRanges = function (node) {
+    var index = app.getTreeIndex();
 
-    if (!appState.tree || !appState.tree.nodes || !appState.tree.nodes.descendants) {
+    if (!node || !index) {
       return [];
     }
+    return index.placeholderNodes.filter(function (placeholder) {
+      return !app.isDescendantOf(placeholder, node);
+    }).map(getPlaceholderRange);
+  };
 
-    return app.getLeafNamesUnderNode(appState.tree.nodes);
+  app.getAllLeafNames = function () {
+    var index = app.getTreeIndex();
+    return index ? index.leafNames.slice() : [];
   };
 
   app.getRenderProfile = function () {
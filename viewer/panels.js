@@ -51,11 +51,19 @@
     var clearSelectedLeavesButton = document.getElementById("clear-selected-leaves-button");
     var copySelectedLeavesButton = document.getElementById("copy-selected-leaves-button");
     var saveSelectionJsonButton = document.getElementById("save-selection-json-button");
+    var exportCladeFastaButton = document.getElementById("export-clade-fasta-button");
+    var exportSelectionFastaButton = document.getElementById("export-selection-fasta-button");
     var rectangleToggleButton = document.getElementById("rectangle-select-toggle");
+    var levelOfDetailButton = document.getElementById("level-of-detail-toggle");
 
     if (toggleCollapseButton) {
-      toggleCollapseButton.disabled = !activeNode || app.isLeaf(activeNode);
-      toggleCollapseButton.textContent = activeNode && activeNode.collapsed ? "Expand Subtree" : "Collapse Subtree";
+      if (app.getPlaceholderInfo(activeNode)) {
+        toggleCollapseButton.disabled = Boolean(appState.progressiveRequest);
+        toggleCollapseButton.textContent = "Load Subtree";
+      } else {
+        toggleCollapseButton.disabled = !activeNode || app.isLeaf(activeNode);
+        toggleCollapseButton.textContent = activeNode && activeNode.collapsed ? "Expand Subtree" : "Collapse Subtree";
+      }
     }
     if (selectDescendantsButton) {
       selectDescendantsButton.disabled = !activeNode || app.isLeaf(activeNode);
@@ -67,7 +75,7 @@
       clearActiveNodeButton.disabled = !activeNode;
     }
     if (clearSelectedLeavesButton) {
-      clearSelectedLeavesButton.disabled = appState.selectedLeafNames.length === 0;
+      clearSelectedLeavesButton.disabled = app.getSelectedLeafCount() === 0;
     }
     if (copySelectedLeavesButton) {
       copySelectedLeavesButton.disabled = appState.selectedLeafNames.length === 0;
@@ -76,14 +84,24 @@
       saveSelectionJsonButton.disabled = !(
         window.__TREE_VIEWER_DATA__ &&
         window.__TREE_VIEWER_DATA__.selectionApiUrl &&
-        appState.selectedLeafNames.length > 0
+        app.getSelectedLeafCount() > 0
       );
     }
+    if (exportCladeFastaButton) {
+      exportCladeFastaButton.disabled = !activeNode;
+    }
+    if (exportSelectionFastaButton) {
+      exportSelectionFastaButton.disabled = app.getSelectedLeafCount() === 0;
+    }
     if (rectangleToggleButton) {
       rectangleToggleButton.textContent =
         appState.selectionMode === "rectangle" ? "Rectangle Select: On" : "Rectangle Select: Off";
       rectangleToggleButton.classList.toggle("is-active", appState.selectionMode === "rectangle");
     }
+    if (levelOfDetailButton) {
+      levelOfDetailButton.textContent = appState.levelOfDetail ? "Detail: Auto" : "Detail: Full";
+      levelOfDetailButton.classList.toggle("is-active", appState.levelOfDetail);
+    }
   };
 
   app.syncSelectedLeavesPanel = function () {
@@ -92,22 +110,26 @@
     var summary = document.getElementById("selected-leaves-summary");
     var list = document.getElementById("selected-leaf-list");
     var sortedLeafNames;
+    var hiddenCount;
 
     if (!card || !summary || !list) {
       return;
     }
 
     list.innerHTML = "";
-    if (appState.selectedLeafNames.length === 0) {
+    if (app.getSelectedLeafCount() === 0) {
       card.classList.add("is-empty");
       summary.textContent = "No leaves selected.";
       list.hidden = true;
       return;
     }
 
-    sortedLeafNames = appState.selectedLeafNames.slice().sort();
+    sortedLeafNames = appState.selectedLeafNames.map(app.getLiveLeafName).sort();
     card.classList.remove("is-empty");
-    summary.textContent = sortedLeafNames.length + " leaves selected.";
+    hiddenCount = app.getSelectedLeafCount() - sortedLeafNames.length;
+    summary.textContent =
+      app.getSelectedLeafCount() + " leaves selected" +
+      (hiddenCount > 0 ? ", " + hiddenCount + " of them in unloaded clades and not listed." : ".");
     sortedLeafNames.forEach(function (name) {
       var item = document.createElement("li");
       item.textContent = name;
@@ -116,32 +138,91 @@
     list.hidden = false;
   };
 
+  app.emptyHighlightState = function () {
+    return {
+      leafNames: new Set(),
+      boxNodeIds: new Set(),
+      branchNodeIds: new Set(),
+      activeNodeId: null,
+    };
+  };
+
+  app.applyNodeHighlight = function (element, node) {
+    var highlight = app.state.highlight || app.emptyHighlightState();
+    var nodeId = node._viewerNodeId;
+
+    if (app.isLeaf(node)) {
+      element.classList.toggle("is-leaf-selected", highlight.leafNames.has(app.getNodeName(node)));
+    }
+    element.classList.toggle("is-box-selected-node", highlight.boxNodeIds.has(nodeId));
+    element.classList.toggle("is-active-node", highlight.activeNodeId === nodeId);
+  };
+
+  app.applyBranchHighlight = function (element, nodeId) {
+    var highlight = app.state.highlight || app.emptyHighlightState();
+
+    element.classList.toggle("is-box-selected-branch", highlight.branchNodeIds.has(nodeId));
+    element.classList.toggle("is-active-node-branch", highlight.activeNodeId === nodeId);
+  };
+
+  function addSymmetricDifference(target, previous, next, mapValue) {
+    previous.forEach(function (value) {
+      if (!next.has(value)) {
+        target.add(mapValue ? mapValue(value) : value);
+      }
+    });
+    next.forEach(function (value) {
+      if (!previous.has(value)) {
+        target.add(mapValue ? mapValue(value) : value);
+      }
+    });
+  }
+
+  // Only elements whose highlight state changed are touched; elements drawn
+  // later pick up the current state through the phylotree stylers.
   app.syncLeafHighlightClasses = function () {
     var appState = app.state;
-    var container = document.getElementById("tree-container");
-    var selected = new Set(appState.selectedLeafNames);
-    var boxSelected = new Set(appState.boxSelectedNodeIds);
-    var selectedBranches = new Set(appState.selectedBranchNodeIds);
+    var previous = appState.highlight || app.emptyHighlightState();
     var activeNode = app.getActiveNode();
-    var activeNodeId = activeNode && activeNode._viewerNodeId ? activeNode._viewerNodeId : null;
-
-    if (!container) {
+    var next = {
+      leafNames: new Set(appState.selectedLeafNames),
+      boxNodeIds: new Set(appState.boxSelectedNodeIds),
+      branchNodeIds: new Set(appState.selectedBranchNodeIds),
+      activeNodeId: activeNode && activeNode._viewerNodeId ? activeNode._viewerNodeId : null,
+    };
+    var changedNodeIds = new Set();
+    var changedBranchIds = new Set();
+
+    addSymmetricDifference(changedNodeIds, previous.leafNames, next.leafNames, function (name) {
+      var node = app.getIndexedNodeByName(name);
+      return node ? node._viewerNodeId : null;
+    });
+    addSymmetricDifference(changedNodeIds, previous.boxNodeIds, next.boxNodeIds);
+    addSymmetricDifference(changedBranchIds, previous.branchNodeIds, next.branchNodeIds);
+    if (previous.activeNodeId !== next.activeNodeId) {
+      [previous.activeNodeId, next.activeNodeId].forEach(function (nodeId) {
+        changedNodeIds.add(nodeId);
+        changedBranchIds.add(nodeId);
+      });
+    }
+    appState.highlight = next;
+    if (appState.display && appState.display.requestDraw) {
+      appState.display.requestDraw();
       return;
     }
 
-    container.querySelectorAll("[data-node-name]").forEach(function (group) {
-      var nodeName = group.getAttribute("data-node-name");
-      group.classList.toggle("is-leaf-selected", selected.has(nodeName));
-    });
-    container.querySelectorAll("[data-viewer-node-id]").forEach(function (group) {
-      var nodeId = group.getAttribute("data-viewer-node-id");
-      group.classList.toggle("is-box-selected-node", boxSelected.has(nodeId));
-      group.classList.toggle("is-active-node", activeNodeId === nodeId);
+    changedNodeIds.forEach(function (nodeId) {
+      var element = nodeId ? appState.nodeElements.get(nodeId) : null;
+      var node = element ? app.getNodeById(nodeId) : null;
+      if (node) {
+        app.applyNodeHighlight(element, node);
+      }
     });
-    container.querySelectorAll("path.branch[data-viewer-target-node-id]").forEach(function (path) {
-      var nodeId = path.getAttribute("data-viewer-target-node-id");
-      path.classList.toggle("is-box-selected-branch", selectedBranches.has(nodeId));
-      path.classList.toggle("is-active-node-branch", activeNodeId === nodeId);
+    changedBranchIds.forEach(function (nodeId) {
+      var element = nodeId ? appState.branchElements.get(nodeId) : null;
+      if (element) {
+        app.applyBranchHighlight(element, nodeId);
+      }
     });
   };
 
@@ -0,0 +1,135 @@
+(function () {
+  var app = window.PhyloApp;
+  // Zooming in only loads clades automatically once the view has narrowed to a few of them.
+  var AUTO_EXPAND_MAX_VISIBLE = 4;
+
+  function getProgressiveConfig() {
+    var data = window.__TREE_VIEWER_DATA__;
+    return data && data.progressive ? data.progressive : null;
+  }
+
+  app.isProgressiveMode = function () {
+    return Boolean(getProgressiveConfig());
+  };
+
+  app.initProgressiveState = function () {
+    var config = getProgressiveConfig();
+    app.state.placeholders = config && config.placeholders ? Object.assign({}, config.placeholders) : {};
+  };
+
+  function spliceSubtree(viewNewick, placeholderName, subtreeNewick) {
+    var pattern = new RegExp(placeholderName + "(?=[:,);])");
+    return viewNewick.replace(pattern, function () {
+      return subtreeNewick;
+    });
+  }
+
+  function fetchSubtree(placeholder) {
+    var config = getProgressiveConfig();
+    var url = config.subtreeApiUrl +
+      "?node=" + encodeURIComponent(placeholder.node) +
+      "&depth=" + encodeURIComponent(config.depth);
+
+    return fetch(url).then(function (response) {
+      if (!response.ok) {
+        throw new Error("HTTP " + response.status);
+      }
+      return response.json();
+    });
+  }
+
+  app.expandPlaceholders = function (names) {
+    var appState = app.state;
+    var pending;
+
+    if (!app.isProgressiveMode() || appState.progressiveRequest) {
+      return Promise.resolve(false);
+    }
+    pending = names.filter(app.isPlaceholderName);
+    if (pending.length === 0) {
+      return Promise.resolve(false);
+    }
+
+    app.setStatus("Loading " + pending.length + " clade" + (pending.length === 1 ? "" : "s") + "...", false);
+    appState.progressiveRequest = Promise.all(
+      pending.map(function (name) {
+        return fetchSubtree(appState.placeholders[name]).then(function (result) {
+          return { name: name, result: result };
+        });
+      })
+    ).then(function (loaded) {
+      var newick = appState.viewNewick;
+      loaded.forEach(function (entry) {
+        newick = spliceSubtree(newick, entry.name, entry.result.newick);
+        delete appState.placeholders[entry.name];
+        Object.assign(appState.placeholders, entry.result.placeholders || {});
+      });
+      appState.progressiveRequest = null;
+      app.renderTree(newick, { preserveView: true });
+      app.setStatus("Loaded " + loaded.length + " clade" + (loaded.length === 1 ? "" : "s") + ".", false);
+      return true;
+    }).catch(function (error) {
+      appState.progressiveRequest = null;
+      app.setStatus("Failed to load clade: " + error, true);
+      return false;
+    });
+    app.syncPanels();
+    return appState.progressiveRequest;
+  };
+
+  function findVisiblePlaceholderNames(transform) {
+    var appState = app.state;
+    var svgNode = appState.display && appState.display.svg && appState.display.svg.node
+      ? appState.display.svg.node()
+      : null;
+    var baseTransform = (appState.display && appState.display.baseTransform) || { x: 0, y: 0 };
+    var width;
+    var height;
+
+    if (!svgNode || !appState.tree || !appState.tree.nodes) {
+      return [];
+    }
+    width = svgNode.clientWidth || svgNode.getAttribute("width") || 0;
+    height = svgNode.clientHeight || svgNode.getAttribute("height") || 0;
+
+    return appState.tree.nodes.leaves().filter(function (node) {
+      var x;
+      var y;
+      if (!app.getPlaceholderInfo(node) || node.screen_x === undefined || node.screen_y === undefined) {
+        return false;
+      }
+      x = (node.screen_x + baseTransform.x) * transform.k + transform.x;
+      y = (node.screen_y + baseTransform.y) * transform.k + transform.y;
+      return x >= 0 && x <= width && y >= 0 && y <= height;
+    }).map(app.getNodeName);
+  }
+
+  function expandPlaceholdersInView() {
+    var appState = app.state;
+    var transform = appState.display && appState.display.currentZoomTransform;
+    var previousK = appState.progressiveZoomK;
+    var visibleNames;
+
+    if (!transform || !isFinite(transform.k)) {
+      return;
+    }
+    appState.progressiveZoomK = transform.k;
+    if (previousK === null || transform.k <= previousK) {
+      return;
+    }
+    visibleNames = findVisiblePlaceholderNames(transform);
+    if (visibleNames.length > 0 && visibleNames.length <= AUTO_EXPAND_MAX_VISIBLE) {
+      app.expandPlaceholders(visibleNames);
+    }
+  }
+
+  app.scheduleProgressiveExpansion = function () {
+    var appState = app.state;
+
+    if (!app.isProgressiveMode()) {
+      return;
+    }
+    window.clearTimeout(appState.progressiveTimer);
+    appState.progressiveTimer = window.setTimeout(expandPlaceholdersInView, 250);
+  };
+})();
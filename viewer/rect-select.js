@@ -56,32 +56,22 @@
     };
   }
 
-  function rectsIntersect(a, b) {
-    return !(a.right < b.left || a.left > b.right || a.bottom < b.top || a.top > b.bottom);
-  }
-
   function collectLeafNamesInRectangle(viewportRect) {
-    var container = document.getElementById("tree-container");
-    var groups;
     var selectedNames = [];
     var selectedNodeIds = [];
+    var treeRect = app.viewportRectToTreeRect(viewportRect);
 
-    if (!container) {
+    if (!treeRect) {
       return { leafNames: selectedNames, internalNodeIds: selectedNodeIds };
     }
 
-    groups = container.querySelectorAll("[data-node-name]");
-    groups.forEach(function (group) {
-      var groupRect = group.getBoundingClientRect();
-      if (rectsIntersect(viewportRect, groupRect)) {
-        selectedNames.push(group.getAttribute("data-node-name"));
-      }
-    });
-
-    container.querySelectorAll("g.internal-node[data-viewer-node-id]").forEach(function (group) {
-      var groupRect = group.getBoundingClientRect();
-      if (rectsIntersect(viewportRect, groupRect)) {
-        selectedNodeIds.push(group.getAttribute("data-viewer-node-id"));
+    app.querySpatialIndex(treeRect).forEach(function (entry) {
+      if (entry.leaf) {
+        if (app.isSelectableLeaf(entry.node)) {
+          selectedNames.push(String(entry.node.data.name));
+        }
+      } else if (entry.node._viewerNodeId) {
+        selectedNodeIds.push(entry.node._viewerNodeId);
       }
     });
 
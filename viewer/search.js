@@ -0,0 +1,178 @@
+(function () {
+  var app = window.PhyloApp;
+  // Matches inside at most this many unloaded clades are loaded automatically.
+  var SEARCH_LOAD_MAX_CLADES = 4;
+  // Smallest region, in tree-local pixels, that a search zooms to.
+  var SEARCH_MIN_EXTENT = 160;
+
+  function setSearchStatus(text) {
+    var status = document.getElementById("leaf-search-status");
+    if (status) {
+      status.textContent = text;
+    }
+  }
+
+  function findPlaceholderForOrdinal(index, ordinal) {
+    var i;
+    var node;
+
+    for (i = 0; i < index.placeholderNodes.length; i += 1) {
+      node = index.placeholderNodes[i];
+      if (ordinal >= node._leafOrdinal && ordinal < node._leafOrdinal + node._leafWeight) {
+        return node;
+      }
+    }
+    return null;
+  }
+
+  // Hidden matches (inside collapsed or condensed clades) are framed by the
+  // wedge that currently stands in for them.
+  function getDrawnAncestor(node) {
+    var cursor = node;
+    while (cursor.parent && (cursor.hidden || !isFinite(cursor.screen_x) || !isFinite(cursor.screen_y))) {
+      cursor = cursor.parent;
+    }
+    return cursor;
+  }
+
+  function zoomToNodes(nodes) {
+    var left = Infinity;
+    var right = -Infinity;
+    var top = Infinity;
+    var bottom = -Infinity;
+    var width;
+    var height;
+
+    nodes.forEach(function (node) {
+      var drawn = getDrawnAncestor(node);
+      if (!isFinite(drawn.screen_x) || !isFinite(drawn.screen_y)) {
+        return;
+      }
+      left = Math.min(left, drawn.screen_x);
+      right = Math.max(right, drawn.screen_x);
+      top = Math.min(top, drawn.screen_y);
+      bottom = Math.max(bottom, drawn.screen_y);
+    });
+    if (!isFinite(left)) {
+      return;
+    }
+    width = Math.max(right - left, SEARCH_MIN_EXTENT);
+    height = Math.max(bottom - top, SEARCH_MIN_EXTENT);
+    app.fitTreeToViewport({
+      bbox: {
+        x: (left + right - width) / 2,
+        y: (top + bottom - height) / 2,
+        width: width,
+        height: height,
+      },
+    });
+    app.scheduleProgressiveExpansion();
+  }
+
+  app.showSearchResults = function (result, allowLoading) {
+    var index = app.getTreeIndex();
+    var matched = [];
+    var unloaded = new Map();
+    var summary;
+
+    if (!index) {
+      return;
+    }
+    result.leaves.forEach(function (ordinal) {
+      var node = index.leafNodesByOrdinal.get(ordinal);
+      var placeholder;
+      if (node) {
+        matched.push(node);
+        return;
+      }
+      placeholder = findPlaceholderForOrdinal(index, ordinal);
+      if (placeholder) {
+        unloaded.set(app.getNodeName(placeholder), placeholder);
+      }
+    });
+
+    if (allowLoading && unloaded.size > 0 && unloaded.size <= SEARCH_LOAD_MAX_CLADES) {
+      app.expandPlaceholders(Array.from(unloaded.keys())).then(function () {
+        app.showSearchResults(result, false);
+      });
+      return;
+    }
+
+    app.applyLeafSelection(matched.map(app.getNodeName), "search", []);
+    zoomToNodes(matched.concat(Array.from(unloaded.values())));
+
+    summary = result.total + " match" + (result.total === 1 ? "" : "es");
+    if (result.total > result.leaves.length) {
+      summary += " (first " + result.leaves.length + " shown)";
+    }
+    if (unloaded.size > 0) {
+      summary += ", some in " + unloaded.size + " unloaded clade" + (unloaded.size === 1 ? "" : "s");
+    }
+    setSearchStatus(summary);
+    app.setStatus("Search: " + summary + ".", false);
+  };
+
+  app.runLeafSearch = function (query, useRegex) {
+    var appState = app.state;
+    var data = window.__TREE_VIEWER_DATA__ || {};
+    var requestId;
+
+    if (!data.searchApiUrl) {
+      return;
+    }
+    if (!query) {
+      setSearchStatus("");
+      return;
+    }
+    appState.searchRequestId = (appState.searchRequestId || 0) + 1;
+    requestId = appState.searchRequestId;
+    fetch(
+      data.searchApiUrl +
+        "?q=" + encodeURIComponent(query) +
+        "&mode=" + (useRegex ? "regex" : "substring")
+    ).then(function (response) {
+      return response.json();
+    }).then(function (result) {
+      // Typing quickly can return answers out of order; keep only the latest.
+      if (requestId !== appState.searchRequestId) {
+        return;
+      }
+      if (!result.ok) {
+        setSearchStatus(result.error || "Search failed.");
+        return;
+      }
+      app.showSearchResults(result, true);
+    }).catch(function (error) {
+      setSearchStatus("Search failed.");
+      app.setStatus("Search failed: " + error, true);
+    });
+  };
+
+  app.bindLeafSearch = function () {
+    var appState = app.state;
+    var form = document.getElementById("leaf-search-form");
+    var input = document.getElementById("leaf-search-input");
+    var regexToggle = document.getElementById("leaf-search-regex");
+
+    if (!form || !input) {
+      return;
+    }
+
+    function search() {
+      window.clearTimeout(appState.searchTimer);
+      app.runLeafSearch(input.value.trim(), Boolean(regexToggle && regexToggle.checked));
+    }
+
+    form.onsubmit = function (event) {
+      event.preventDefault();
+      search();
+    };
+    input.oninput = function () {
+      window.clearTimeout(appState.searchTimer);
+      appState.searchTimer = window.setTimeout(search, 300);
+    };
+    if (regexToggle) {
+      regexToggle.onchange = search;
+    }
+  };
+})();
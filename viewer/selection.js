@@ -1,26 +1,6 @@
 (function () {
   var app = window.PhyloApp;
 
-  function findPairwiseMRCA(leftNode, rightNode) {
-    var ancestors = new Set();
-    var cursor = leftNode;
-
-    while (cursor) {
-      ancestors.add(cursor);
-      cursor = cursor.parent;
-    }
-
-    cursor = rightNode;
-    while (cursor) {
-      if (ancestors.has(cursor)) {
-        return cursor;
-      }
-      cursor = cursor.parent;
-    }
-
-    return null;
-  }
-
   app.computeSelectedBranchNodeIds = function () {
     var appState = app.state;
     var selectedNodes;
@@ -31,11 +11,7 @@
       return [];
     }
 
-    selectedNodes = appState.selectedLeafNames
-      .map(function (name) {
-        return appState.tree.getNodeByName(name);
-      })
-      .filter(Boolean);
+    selectedNodes = appState.selectedLeafNames.map(app.getIndexedNodeByName).filter(Boolean);
 
     if (selectedNodes.length === 0) {
       return [];
@@ -43,15 +19,15 @@
 
     mrca = selectedNodes[0];
     selectedNodes.slice(1).forEach(function (node) {
-      mrca = findPairwiseMRCA(mrca, node) || mrca;
+      mrca = app.findLCA(mrca, node) || mrca;
     });
 
+    // Stop climbing at the first branch already marked: every branch above it is
+    // marked too, so the total walk is linear in the size of the highlighted tree.
     selectedNodes.forEach(function (node) {
       var cursor = node;
-      while (cursor && cursor !== mrca) {
-        if (cursor._viewerNodeId) {
-          branchNodeIds.add(cursor._viewerNodeId);
-        }
+      while (cursor && cursor !== mrca && !branchNodeIds.has(cursor._viewerNodeId)) {
+        branchNodeIds.add(cursor._viewerNodeId);
         cursor = cursor.parent;
       }
     });
@@ -63,39 +39,16 @@
     return Array.from(branchNodeIds);
   };
 
-  app.assignViewerNodeIds = function () {
-    var appState = app.state;
-    var container = document.getElementById("tree-container");
-
-    if (!container || !appState.tree || !appState.tree.nodes || !appState.tree.nodes.descendants) {
-      return;
-    }
-
-    appState.tree.nodes.descendants().forEach(function (node, index) {
-      node._viewerNodeId = String(index);
-    });
-
-    container.querySelectorAll("g.node, g.internal-node").forEach(function (group) {
-      var node = group.__data__;
-      if (node && node._viewerNodeId) {
-        group.setAttribute("data-viewer-node-id", node._viewerNodeId);
-      }
-    });
-
-    container.querySelectorAll("path.branch").forEach(function (path) {
-      var edge = path.__data__;
-      if (edge && edge.target && edge.target._viewerNodeId) {
-        path.setAttribute("data-viewer-target-node-id", edge.target._viewerNodeId);
-      }
-    });
-  };
-
-  app.applyLeafSelection = function (names, sourceLabel, boxSelectedNodeIds) {
+  // placeholderRanges lists the [start, end) leaf ranges of unloaded clades that
+  // belong to the selection; their leaves have no names in the viewer yet.
+  app.applyLeafSelection = function (names, sourceLabel, boxSelectedNodeIds, placeholderRanges) {
     var appState = app.state;
+    var hiddenCount;
     if (!appState.display) {
       return;
     }
     appState.boxSelectedNodeIds = boxSelectedNodeIds || [];
+    appState.selectedPlaceholderRanges = placeholderRanges || [];
     appState._suppressSelectionCallback = true;
     appState.display.clearSelection();
     if (names.length > 0) {
@@ -103,24 +56,112 @@
     }
     appState._suppressSelectionCallback = false;
     appState.selectedLeafNames = names.slice();
-    app.assignViewerNodeIds();
     appState.selectedBranchNodeIds = app.computeSelectedBranchNodeIds();
-    app.applyRenderProfileToSvg();
     app.syncPanels();
-    app.setStatus(names.length + " leaves selected" + (sourceLabel ? " via " + sourceLabel : "") + ".", false);
+    hiddenCount = app.getSelectedLeafCount() - names.length;
+    app.setStatus(
+      app.getSelectedLeafCount() + " leaves selected" + (sourceLabel ? " via " + sourceLabel : "") +
+        (hiddenCount > 0 ? " (" + hiddenCount + " in unloaded clades)" : "") + ".",
+      false
+    );
+  };
+
+  app.getSelectedLeafCount = function () {
+    var appState = app.state;
+    return appState.selectedPlaceholderRanges.reduce(function (total, range) {
+      return total + range[1] - range[0];
+    }, appState.selectedLeafNames.length);
+  };
+
+  // After clades load, a selected placeholder range turns into the loaded leaves
+  // and the still-unloaded placeholders that fall inside it.
+  app.resolvePlaceholderRanges = function (ranges) {
+    var index = app.getTreeIndex();
+    var names = [];
+    var placeholderRanges = [];
+
+    function isCovered(start, end) {
+      return ranges.some(function (range) {
+        return start >= range[0] && end <= range[1];
+      });
+    }
+
+    if (!index || ranges.length === 0) {
+      return { names: names, placeholderRanges: placeholderRanges };
+    }
+    index.leafNodesByOrdinal.forEach(function (node, ordinal) {
+      if (app.isSelectableLeaf(node) && isCovered(ordinal, ordinal + 1)) {
+        names.push(String(node.data.name));
+      }
+    });
+    index.placeholderNodes.forEach(function (node) {
+      var start = node._leafOrdinal;
+      var end = start + node._leafWeight;
+      if (isCovered(start, end)) {
+        placeholderRanges.push([start, end]);
+      }
+    });
+    return { names: names, placeholderRanges: placeholderRanges };
+  };
+
+  // Selections leave the viewer as preorder leaf indices, either as
+  // [start, end) run pairs or as a base64 bitmap, whichever is shorter.
+  app.encodeLeafSelection = function (names, placeholderRanges) {
+    var index = app.getTreeIndex();
+    var leafCount = index ? index.leafOrdinalCount : 0;
+    var spans = (placeholderRanges || []).map(function (range) {
+      return range.slice();
+    });
+    var ranges = [];
+    var rangesText;
+    var bitmap;
+    var binary = "";
+    var i;
+
+    names.forEach(function (name) {
+      var node = app.getIndexedNodeByName(name);
+      if (node && app.isLeaf(node) && node._leafOrdinal !== undefined) {
+        spans.push([node._leafOrdinal, node._leafOrdinal + 1]);
+      }
+    });
+    spans.sort(function (a, b) {
+      return a[0] - b[0];
+    });
+    spans.forEach(function (span) {
+      if (ranges.length > 0 && ranges[ranges.length - 1] >= span[0]) {
+        ranges[ranges.length - 1] = Math.max(ranges[ranges.length - 1], span[1]);
+      } else {
+        ranges.push(span[0], span[1]);
+      }
+    });
+
+    rangesText = JSON.stringify(ranges);
+    if (rangesText.length <= Math.ceil(leafCount / 6)) {
+      return { leaf_order: "preorder", leaf_count: leafCount, selected_leaf_ranges: ranges };
+    }
+    bitmap = new Uint8Array(Math.ceil(leafCount / 8));
+    spans.forEach(function (span) {
+      var ordinal;
+      for (ordinal = span[0]; ordinal < span[1]; ordinal += 1) {
+        bitmap[ordinal >> 3] |= 1 << (ordinal & 7);
+      }
+    });
+    for (i = 0; i < bitmap.length; i += 0x8000) {
+      binary += String.fromCharCode.apply(null, bitmap.subarray(i, i + 0x8000));
+    }
+    return { leaf_order: "preorder", leaf_count: leafCount, selected_leaf_bitmap: window.btoa(binary) };
   };
 
   app.updateSelectedLeafStateFromDisplay = function () {
     var appState = app.state;
     var selection = appState.display && appState.display.getSelection ? appState.display.getSelection() : [];
     appState.selectedLeafNames = selection
-      .filter(app.isLeaf)
+      .filter(app.isSelectableLeaf)
       .map(function (node) {
         return node.data.name;
       });
-    app.assignViewerNodeIds();
+    appState.selectedPlaceholderRanges = [];
     appState.selectedBranchNodeIds = app.computeSelectedBranchNodeIds();
-    app.applyRenderProfileToSvg();
     app.syncPanels();
   };
 })();
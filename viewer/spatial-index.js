@@ -0,0 +1,173 @@
+(function () {
+  var app = window.PhyloApp;
+  var measureContext = null;
+
+  function measureLabelWidth(text, fontSize) {
+    if (!text) {
+      return 0;
+    }
+    if (!measureContext) {
+      measureContext = document.createElement("canvas").getContext("2d");
+    }
+    if (!measureContext) {
+      return text.length * fontSize * 0.6;
+    }
+    measureContext.font = fontSize + "px sans-serif";
+    return measureContext.measureText(text).width;
+  }
+
+  function isRenderedNode(node) {
+    return (
+      Boolean(node) &&
+      !node.hidden &&
+      !node.notshown &&
+      isFinite(node.screen_x) &&
+      isFinite(node.screen_y)
+    );
+  }
+
+  function buildEntry(node, profile) {
+    var leaf = app.isLeaf(node);
+    var label = app.getDisplayLabel(node);
+    var fontSize = leaf ? profile.leafFontSize : profile.internalFontSize;
+    var radius = profile.nodeRadius;
+    var halfHeight = Math.max(radius, label ? fontSize / 2 : 0);
+    var labelWidth = label && (leaf || !node.collapsed) ? measureLabelWidth(label, fontSize) : 0;
+
+    return {
+      node: node,
+      leaf: leaf,
+      left: node.screen_x - radius,
+      right: node.screen_x + radius + (labelWidth ? radius + labelWidth : 0),
+      top: node.screen_y - halfHeight,
+      bottom: node.screen_y + halfHeight,
+    };
+  }
+
+  app.getSpatialProfile = function () {
+    var appState = app.state;
+    var profile = appState.renderProfile || app.getRenderProfile();
+    var leafFontSize = appState.fontSizePx || 10;
+
+    return {
+      leafFontSize: leafFontSize,
+      internalFontSize: app.getInternalFontSize(),
+      nodeRadius: appState.nodeRadiusPx || profile.nodeRadius || 3,
+    };
+  };
+
+  app.invalidateSpatialIndex = function () {
+    app.state.spatialIndex = null;
+  };
+
+  // Entries are stored in tree-local coordinates, so panning and zooming never
+  // invalidate the index; only layout, collapse and sizing changes do.
+  app.getSpatialIndex = function () {
+    var appState = app.state;
+    var profile = app.getSpatialProfile();
+    var profileKey = [profile.leafFontSize, profile.internalFontSize, profile.nodeRadius].join("|");
+    var entries;
+    var maxHeight = 0;
+
+    if (appState.spatialIndex && appState.spatialIndex.profileKey === profileKey) {
+      return appState.spatialIndex;
+    }
+    if (!appState.tree || !appState.tree.nodes || !appState.tree.nodes.descendants) {
+      return null;
+    }
+
+    entries = appState.tree.nodes.descendants().filter(isRenderedNode).map(function (node) {
+      return buildEntry(node, profile);
+    });
+    entries.sort(function (a, b) {
+      return a.top - b.top;
+    });
+    entries.forEach(function (entry) {
+      maxHeight = Math.max(maxHeight, entry.bottom - entry.top);
+    });
+
+    appState.spatialIndex = { entries: entries, maxHeight: maxHeight, profileKey: profileKey };
+    return appState.spatialIndex;
+  };
+
+  function lowerBound(entries, top) {
+    var low = 0;
+    var high = entries.length;
+    var middle;
+
+    while (low < high) {
+      middle = (low + high) >> 1;
+      if (entries[middle].top < top) {
+        low = middle + 1;
+      } else {
+        high = middle;
+      }
+    }
+    return low;
+  }
+
+  app.querySpatialIndex = function (localRect) {
+    var index = app.getSpatialIndex();
+    var matches = [];
+    var entry;
+    var position;
+
+    if (!index) {
+      return matches;
+    }
+    position = lowerBound(index.entries, localRect.top - index.maxHeight);
+    for (; position < index.entries.length; position += 1) {
+      entry = index.entries[position];
+      if (entry.top > localRect.bottom) {
+        break;
+      }
+      if (entry.bottom < localRect.top || entry.right < localRect.left || entry.left > localRect.right) {
+        continue;
+      }
+      matches.push(entry);
+    }
+    return matches;
+  };
+
+  app.getTreeGroupNode = function () {
+    var svgSelection = app.state.display && app.state.display.svg;
+    var treeGroup = svgSelection && svgSelection.select ? svgSelection.select(".phylotree-container") : null;
+    return treeGroup && treeGroup.node ? treeGroup.node() : null;
+  };
+
+  app.viewportRectToTreeRect = function (viewportRect) {
+    var treeGroupNode = app.getTreeGroupNode();
+    var matrix = treeGroupNode && treeGroupNode.getScreenCTM ? treeGroupNode.getScreenCTM() : null;
+    var svgNode = treeGroupNode ? treeGroupNode.ownerSVGElement : null;
+    var inverse;
+    var corners;
+    var xs;
+    var ys;
+
+    if (!matrix || !svgNode) {
+      return null;
+    }
+    inverse = matrix.inverse();
+    corners = [
+      [viewportRect.left, viewportRect.top],
+      [viewportRect.right, viewportRect.bottom],
+    ].map(function (corner) {
+      var point = svgNode.createSVGPoint();
+      point.x = corner[0];
+      point.y = corner[1];
+      return point.matrixTransform(inverse);
+    });
+    xs = corners.map(function (point) {
+      return point.x;
+    });
+    ys = corners.map(function (point) {
+      return point.y;
+    });
+    return {
+      left: Math.min.apply(null, xs),
+      right: Math.max.apply(null, xs),
+      top: Math.min.apply(null, ys),
+      bottom: Math.max.apply(null, ys),
+    };
+  };
+})();
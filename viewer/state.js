@@ -2,6 +2,7 @@
   window.PhyloApp = {
     state: {
       tree: null,
+      treeIndex: null,
       display: null,
       renderProfile: null,
       fontSizePx: 10,
@@ -9,11 +10,33 @@
       devModeEnabled: Boolean(window.__TREE_VIEWER_DATA__ && window.__TREE_VIEWER_DATA__.devMode),
       activeNodeId: null,
       selectedLeafNames: [],
+      selectedPlaceholderRanges: [],
       boxSelectedNodeIds: [],
       selectedBranchNodeIds: [],
       selectionMode: "browse",
       selectionDrag: null,
       dragBindingsInstalled: false,
+      spatialIndex: null,
+      canvasMode: false,
+      nodeElements: new Map(),
+      branchElements: new Map(),
+      highlight: null,
+      profileFrame: null,
+      pendingProfileStatus: "",
+      viewNewick: null,
+      placeholders: {},
+      progressiveRequest: null,
+      progressiveZoomK: null,
+      progressiveTimer: null,
+      levelOfDetail: true,
+      autoCollapsedIds: new Set(),
+      lodPinnedIds: new Set(),
+      lodZoomK: null,
+      lodTimer: null,
+      labelOverrides: new Map(),
+      eventSource: null,
+      searchRequestId: 0,
+      searchTimer: null,
     },
   };
 
@@ -42,11 +65,9 @@
 
   app.getActiveNode = function () {
     var appState = app.state;
-    if (!appState.tree || !appState.activeNodeId || !appState.tree.nodes || !appState.tree.nodes.descendants) {
+    if (!appState.tree || !appState.activeNodeId) {
       return null;
     }
-    return appState.tree.nodes.descendants().find(function (node) {
-      return node && node._viewerNodeId === appState.activeNodeId;
-    }) || null;
+    return app.getNodeById(appState.activeNodeId);
   };
 })();
@@ -0,0 +1,167 @@
+(function () {
+  var app = window.PhyloApp;
+
+  function buildSparseTable(eulerDepths) {
+    var levels = [];
+    var size = eulerDepths.length;
+    var base = new Int32Array(size);
+    var previous;
+    var current;
+    var span;
+    var half;
+    var i;
+    var left;
+    var right;
+
+    for (i = 0; i < size; i += 1) {
+      base[i] = i;
+    }
+    levels.push(base);
+    for (span = 2; span <= size; span *= 2) {
+      previous = levels[levels.length - 1];
+      half = span / 2;
+      current = new Int32Array(size - span + 1);
+      for (i = 0; i + span <= size; i += 1) {
+        left = previous[i];
+        right = previous[i + half];
+        current[i] = eulerDepths[left] <= eulerDepths[right] ? left : right;
+      }
+      levels.push(current);
+    }
+    return levels;
+  }
+
+  // One iterative DFS per render assigns preorder ids, leaf intervals and an
+  // Euler tour, so subtree queries become slices and LCA queries are O(1).
+  app.buildTreeIndex = function (tree) {
+    var root = tree && tree.nodes ? tree.nodes : null;
+    var nodes = [];
+    var nodesById = new Map();
+    var nodesByName = new Map();
+    var leafNames = [];
+    var leafNodesByOrdinal = new Map();
+    var placeholderNodes = [];
+    var eulerNodes = [];
+    var eulerDepths = [];
+    var stack;
+    var frame;
+    var node;
+    var child;
+    var name;
+    var placeholder;
+    var leafOrdinal = 0;
+
+    if (!root) {
+      return null;
+    }
+
+    stack = [{ node: root, depth: 0, next: 0 }];
+    while (stack.length > 0) {
+      frame = stack[stack.length - 1];
+      node = frame.node;
+      if (frame.next === 0) {
+        node._viewerNodeId = String(nodes.length);
+        node._dfsPre = nodes.length;
+        node._leafStart = leafNames.length;
+        node._leafOrdinal = leafOrdinal;
+        node._leafWeight = 0;
+        node._tipCount = 0;
+        node._eulerFirst = eulerNodes.length;
+        nodes.push(node);
+        nodesById.set(node._viewerNodeId, node);
+        name = app.getNodeName(node);
+        if (name && (app.isLeaf(node) || !nodesByName.has(name))) {
+          nodesByName.set(name, node);
+        }
+        if (app.isSelectableLeaf(node)) {
+          leafNames.push(String(node.data.name));
+        }
+      } else {
+        // Returning from a child: record the parent again for the Euler tour.
+        child = node.children[frame.next - 1];
+        node._leafWeight += child._leafWeight;
+        node._tipCount += child._tipCount;
+      }
+      eulerNodes.push(node);
+      eulerDepths.push(frame.depth);
+
+      if (node.children && frame.next < node.children.length) {
+        stack.push({ node: node.children[frame.next], depth: frame.depth + 1, next: 0 });
+        frame.next += 1;
+        continue;
+      }
+
+      if (!node.children || node.children.length === 0) {
+        placeholder = app.getPlaceholderInfo(node);
+        node._leafWeight = placeholder ? placeholder.leafCount : 1;
+        node._tipCount = 1;
+        // Position in the server's preorder leaf order; unloaded clades hold
+        // their whole leaf range, so loaded leaves keep their full-tree index.
+        node._leafOrdinal = placeholder && isFinite(placeholder.leafStart) ? placeholder.leafStart : leafOrdinal;
+        leafOrdinal = node._leafOrdinal + node._leafWeight;
+        if (placeholder) {
+          placeholderNodes.push(node);
+        } else {
+          leafNodesByOrdinal.set(node._leafOrdinal, node);
+        }
+      }
+      node._dfsPost = nodes.length;
+      node._leafEnd = leafNames.length;
+      stack.pop();
+    }
+
+    return {
+      nodes: nodes,
+      nodesById: nodesById,
+      nodesByName: nodesByName,
+      leafNames: leafNames,
+      leafOrdinalCount: leafOrdinal,
+      leafNodesByOrdinal: leafNodesByOrdinal,
+      placeholderNodes: placeholderNodes,
+      eulerNodes: eulerNodes,
+      eulerDepths: eulerDepths,
+      sparseTable: buildSparseTable(eulerDepths),
+    };
+  };
+
+  app.getTreeIndex = function () {
+    var appState = app.state;
+    if (!appState.treeIndex && appState.tree) {
+      appState.treeIndex = app.buildTreeIndex(appState.tree);
+    }
+    return appState.treeIndex;
+  };
+
+  app.getNodeById = function (nodeId) {
+    var index = app.getTreeIndex();
+    return index && nodeId !== null && nodeId !== undefined ? index.nodesById.get(String(nodeId)) || null : null;
+  };
+
+  app.getIndexedNodeByName = function (name) {
+    var index = app.getTreeIndex();
+    return index ? index.nodesByName.get(String(name)) || null : null;
+  };
+
+  app.isDescendantOf = function (node, ancestor) {
+    return Boolean(node && ancestor) && node._dfsPre >= ancestor._dfsPre && node._dfsPre < ancestor._dfsPost;
+  };
+
+  app.findLCA = function (leftNode, rightNode) {
+    var index = app.getTreeIndex();
+    var left;
+    var right;
+    var level;
+    var first;
+    var second;
+
+    if (!index || !leftNode || !rightNode) {
+      return null;
+    }
+    left = Math.min(leftNode._eulerFirst, rightNode._eulerFirst);
+    right = Math.max(leftNode._eulerFirst, rightNode._eulerFirst);
+    level = Math.floor(Math.log2(right - left + 1));
+    first = index.sparseTable[level][left];
+    second = index.sparseTable[level][right - (1 << level) + 1];
+    return index.eulerNodes[index.eulerDepths[first] <= index.eulerDepths[second] ? first : second];
+  };
+})();
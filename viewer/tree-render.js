@@ -15,34 +15,67 @@
     return new window.phylotree.phylotree(newick);
   };
 
+  app.supportsCssNodeRadius = function () {
+    return Boolean(window.CSS && window.CSS.supports && window.CSS.supports("r", "1px"));
+  };
+
+  app.getInternalFontSize = function () {
+    var appState = app.state;
+    var profile = appState.renderProfile || app.getRenderProfile();
+    var leafFontSize = appState.fontSizePx || 10;
+    return Math.max(2, Math.round(leafFontSize * (profile.internalFontRatio || 0.85) * 10) / 10);
+  };
+
+  // Sizing lives in custom properties on the container, so a slider tick is a
+  // single style write; the stylesheet maps them onto every label and circle.
   app.applyRenderProfileToSvg = function () {
     var appState = app.state;
     var container = document.getElementById("tree-container");
     var profile = appState.renderProfile;
-    var leafFontSize = appState.fontSizePx || 10;
     var nodeRadius = appState.nodeRadiusPx || (profile && profile.nodeRadius) || 3;
-    var internalFontSize;
 
     if (!container || !profile) {
       return;
     }
 
-    internalFontSize = Math.max(2, Math.round(leafFontSize * (profile.internalFontRatio || 0.85) * 10) / 10);
+    container.style.setProperty("--leaf-font-size", (appState.fontSizePx || 10) + "px");
+    container.style.setProperty("--internal-font-size", app.getInternalFontSize() + "px");
+    container.style.setProperty("--node-radius", nodeRadius + "px");
+    if (appState.display && appState.display.requestDraw) {
+      appState.display.requestDraw();
+      return;
+    }
 
-    container.querySelectorAll("svg text").forEach(function (text) {
-      var isInternalLabel = Boolean(text.closest && text.closest("g.internal-node"));
-      var targetFontSize = isInternalLabel ? internalFontSize : leafFontSize;
-      text.style.fontSize = targetFontSize + "px";
-    });
+    // Browsers without CSS geometry properties still need the r attribute.
+    if (!app.supportsCssNodeRadius()) {
+      container.querySelectorAll("g.internal-node circle").forEach(function (circle) {
+        circle.setAttribute("r", String(nodeRadius));
+      });
+    }
+  };
 
-    container.querySelectorAll("g.internal-node circle").forEach(function (circle) {
-      circle.setAttribute("r", String(nodeRadius));
+  app.scheduleRenderProfileUpdate = function (statusText) {
+    var appState = app.state;
+    appState.pendingProfileStatus = statusText;
+    if (appState.profileFrame) {
+      return;
+    }
+    appState.profileFrame = window.requestAnimationFrame(function () {
+      appState.profileFrame = null;
+      app.applyRenderProfileToSvg();
+      app.syncPanels();
+      app.setStatus(appState.pendingProfileStatus, false);
     });
   };
 
-  app.renderTree = function (newick) {
+  app.renderTree = function (newick, options) {
     var appState = app.state;
+    var opts = options || {};
     var data = window.__TREE_VIEWER_DATA__;
+    var previousTransform = opts.preserveView && appState.display ? appState.display.currentZoomTransform : null;
+    var previousSelection = opts.preserveView ? appState.selectedLeafNames.slice() : [];
+    var previousRanges = opts.preserveView ? appState.selectedPlaceholderRanges.slice() : [];
+    var resolved;
     var container = document.getElementById("tree-container");
     var title = document.getElementById("viewer-title");
     var display;
@@ -59,11 +92,20 @@
     }
 
     container.innerHTML = "";
+    app.invalidateSpatialIndex();
+    appState.nodeElements = new Map();
+    appState.branchElements = new Map();
+    appState.highlight = app.emptyHighlightState();
+    app.resetLevelOfDetail();
     app.summarizeInput(newick);
+    appState.viewNewick = newick;
     appState.tree = app.createTree(newick);
+    appState.treeIndex = app.buildTreeIndex(appState.tree);
     appState.renderProfile = app.getRenderProfile();
-    appState.fontSizePx = 10;
-    appState.nodeRadiusPx = appState.renderProfile.nodeRadius || 3;
+    if (!opts.preserveView) {
+      appState.fontSizePx = 10;
+      appState.nodeRadiusPx = appState.renderProfile.nodeRadius || 3;
+    }
     if (appState.tree.internalNames) {
       appState.tree.internalNames(function (node) {
         return Boolean(app.getDisplayLabel(node)) && !app.isLeaf(node);
@@ -77,20 +119,27 @@
     width = Math.max(container.clientWidth || 0, 960);
     height = Math.max(container.clientHeight || 0, 640);
 
-    display = appState.tree.render({
-      container: "#tree-container",
-      width: width,
-      height: height,
-      selectable: true,
-      collapsible: true,
-      brush: false,
-      zoom: true,
-      "internal-names": true,
-      "show-menu": false,
-      "show-scale": true,
-      "left-right-spacing": "fit-to-size",
-      "top-bottom-spacing": "fit-to-size",
-    });
+    appState.canvasMode = app.shouldUseCanvas(appState.treeIndex);
+    container.classList.toggle("is-canvas-mode", appState.canvasMode);
+    if (appState.canvasMode) {
+      display = app.createCanvasDisplay(appState.tree, width, height);
+    } else {
+      display = appState.tree.render({
+        container: "#tree-container",
+        width: width,
+        height: height,
+        selectable: true,
+        collapsible: true,
+        brush: false,
+        zoom: true,
+        "internal-names": true,
+        "show-menu": false,
+        "show-scale": true,
+        "left-right-spacing": "fit-to-size",
+        "top-bottom-spacing": "fit-to-size",
+      });
+      app.installElementStylers(display);
+    }
     display.update();
     svgNode = display.show();
     if (!svgNode) {
@@ -98,31 +147,41 @@
     }
     container.appendChild(svgNode);
     app.applyRenderProfileToSvg();
-    app.assignViewerNodeIds();
-    app.sanitizeRenderedLabels();
     app.ensureSelectionBox();
     app.disableTreeCanvasDrag();
 
     appState.display = display;
     appState.selectedLeafNames = [];
+    appState.selectedPlaceholderRanges = [];
     appState.boxSelectedNodeIds = [];
     appState.selectedBranchNodeIds = [];
     app.installDisplayBindings();
-    app.fitTreeToViewport({ onlyShrink: true });
+    if (previousTransform) {
+      app.restoreZoomTransform(previousTransform);
+    } else {
+      app.fitTreeToViewport({ onlyShrink: true });
+    }
+    if (previousSelection.length > 0 || previousRanges.length > 0) {
+      resolved = app.resolvePlaceholderRanges(previousRanges);
+      app.applyLeafSelection(previousSelection.concat(resolved.names), null, [], resolved.placeholderRanges);
+    }
     app.syncPanels();
     window.__PHYLO_TREE__ = appState.tree;
     app.setStatus("Tree rendered successfully. Right-panel actions are active.", false);
   };
 
-  app.refreshBindingsAfterTreeMutation = function (statusText) {
+  app.refreshBindingsAfterTreeMutation = function (statusText, changedNode) {
     var appState = app.state;
-    appState.display = appState.tree.display || appState.display;
+    var display = appState.tree.display || appState.display;
     appState.boxSelectedNodeIds = [];
     appState.selectedBranchNodeIds = [];
-    app.assignViewerNodeIds();
-    app.sanitizeRenderedLabels();
-    app.applyRenderProfileToSvg();
-    app.installDisplayBindings();
+    app.invalidateSpatialIndex();
+    app.pruneElementRegistry(changedNode || (appState.tree && appState.tree.nodes));
+    if (display !== appState.display) {
+      appState.display = display;
+      app.installElementStylers(display);
+      app.installDisplayBindings();
+    }
     app.captureZoomState();
     app.updateSelectedLeafStateFromDisplay();
     app.syncPanels();
@@ -33,7 +33,8 @@
       return;
     }
 
-    bbox = treeGroup.node().getBBox();
+    // opts.bbox fits a region given in tree-local coordinates instead of the whole tree.
+    bbox = opts.bbox || treeGroup.node().getBBox();
     if (!bbox || !isFinite(bbox.width) || !isFinite(bbox.height) || bbox.width <= 0 || bbox.height <= 0) {
       app.captureZoomState();
       return;
@@ -73,6 +74,18 @@
     window.requestAnimationFrame(app.captureZoomState);
   };
 
+  app.restoreZoomTransform = function (transform) {
+    var appState = app.state;
+
+    if (!transform || !appState.display || !appState.display.svg || !appState.display.zoomBehavior) {
+      app.fitTreeToViewport({ onlyShrink: true });
+      return;
+    }
+    appState.display.currentZoomTransform = transform;
+    appState.display.svg.call(appState.display.zoomBehavior.transform, transform);
+    window.requestAnimationFrame(app.captureZoomState);
+  };
+
   app.bindZoomControls = function () {
     var appState = app.state;
     var zoomInButton = document.getElementById("zoom-in-button");
@@ -87,6 +100,7 @@
         if (appState.display && appState.display.zoomBehavior && appState.display.svg) {
           appState.display.svg.call(appState.display.zoomBehavior.scaleBy, 1.2);
           window.requestAnimationFrame(app.captureZoomState);
+          app.scheduleProgressiveExpansion();
         }
       };
     }
@@ -112,7 +126,7 @@
         if (appState.display) {
           appState.display.currentZoomTransform = null;
           appState.display.update();
-          app.applyRenderProfileToSvg();
+          app.invalidateSpatialIndex();
           app.fitTreeToViewport({ onlyShrink: true });
           app.setStatus("Zoom reset.", false);
         }
@@ -123,9 +137,7 @@
       fontSizeSlider.value = String(appState.fontSizePx || 10);
       fontSizeSlider.oninput = function () {
         appState.fontSizePx = parseFloat(fontSizeSlider.value) || 10;
-        app.applyRenderProfileToSvg();
-        app.syncPanels();
-        app.setStatus("Text size adjusted.", false);
+        app.scheduleRenderProfileUpdate("Text size adjusted.");
       };
     }
 
@@ -133,9 +145,7 @@
       nodeSizeSlider.value = String(appState.nodeRadiusPx || 3);
       nodeSizeSlider.oninput = function () {
         appState.nodeRadiusPx = parseFloat(nodeSizeSlider.value) || 3;
-        app.applyRenderProfileToSvg();
-        app.syncPanels();
-        app.setStatus("Node size adjusted.", false);
+        app.scheduleRenderProfileUpdate("Node size adjusted.");
       };
     }
 